@@ -18,10 +18,15 @@ if config.config_file_name is not None:
 
 # add your model's MetaData object here
 # for 'autogenerate' support
+from app.core.config import settings
 from app.models.base import Base
 from app.models.task import Task  # Importér dine modeller her
 target_metadata = Base.metadata
 
+# Samme database som appen; URL'en i alembic.ini bruges ikke.
+# ConfigParser tolker %, så det skal escapes (fx i URL-kodede passwords)
+config.set_main_option("sqlalchemy.url", settings.DATABASE_URL.replace("%", "%%"))
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
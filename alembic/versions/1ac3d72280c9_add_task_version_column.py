@@ -0,0 +1,26 @@
+"""Add version column to tasks for ETags and optimistic concurrency
+
+Revision ID: 1ac3d72280c9
+Revises: 4da1b55eccb7
+Create Date: 2026-10-18 10:03:47.201915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1ac3d72280c9'
+down_revision: Union[str, None] = '4da1b55eccb7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('tasks', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('tasks', 'version')
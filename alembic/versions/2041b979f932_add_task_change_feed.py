@@ -0,0 +1,116 @@
+"""Add change_seq column, tombstones and triggers for the task change feed
+
+Revision ID: 2041b979f932
+Revises: a1d15b0674e5
+Create Date: 2026-10-18 12:48:03.912554
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2041b979f932'
+down_revision: Union[str, None] = 'a1d15b0674e5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('tasks', sa.Column('change_seq', sa.BigInteger(), nullable=True))
+    op.create_index('ix_tasks_change_seq', 'tasks', ['change_seq'], unique=False)
+
+    op.create_table(
+        'task_change_seq',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('last_seq', sa.BigInteger(), server_default='0', nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table(
+        'task_tombstones',
+        sa.Column('task_id', sa.Integer(), nullable=False),
+        sa.Column('change_seq', sa.BigInteger(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=True),
+        sa.PrimaryKeyConstraint('task_id')
+    )
+    op.create_index('ix_task_tombstones_change_seq', 'task_tombstones', ['change_seq'], unique=False)
+
+    # Eksisterende opgaver får deres id som første ændringsnummer
+    op.execute("UPDATE tasks SET change_seq = id")
+    op.execute(
+        "INSERT INTO task_change_seq (id, last_seq) "
+        "SELECT 1, coalesce(max(id), 0) FROM tasks"
+    )
+
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute(
+            "CREATE OR REPLACE FUNCTION task_next_change_seq() RETURNS bigint AS $$ "
+            "UPDATE task_change_seq SET last_seq = last_seq + 1 RETURNING last_seq "
+            "$$ LANGUAGE sql"
+        )
+        op.execute(
+            "CREATE OR REPLACE FUNCTION task_change_apply() RETURNS trigger AS $$ BEGIN "
+            "IF TG_OP = 'DELETE' THEN "
+            "INSERT INTO task_tombstones (task_id, change_seq, deleted_at) "
+            "VALUES (OLD.id, task_next_change_seq(), now()) "
+            "ON CONFLICT (task_id) DO UPDATE "
+            "SET change_seq = EXCLUDED.change_seq, deleted_at = EXCLUDED.deleted_at; "
+            "RETURN OLD; "
+            "END IF; "
+            "NEW.change_seq := task_next_change_seq(); "
+            "IF TG_OP = 'INSERT' THEN DELETE FROM task_tombstones WHERE task_id = NEW.id; END IF; "
+            "RETURN NEW; END $$ LANGUAGE plpgsql"
+        )
+        op.execute(
+            "CREATE TRIGGER task_change_biu BEFORE INSERT OR UPDATE ON tasks "
+            "FOR EACH ROW EXECUTE FUNCTION task_change_apply()"
+        )
+        op.execute(
+            "CREATE TRIGGER task_change_ad AFTER DELETE ON tasks "
+            "FOR EACH ROW EXECUTE FUNCTION task_change_apply()"
+        )
+    elif dialect == 'sqlite':
+        stamp = (
+            "UPDATE task_change_seq SET last_seq = last_seq + 1; "
+            "UPDATE tasks SET change_seq = (SELECT last_seq FROM task_change_seq) WHERE id = new.id; "
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS task_change_ai AFTER INSERT ON tasks BEGIN "
+            + stamp
+            + "DELETE FROM task_tombstones WHERE task_id = new.id; "
+            "END"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS task_change_au AFTER UPDATE ON tasks "
+            "WHEN new.change_seq IS old.change_seq BEGIN "
+            + stamp
+            + "END"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS task_change_ad AFTER DELETE ON tasks BEGIN "
+            "UPDATE task_change_seq SET last_seq = last_seq + 1; "
+            "INSERT OR REPLACE INTO task_tombstones (task_id, change_seq, deleted_at) "
+            "VALUES (old.id, (SELECT last_seq FROM task_change_seq), CURRENT_TIMESTAMP); "
+            "END"
+        )
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute("DROP TRIGGER IF EXISTS task_change_ad ON tasks")
+        op.execute("DROP TRIGGER IF EXISTS task_change_biu ON tasks")
+        op.execute("DROP FUNCTION IF EXISTS task_change_apply()")
+        op.execute("DROP FUNCTION IF EXISTS task_next_change_seq()")
+    elif dialect == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS task_change_ad")
+        op.execute("DROP TRIGGER IF EXISTS task_change_au")
+        op.execute("DROP TRIGGER IF EXISTS task_change_ai")
+    op.drop_index('ix_task_tombstones_change_seq', table_name='task_tombstones')
+    op.drop_table('task_tombstones')
+    op.drop_table('task_change_seq')
+    op.drop_index('ix_tasks_change_seq', table_name='tasks')
+    op.drop_column('tasks', 'change_seq')
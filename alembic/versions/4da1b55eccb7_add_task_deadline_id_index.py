@@ -0,0 +1,26 @@
+"""Add (deadline, id) index for keyset pagination
+
+Revision ID: 4da1b55eccb7
+Revises: cc6fdbdbc0c1
+Create Date: 2026-10-18 09:12:04.518230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4da1b55eccb7'
+down_revision: Union[str, None] = 'cc6fdbdbc0c1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_tasks_deadline_id', 'tasks', ['deadline', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_tasks_deadline_id', table_name='tasks')
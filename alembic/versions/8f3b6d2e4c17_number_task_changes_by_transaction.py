@@ -0,0 +1,65 @@
+"""Number task changes by transaction id on Postgres instead of a locked counter row
+
+Revision ID: 8f3b6d2e4c17
+Revises: 2041b979f932
+Create Date: 2026-10-18 16:02:18.551094
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8f3b6d2e4c17'
+down_revision: Union[str, None] = '2041b979f932'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _create_change_apply(next_seq: str) -> None:
+    op.execute(
+        "CREATE OR REPLACE FUNCTION task_change_apply() RETURNS trigger AS $$ BEGIN "
+        "IF TG_OP = 'DELETE' THEN "
+        "INSERT INTO task_tombstones (task_id, change_seq, deleted_at) "
+        f"VALUES (OLD.id, {next_seq}(), now()) "
+        "ON CONFLICT (task_id) DO UPDATE "
+        "SET change_seq = EXCLUDED.change_seq, deleted_at = EXCLUDED.deleted_at; "
+        "RETURN OLD; "
+        "END IF; "
+        f"NEW.change_seq := {next_seq}(); "
+        "IF TG_OP = 'INSERT' THEN DELETE FROM task_tombstones WHERE task_id = NEW.id; END IF; "
+        "RETURN NEW; END $$ LANGUAGE plpgsql"
+    )
+
+
+def upgrade() -> None:
+    # SQLite har kun én skriver ad gangen og beholder tælleren
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    # last_seq fryses på det senest uddelte nummer, så nye numre ligger over de gamle
+    op.execute(
+        "CREATE OR REPLACE FUNCTION task_current_change_seq() RETURNS bigint AS $$ "
+        "SELECT last_seq + pg_current_xact_id()::text::bigint FROM task_change_seq "
+        "$$ LANGUAGE sql"
+    )
+    _create_change_apply('task_current_change_seq')
+    op.execute("DROP FUNCTION IF EXISTS task_next_change_seq()")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute(
+        "UPDATE task_change_seq SET last_seq = greatest("
+        "(SELECT coalesce(max(change_seq), 0) FROM tasks), "
+        "(SELECT coalesce(max(change_seq), 0) FROM task_tombstones))"
+    )
+    op.execute(
+        "CREATE OR REPLACE FUNCTION task_next_change_seq() RETURNS bigint AS $$ "
+        "UPDATE task_change_seq SET last_seq = last_seq + 1 RETURNING last_seq "
+        "$$ LANGUAGE sql"
+    )
+    _create_change_apply('task_next_change_seq')
+    op.execute("DROP FUNCTION IF EXISTS task_current_change_seq()")
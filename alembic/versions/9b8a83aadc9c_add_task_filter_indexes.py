@@ -0,0 +1,42 @@
+"""Add indexes for task list filtering and sorting
+
+Revision ID: 9b8a83aadc9c
+Revises: 1ac3d72280c9
+Create Date: 2026-10-18 10:41:12.884063
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b8a83aadc9c'
+down_revision: Union[str, None] = '1ac3d72280c9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_tasks_updated_at_id', 'tasks', ['updated_at', 'id'], unique=False)
+    op.create_index(
+        'ix_tasks_status_priority_deadline',
+        'tasks',
+        ['status', 'priority', 'deadline'],
+        unique=False
+    )
+    op.create_index(
+        'ix_tasks_open_deadline',
+        'tasks',
+        ['deadline'],
+        unique=False,
+        postgresql_where=sa.text("status != 'DONE'"),
+        sqlite_where=sa.text("status != 'DONE'")
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_tasks_open_deadline', table_name='tasks')
+    op.drop_index('ix_tasks_status_priority_deadline', table_name='tasks')
+    op.drop_index('ix_tasks_updated_at_id', table_name='tasks')
@@ -0,0 +1,152 @@
+"""Add task_stats counters maintained by triggers on tasks
+
+Revision ID: a1d15b0674e5
+Revises: 9de0edd436ac
+Create Date: 2026-10-18 12:05:12.381904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a1d15b0674e5'
+down_revision: Union[str, None] = '9de0edd436ac'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+STATUSES = ['TODO', 'IN_PROGRESS', 'DONE']
+PRIORITIES = ['LOW', 'MEDIUM', 'HIGH', 'URGENT']
+# Postgres-forbindelser skriver i hver sin shard; SQLite bruger kun shard 0
+SHARDS = 16
+POSTGRES_SHARD = f"pg_backend_pid() % {SHARDS}"
+
+
+def _postgres_delta(*sources) -> str:
+    deltas = []
+    for rows, sign, with_total in sources:
+        deltas += [
+            f"SELECT 'status' AS dimension, status::text AS value, {sign}1 AS n FROM {rows}",
+            f"SELECT 'priority', priority::text, {sign}1 FROM {rows} WHERE priority IS NOT NULL",
+        ]
+        if with_total:
+            deltas.append(f"SELECT 'total', 'all', {sign}1 FROM {rows}")
+    return (
+        "UPDATE task_stats s SET task_count = s.task_count + d.n FROM ("
+        "SELECT dimension, value, sum(n) AS n FROM ("
+        + " UNION ALL ".join(deltas)
+        + ") deltas GROUP BY dimension, value HAVING sum(n) <> 0"
+        ") d WHERE s.dimension = d.dimension AND s.value = d.value "
+        f"AND s.shard = {POSTGRES_SHARD};"
+    )
+
+
+def upgrade() -> None:
+    task_stats = op.create_table(
+        'task_stats',
+        sa.Column('dimension', sa.String(length=20), nullable=False),
+        sa.Column('value', sa.String(length=20), nullable=False),
+        sa.Column('shard', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('task_count', sa.Integer(), server_default='0', nullable=False),
+        sa.PrimaryKeyConstraint('dimension', 'value', 'shard')
+    )
+    dialect = op.get_bind().dialect.name
+    op.bulk_insert(task_stats, [
+        {'dimension': dimension, 'value': value, 'shard': shard, 'task_count': 0}
+        for dimension, value in (
+            [('total', 'all')]
+            + [('status', status) for status in STATUSES]
+            + [('priority', priority) for priority in PRIORITIES]
+        )
+        for shard in range(SHARDS if dialect == 'postgresql' else 1)
+    ])
+
+    if dialect == 'postgresql':
+        op.execute(
+            "CREATE OR REPLACE FUNCTION task_stats_apply() RETURNS trigger AS $$ BEGIN "
+            "IF TG_OP = 'INSERT' THEN "
+            + _postgres_delta(("new_rows", "+", True))
+            + " ELSIF TG_OP = 'UPDATE' THEN "
+            + _postgres_delta(("new_rows", "+", False), ("old_rows", "-", False))
+            + " ELSE "
+            + _postgres_delta(("old_rows", "-", True))
+            + " END IF; RETURN NULL; END $$ LANGUAGE plpgsql"
+        )
+        op.execute(
+            "CREATE TRIGGER task_stats_ai AFTER INSERT ON tasks "
+            "REFERENCING NEW TABLE AS new_rows "
+            "FOR EACH STATEMENT EXECUTE FUNCTION task_stats_apply()"
+        )
+        op.execute(
+            "CREATE TRIGGER task_stats_au AFTER UPDATE ON tasks "
+            "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows "
+            "FOR EACH STATEMENT EXECUTE FUNCTION task_stats_apply()"
+        )
+        op.execute(
+            "CREATE TRIGGER task_stats_ad AFTER DELETE ON tasks "
+            "REFERENCING OLD TABLE AS old_rows "
+            "FOR EACH STATEMENT EXECUTE FUNCTION task_stats_apply()"
+        )
+        cast = '::text'
+    elif dialect == 'sqlite':
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS task_stats_ai AFTER INSERT ON tasks BEGIN "
+            "UPDATE task_stats SET task_count = task_count + 1 "
+            "WHERE shard = 0 AND ((dimension = 'status' AND value = new.status) "
+            "OR (dimension = 'priority' AND value = new.priority) "
+            "OR dimension = 'total'); "
+            "END"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS task_stats_ad AFTER DELETE ON tasks BEGIN "
+            "UPDATE task_stats SET task_count = task_count - 1 "
+            "WHERE shard = 0 AND ((dimension = 'status' AND value = old.status) "
+            "OR (dimension = 'priority' AND value = old.priority) "
+            "OR dimension = 'total'); "
+            "END"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS task_stats_au AFTER UPDATE OF status, priority ON tasks "
+            "WHEN old.status IS NOT new.status OR old.priority IS NOT new.priority BEGIN "
+            "UPDATE task_stats SET task_count = task_count "
+            "+ ((dimension = 'status' AND value IS new.status) OR (dimension = 'priority' AND value IS new.priority)) "
+            "- ((dimension = 'status' AND value IS old.status) OR (dimension = 'priority' AND value IS old.priority)) "
+            "WHERE shard = 0 AND dimension IN ('status', 'priority') "
+            "AND value IN (old.status, new.status, old.priority, new.priority); "
+            "END"
+        )
+        cast = ''
+    else:
+        cast = ''
+
+    # Tæl de eksisterende opgaver én gang i shard 0; herefter holder triggers tællerne ajour
+    op.execute(
+        "UPDATE task_stats SET task_count = (SELECT count(*) FROM tasks) "
+        "WHERE dimension = 'total' AND shard = 0"
+    )
+    op.execute(
+        "UPDATE task_stats SET task_count = "
+        f"(SELECT count(*) FROM tasks WHERE status{cast} = task_stats.value) "
+        "WHERE dimension = 'status' AND shard = 0"
+    )
+    op.execute(
+        "UPDATE task_stats SET task_count = "
+        f"(SELECT count(*) FROM tasks WHERE priority{cast} = task_stats.value) "
+        "WHERE dimension = 'priority' AND shard = 0"
+    )
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute("DROP TRIGGER IF EXISTS task_stats_ad ON tasks")
+        op.execute("DROP TRIGGER IF EXISTS task_stats_au ON tasks")
+        op.execute("DROP TRIGGER IF EXISTS task_stats_ai ON tasks")
+        op.execute("DROP FUNCTION IF EXISTS task_stats_apply()")
+    elif dialect == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS task_stats_au")
+        op.execute("DROP TRIGGER IF EXISTS task_stats_ad")
+        op.execute("DROP TRIGGER IF EXISTS task_stats_ai")
+    op.drop_table('task_stats')
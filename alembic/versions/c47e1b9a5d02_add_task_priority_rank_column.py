@@ -0,0 +1,53 @@
+"""Add generated priority_rank column and indexes for sort=priority
+
+Revision ID: c47e1b9a5d02
+Revises: 8f3b6d2e4c17
+Create Date: 2026-10-18 17:24:40.118305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c47e1b9a5d02'
+down_revision: Union[str, None] = '8f3b6d2e4c17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PRIORITY_RANK_EXPRESSION = (
+    "CASE priority WHEN 'URGENT' THEN 0 WHEN 'HIGH' THEN 1 "
+    "WHEN 'MEDIUM' THEN 2 WHEN 'LOW' THEN 3 ELSE 4 END"
+)
+
+
+def upgrade() -> None:
+    # Postgres kræver STORED; SQLite kan kun tilføje en VIRTUAL kolonne med
+    # ALTER TABLE, men index'erne gemmer værdien i begge tilfælde
+    persisted = True if op.get_bind().dialect.name == 'postgresql' else None
+    op.add_column(
+        'tasks',
+        sa.Column(
+            'priority_rank',
+            sa.Integer(),
+            sa.Computed(PRIORITY_RANK_EXPRESSION, persisted=persisted),
+            nullable=True
+        )
+    )
+    op.create_index('ix_tasks_priority_rank_id', 'tasks', ['priority_rank', 'id'], unique=False)
+    op.create_index(
+        'ix_tasks_open_priority_rank_id',
+        'tasks',
+        ['priority_rank', 'id'],
+        unique=False,
+        postgresql_where=sa.text("status != 'DONE'"),
+        sqlite_where=sa.text("status != 'DONE'")
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_tasks_open_priority_rank_id', table_name='tasks')
+    op.drop_index('ix_tasks_priority_rank_id', table_name='tasks')
+    op.drop_column('tasks', 'priority_rank')
@@ -0,0 +1,25 @@
+from functools import lru_cache
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Kædemodulerne importerer langchain, og kæderne opretter LLM-klienter.
+# Begge dele udskydes til første brug, så appen kan starte uden at vente.
+
+@lru_cache(maxsize=None)
+def get_prioritization_chain():
+    from app.ai.chains.task_prioritization import TaskPrioritizationChain
+    return TaskPrioritizationChain()
+
+@lru_cache(maxsize=None)
+def get_status_report_chain():
+    from app.ai.chains.status_report import StatusReportChain
+    return StatusReportChain()
+
+def warm_chains():
+    """Importer og byg kæderne på forhånd (kaldes i en baggrundstråd efter opstart)"""
+    try:
+        get_prioritization_chain().chain
+        get_status_report_chain().chain
+    except Exception as e:
+        logger.warning(f"Kunne ikke forvarme AI-kæder: {str(e)}")
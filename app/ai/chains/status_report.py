@@ -1,11 +1,11 @@
 from langchain.prompts import PromptTemplate
 from langchain_community.chat_models import ChatOpenAI
 from langchain.chains import LLMChain
-from typing import List
-from app.models.task import Task
+from typing import Dict, List, Optional
+from app.models.task import Task, TaskStatus
 import os
 from app.ai.chains.base import with_fallback
-from app.core.cache import cache_response
+from app.core.cache import cache_response, ALL_TASKS_TAG
 
 STATUS_REPORT_TEMPLATE = """
 Du er en projektleder der skal generere en daglig statusrapport.
@@ -39,16 +39,23 @@ Status Rapport (Fallback Version)
 
 class StatusReportChain:
     def __init__(self):
-        self.llm = ChatOpenAI(
-            temperature=0.5,
-            model_name="gpt-3.5-turbo",
-            openai_api_key=os.getenv("OPENAI_API_KEY")
-        )
-        self.prompt = PromptTemplate(
-            template=STATUS_REPORT_TEMPLATE,
-            input_variables=["tasks"]
-        )
-        self.chain = LLMChain(llm=self.llm, prompt=self.prompt)
+        self._chain = None
+
+    @property
+    def chain(self) -> LLMChain:
+        # Klienten bygges ved første brug, så opstart ikke venter på den
+        if self._chain is None:
+            llm = ChatOpenAI(
+                temperature=0.5,
+                model_name="gpt-3.5-turbo",
+                openai_api_key=os.getenv("OPENAI_API_KEY")
+            )
+            prompt = PromptTemplate(
+                template=STATUS_REPORT_TEMPLATE,
+                input_variables=["tasks"]
+            )
+            self._chain = LLMChain(llm=llm, prompt=prompt)
+        return self._chain
 
     def format_tasks(self, tasks: List[Task]) -> str:
         formatted_tasks = []
@@ -62,18 +69,42 @@ class StatusReportChain:
             formatted_tasks.append(task_str)
         return "\n".join(formatted_tasks)
 
-    @cache_response(expire_time=900)
+    # Rapporten caches under én nøgle uanset opgaverne. Efter 15 minutter,
+    # eller når en opgave ændres, serveres den gamle rapport stadig (op til
+    # et døgn), mens en ny bygges i baggrunden ud fra kaldets opgaver.
+    # Kald med andre opgaver end alle opgaverne (fx fra websocket-klienter)
+    # skal bruge `generate_status_report.uncached`
+    @cache_response(
+        expire_time=900,
+        version=STATUS_REPORT_TEMPLATE,
+        exclude=("tasks", "status_counts"),
+        tags=(ALL_TASKS_TAG,),
+        lock_timeout=60,
+        stale_ttl=86400
+    )
     @with_fallback(fallback_value=None)  # Vi håndterer fallback i metoden selv
-    async def generate_status_report(self, tasks: List[Task]) -> str:
+    async def generate_status_report(
+        self,
+        tasks: List[Task],
+        status_counts: Optional[Dict[str, int]] = None
+    ) -> str:
+        """
+        `status_counts` er antal opgaver per status (fra task_stats) til
+        fallback-rapporten; uden dem tælles `tasks`.
+        """
         try:
             formatted_tasks = self.format_tasks(tasks)
             report = await self.chain.arun(tasks=formatted_tasks)
             return report
         except Exception as e:
             # Hvis AI fejler, lav en basal rapport
-            active_count = len([t for t in tasks if t.status != "done"])
-            done_count = len([t for t in tasks if t.status == "done"])
+            if status_counts is not None:
+                done_count = status_counts.get(TaskStatus.DONE.value, 0)
+                active_count = sum(status_counts.values()) - done_count
+            else:
+                done_count = len([t for t in tasks if t.status == TaskStatus.DONE])
+                active_count = len(tasks) - done_count
             return FALLBACK_TEMPLATE.format(
                 active_count=active_count,
                 done_count=done_count
-            ) 
\ No newline at end of file
+            )
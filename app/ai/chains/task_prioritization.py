@@ -1,10 +1,11 @@
 from langchain.prompts import PromptTemplate
 from langchain_community.chat_models import ChatOpenAI
 from langchain.chains import LLMChain
-from typing import Dict, List
+from typing import Awaitable, Dict, List, Optional
 from app.models.task import Task, TaskPriority
+import asyncio
 import os
-from app.core.cache import cache_response
+from app.core.cache import cache_response, task_tag
 import logging
 
 logger = logging.getLogger(__name__)
@@ -29,47 +30,67 @@ Anbefalet prioritet: [PRIORITY]
 Begrundelse: [Din detaljerede forklaring]
 """
 
+# Opgavefelterne prompten bruger; kun de indgår i cache-nøglen
+PRIORITIZATION_FIELDS = ("title", "description", "deadline", "status")
+
 class TaskPrioritizationChain:
     def __init__(self):
-        self.llm = ChatOpenAI(
-            temperature=0.3,
-            model_name="gpt-3.5-turbo",
-            openai_api_key=os.getenv("OPENAI_API_KEY")
-        )
-        self.prompt = PromptTemplate(
-            template=PRIORITIZATION_TEMPLATE,
-            input_variables=["title", "description", "deadline", "status"]
+        self._chain = None
+
+    @property
+    def chain(self) -> LLMChain:
+        # Klienten bygges ved første brug, så opstart ikke venter på den
+        if self._chain is None:
+            llm = ChatOpenAI(
+                temperature=0.3,
+                model_name="gpt-3.5-turbo",
+                openai_api_key=os.getenv("OPENAI_API_KEY")
+            )
+            prompt = PromptTemplate(
+                template=PRIORITIZATION_TEMPLATE,
+                input_variables=["title", "description", "deadline", "status"]
+            )
+            self._chain = LLMChain(llm=llm, prompt=prompt)
+        return self._chain
+
+    @cache_response(
+        expire_time=1800,
+        version=PRIORITIZATION_TEMPLATE,
+        fields=PRIORITIZATION_FIELDS,
+        tags=lambda self, task: [task_tag(task.id)],
+        lock_timeout=30
+    )
+    async def _suggest_priority(self, task: Task) -> Dict[str, str]:
+        # Fejl kastes videre, så kun gyldige forslag caches
+        response = await self.chain.arun(
+            title=task.title,
+            description=task.description or "Ingen beskrivelse",
+            deadline=task.deadline.isoformat() if task.deadline else "Ingen deadline",
+            status=task.status.value
         )
-        self.chain = LLMChain(llm=self.llm, prompt=self.prompt)
 
-    @cache_response(expire_time=1800)
-    async def get_priority_suggestion(self, task: Task) -> Dict[str, str]:
+        # Parse response
+        lines = [line.strip() for line in response.strip().split("\n") if line.strip()]
+        priority = None
+        reasoning = None
+
+        for line in lines:
+            if line.startswith("Anbefalet prioritet:"):
+                priority = line.split(":", 1)[1].strip()
+            elif line.startswith("Begrundelse:"):
+                reasoning = line.split(":", 1)[1].strip()
+
+        if not priority or not reasoning:
+            raise ValueError("Ugyldigt response format fra AI")
+
+        return {
+            "suggested_priority": priority,
+            "reasoning": reasoning
+        }
+
+    async def _with_fallback(self, suggestion: Awaitable[Dict[str, str]]) -> Dict[str, str]:
         try:
-            response = await self.chain.arun(
-                title=task.title,
-                description=task.description or "Ingen beskrivelse",
-                deadline=task.deadline.isoformat() if task.deadline else "Ingen deadline",
-                status=task.status.value
-            )
-            
-            # Parse response
-            lines = [line.strip() for line in response.strip().split("\n") if line.strip()]
-            priority = None
-            reasoning = None
-            
-            for line in lines:
-                if line.startswith("Anbefalet prioritet:"):
-                    priority = line.split(":", 1)[1].strip()
-                elif line.startswith("Begrundelse:"):
-                    reasoning = line.split(":", 1)[1].strip()
-            
-            if not priority or not reasoning:
-                raise ValueError("Ugyldigt response format fra AI")
-                
-            return {
-                "suggested_priority": priority,
-                "reasoning": reasoning
-            }
+            return await suggestion
         except Exception as e:
             logger.error(f"Fejl ved AI prioritering: {str(e)}")
             return {
@@ -77,20 +98,25 @@ class TaskPrioritizationChain:
                 "reasoning": f"Fejl: Kunne ikke analysere denne opgave ({str(e)})"
             }
 
+    async def get_priority_suggestion(self, task: Task) -> Dict[str, str]:
+        return await self._with_fallback(self._suggest_priority(task))
+
     async def batch_prioritize(self, tasks: List[Task]) -> List[Dict[str, str]]:
-        results = []
-        for task in tasks:
-            try:
-                suggestion = await self.get_priority_suggestion(task)
-                results.append({
-                    "task_id": task.id,
-                    **suggestion
-                })
-            except Exception as e:
-                logger.error(f"Fejl ved prioritering af task {task.id}: {str(e)}")
-                results.append({
-                    "task_id": task.id,
-                    "suggested_priority": "MEDIUM",
-                    "reasoning": "Fejl: Kunne ikke analysere denne opgave"
-                })
-        return results 
\ No newline at end of file
+        # Alle cachede forslag hentes med ét round trip. Misses beregnes
+        # samtidigt gennem cachens single-flight og lease, og hvert forslag
+        # gemmes så snart det er klar, også hvis batchen annulleres
+        suggest = type(self)._suggest_priority
+        cached = await suggest.get_many([((self, task), {}) for task in tasks])
+
+        async def suggestion_for(task: Task, suggestion: Optional[Dict[str, str]]) -> Dict[str, str]:
+            if suggestion is not None:
+                return suggestion
+            return await self._with_fallback(suggest.compute(self, task))
+
+        suggestions = await asyncio.gather(*(
+            suggestion_for(task, suggestion) for task, suggestion in zip(tasks, cached)
+        ))
+        return [
+            {"task_id": task.id, **suggestion}
+            for task, suggestion in zip(tasks, suggestions)
+        ]
@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import tasks, ai_assistance
+from app.api.v1.endpoints import tasks, ai_assistance, metrics
 
 api_router = APIRouter()
 
@@ -14,4 +14,10 @@ api_router.include_router(
     ai_assistance.router,
     prefix="/ai",
     tags=["ai-assistance"]
-) 
\ No newline at end of file
+)
+
+api_router.include_router(
+    metrics.router,
+    prefix="/metrics",
+    tags=["metrics"]
+)
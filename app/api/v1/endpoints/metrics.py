@@ -0,0 +1,22 @@
+from fastapi import APIRouter
+from typing import Dict
+from app.core.metrics import cache_snapshots, pool_snapshots
+
+router = APIRouter()
+
+@router.get("/db-pool", response_model=Dict[str, dict])
+async def db_pool_metrics():
+    """
+    Connection pool metrikker per engine: pool-status, checkout ventetid,
+    hvor længe forbindelser holdes, overflow og forbindelsernes levetid
+    """
+    return pool_snapshots()
+
+@router.get("/cache", response_model=Dict[str, dict])
+async def cache_metrics():
+    """
+    Cache-metrikker per cachet funktion: hits (og hvor mange fra L1),
+    stale hits, misses, hit ratio, fejl, skrivninger, Redis round trip
+    tid og størrelsen af de skrevne værdier
+    """
+    return cache_snapshots()
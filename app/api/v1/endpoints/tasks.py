@@ -1,83 +1,648 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, delete
-from typing import List
-from app.models.base import get_session
-from app.models.task import Task
-from app.schemas.task import TaskCreate, TaskUpdate, Task as TaskSchema
+from sqlalchemy import (
+    select, insert, update, delete, and_, or_, text, func, literal,
+    literal_column, table, column, cast, null, union_all
+)
+from typing import AsyncIterator, List, Literal, Optional, Union
+from datetime import datetime, timezone
+from enum import Enum
+import csv
+import io
+from app.models.base import get_session, get_read_session
+from app.models.task import (
+    TaskModel as Task, TaskTombstoneModel, TaskPriority, TaskStatus,
+    OPEN_TASK_CONDITION, POSTGRES_CHANGE_HORIZON, PRIORITY_RANK, SEARCH_DOCUMENT
+)
+from app.schemas.task import (
+    TaskCreate, TaskUpdate, Task as TaskSchema,
+    TaskBulkRequest, TaskBulkResult, TaskImportReport, TaskStats, TaskChanges
+)
+from app.core.pagination import SORT_KEYS, encode_cursor, decode_cursor
+from app.core.config import settings
+from app.core.serialization import ORJSONResponse, dumps, rows_to_dicts
+from app.core.task_reads import TASK_FIELDS, get_task_counters, get_task_row
+from app.core.etag import task_etag, list_etag, etag_matches, expected_version
+from app.core.task_import import import_tasks as run_import, parse_csv, parse_ndjson
+from app.core.cache import ALL_TASKS_TAG, invalidate_tags, task_tag
 
 router = APIRouter()
 
+# Interne kolonner som change_seq eksporteres ikke
+EXPORT_COLUMNS = [
+    "id", "title", "description", "priority", "status",
+    "deadline", "created_at", "updated_at", "version"
+]
+
+TaskSort = Literal["id", "deadline", "priority", "updated_at"]
+
+tasks_fts = table("tasks_fts", column("rowid"))
+
 @router.post("/", response_model=TaskSchema, status_code=status.HTTP_201_CREATED)
-async def create_task(task: TaskCreate, db: AsyncSession = Depends(get_session)):
+async def create_task(
+    task: TaskCreate,
+    response: Response,
+    db: AsyncSession = Depends(get_session)
+):
     db_task = Task(**task.model_dump())
     db.add(db_task)
     await db.commit()
+    await invalidate_tags(ALL_TASKS_TAG)
     await db.refresh(db_task)
+    response.headers["ETag"] = task_etag(db_task.id, db_task.version)
     return db_task
 
+@router.post("/bulk", response_model=List[TaskBulkResult])
+async def bulk_tasks(request: TaskBulkRequest, db: AsyncSession = Depends(get_session)):
+    """
+    Opret, opdater og slet mange opgaver i én transaktion.
+
+    Operationerne grupperes per type og sendes som batchede statements,
+    så antallet af round trips ikke vokser med antallet af operationer.
+    Resultatet indeholder én post per operation i samme rækkefølge.
+    """
+    operations = list(enumerate(request.operations))
+    creates = [(i, op) for i, op in operations if op.op == "create"]
+    updates = [(i, op) for i, op in operations if op.op == "update"]
+    deletes = [(i, op) for i, op in operations if op.op == "delete"]
+    results: List[Optional[TaskBulkResult]] = [None] * len(operations)
+
+    # Find hvilke af de refererede opgaver der findes med én SELECT
+    referenced_ids = [op.id for _, op in updates + deletes]
+    existing_ids = set()
+    if referenced_ids:
+        existing = await db.execute(select(Task.id).where(Task.id.in_(referenced_ids)))
+        existing_ids = set(existing.scalars().all())
+
+    for i, op in updates + deletes:
+        if op.id not in existing_ids:
+            results[i] = TaskBulkResult(
+                index=i,
+                op=op.op,
+                id=op.id,
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Task not found"
+            )
+
+    created = []
+    if creates:
+        # sort_by_parameter_order returnerer rækkerne i input-rækkefølge
+        # (databasen garanterer det ikke selv for en multi-row INSERT).
+        # render_nulls holder alle rækker på samme kolonnesæt, så de batches
+        created = (await db.scalars(
+            insert(Task)
+            .returning(Task, sort_by_parameter_order=True)
+            .execution_options(render_nulls=True),
+            [op.task.model_dump() for _, op in creates]
+        )).all()
+
+    update_rows = [
+        {"id": op.id, **op.task.model_dump(exclude_unset=True)}
+        for _, op in updates
+        if op.id in existing_ids
+    ]
+    changed_rows = [row for row in update_rows if len(row) > 1]
+    if changed_rows:
+        # ORM bulk UPDATE by primary key køres som executemany
+        await db.execute(update(Task), changed_rows)
+
+    delete_ids = [op.id for _, op in deletes if op.id in existing_ids]
+    if delete_ids:
+        await db.execute(
+            delete(Task)
+            .where(Task.id.in_(delete_ids))
+            .execution_options(synchronize_session=False)
+        )
+
+    updated = {}
+    if update_rows:
+        rows = await db.execute(
+            select(Task)
+            .where(Task.id.in_([row["id"] for row in update_rows]))
+            .execution_options(populate_existing=True)
+        )
+        updated = {task.id: task for task in rows.scalars().all()}
+
+    await db.commit()
+    if operations:
+        changed_ids = [row["id"] for row in changed_rows] + delete_ids
+        await invalidate_tags(ALL_TASKS_TAG, *map(task_tag, changed_ids))
+
+    for (i, _), task in zip(creates, created):
+        results[i] = TaskBulkResult(
+            index=i,
+            op="create",
+            id=task.id,
+            status_code=status.HTTP_201_CREATED,
+            task=TaskSchema.model_validate(task)
+        )
+    for i, op in updates:
+        if op.id in updated:
+            results[i] = TaskBulkResult(
+                index=i,
+                op="update",
+                id=op.id,
+                status_code=status.HTTP_200_OK,
+                task=TaskSchema.model_validate(updated[op.id])
+            )
+    for i, op in deletes:
+        if op.id in existing_ids:
+            results[i] = TaskBulkResult(
+                index=i,
+                op="delete",
+                id=op.id,
+                status_code=status.HTTP_204_NO_CONTENT
+            )
+
+    return results
+
+@router.post("/import", response_model=TaskImportReport)
+async def import_tasks(
+    request: Request,
+    format: Literal["ndjson", "csv"] = "ndjson",
+    batch_size: int = Query(settings.IMPORT_BATCH_SIZE, ge=1, le=10000),
+    db: AsyncSession = Depends(get_session)
+):
+    """
+    Importer opgaver fra en streamet NDJSON- eller CSV-body.
+
+    Bodyen parses mens den modtages og indsættes i batches af
+    `batch_size`, så filen aldrig ligger i hukommelsen på én gang.
+    Svaret indeholder fejl og gennemløbstid per batch.
+    """
+    parser = parse_csv if format == "csv" else parse_ndjson
+    report = await run_import(db, parser(request.stream()), batch_size=batch_size)
+    await invalidate_tags(ALL_TASKS_TAG)
+    return report
+
+def task_fields(
+    fields: Optional[str] = Query(
+        None,
+        description="Kommasepareret liste af felter, fx `id,title,status`"
+    )
+) -> Optional[List[str]]:
+    """Valider `fields` og returner felterne i skemaets rækkefølge med id først"""
+    if fields is None:
+        return None
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = requested - set(TASK_FIELDS)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}"
+        )
+    return ["id"] + [field for field in TASK_FIELDS if field in requested and field != "id"]
+
+def _field_columns(fields: List[str], *extra: str) -> list:
+    """Kolonner til SELECT: de ønskede felter plus dem vi selv skal bruge"""
+    names = dict.fromkeys([*fields, *extra])
+    return [getattr(Task, name) for name in names]
+
+def _export_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+def task_filters(
+    status_filter: Optional[List[TaskStatus]] = Query(None, alias="status"),
+    priority: Optional[List[TaskPriority]] = Query(None),
+    deadline_from: Optional[datetime] = None,
+    deadline_to: Optional[datetime] = None,
+    overdue: Optional[bool] = None,
+    sort: TaskSort = "id"
+) -> list:
+    """Byg WHERE-betingelser ud fra listevisningens filtre"""
+    conditions = []
+    if status_filter:
+        conditions.append(Task.status.in_(status_filter))
+    if priority:
+        conditions.append(Task.priority.in_(priority))
+    if sort == "priority":
+        # Filtrene gentages, så de kan bruge index'erne på (priority_rank, id),
+        # som også giver rækkerne i sorteringsorden
+        if priority:
+            conditions.append(Task.priority_rank.in_([PRIORITY_RANK[value] for value in priority]))
+        if status_filter and TaskStatus.DONE not in status_filter:
+            conditions.append(text(OPEN_TASK_CONDITION))
+    if deadline_from is not None:
+        conditions.append(Task.deadline >= deadline_from)
+    if deadline_to is not None:
+        conditions.append(Task.deadline < deadline_to)
+    if overdue is not None:
+        now = datetime.now(timezone.utc)
+        if overdue:
+            conditions.append(and_(Task.deadline < now, text(OPEN_TASK_CONDITION)))
+        else:
+            conditions.append(or_(
+                Task.deadline.is_(None),
+                Task.deadline >= now,
+                Task.status == TaskStatus.DONE
+            ))
+    return conditions
+
+def _seek(column, last_value, last_id):
+    return or_(column > last_value, and_(column == last_value, Task.id > last_id))
+
+def _apply_keyset(query, sort: str, after: Optional[str]):
+    """Tilføj ORDER BY og seek-betingelse for den valgte sortering"""
+    if sort == "deadline":
+        query = query.order_by(Task.deadline.asc().nulls_last(), Task.id.asc())
+    elif sort == "priority":
+        query = query.order_by(Task.priority_rank.asc(), Task.id.asc())
+    elif sort == "updated_at":
+        query = query.order_by(Task.updated_at.asc(), Task.id.asc())
+    else:
+        query = query.order_by(Task.id.asc())
+
+    if after is None:
+        return query
+
+    try:
+        values = decode_cursor(after, sort)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+    if sort == "deadline":
+        last_deadline, last_id = values
+        if last_deadline is None:
+            # NULL deadlines ligger sidst, så vi er i halen af listen
+            return query.where(and_(Task.deadline.is_(None), Task.id > last_id))
+        return query.where(or_(
+            _seek(Task.deadline, last_deadline, last_id),
+            Task.deadline.is_(None)
+        ))
+    if sort == "priority":
+        last_priority, last_id = values
+        last_rank = PRIORITY_RANK.get(
+            TaskPriority(last_priority) if last_priority else None,
+            len(PRIORITY_RANK)
+        )
+        return query.where(_seek(Task.priority_rank, last_rank, last_id))
+    if sort == "updated_at":
+        return query.where(_seek(Task.updated_at, *values))
+
+    (last_id,) = values
+    return query.where(Task.id > last_id)
+
+def build_task_query(
+    columns,
+    conditions: list,
+    sort: str = "id",
+    after: Optional[str] = None
+):
+    """Fælles SELECT for liste og eksport: filtre, sortering og seek"""
+    return _apply_keyset(select(*columns).where(*conditions), sort, after)
+
 @router.get("/", response_model=List[TaskSchema])
 async def read_tasks(
     skip: int = 0,
     limit: int = 100,
-    db: AsyncSession = Depends(get_session)
+    after: Optional[str] = None,
+    sort: TaskSort = "id",
+    conditions: list = Depends(task_filters),
+    fields: Optional[List[str]] = Depends(task_fields),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_session)
 ):
-    query = select(Task).offset(skip).limit(limit)
+    """
+    Hent opgaver. Brug `after` med værdien fra `X-Next-Cursor` headeren
+    for keyset pagination, som ikke bliver langsommere på dybe sider.
+    `skip` understøttes stadig for bagudkompatibilitet.
+
+    Filtre: `status` og `priority` (kan gentages), `deadline_from`,
+    `deadline_to` og `overdue`. Sortering: `sort=id|deadline|priority|updated_at`.
+
+    Med `fields` hentes og returneres kun de angivne kolonner.
+
+    Rækkerne hentes som Core tuples og serialiseres direkte med orjson
+    uden om ORM'en og response_model-valideringen.
+
+    Svaret har en ETag; sendes den tilbage i `If-None-Match` svares der
+    304 uden body, så længe siden er uændret.
+    """
+    etag_fields = fields
+    fields = fields or TASK_FIELDS
+    columns = _field_columns(fields, "version", *SORT_KEYS[sort])
+    query = build_task_query(columns, conditions, sort, after).offset(skip).limit(limit)
     result = await db.execute(query)
-    tasks = result.scalars().all()
-    return tasks
+    tasks = result.all()
+
+    headers = {"ETag": list_etag(((task.id, task.version) for task in tasks), etag_fields)}
+    if tasks and len(tasks) == limit:
+        last = tasks[-1]
+        headers["X-Next-Cursor"] = encode_cursor(
+            sort,
+            tuple(getattr(last, field) for field in SORT_KEYS[sort])
+        )
+
+    if etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return ORJSONResponse(rows_to_dicts(tasks, fields), headers=headers)
+
+async def _stream_export(
+    db: AsyncSession,
+    query,
+    export_format: str,
+    columns: List[str]
+) -> AsyncIterator[Union[str, bytes]]:
+    """
+    Stream rækker fra en server-side cursor én batch ad gangen.
+
+    `db` kommer fra en yield-dependency, som FastAPI (fra 0.118) først
+    lukker efter at responsens body er sendt.
+    """
+    result = await db.stream(
+        query.execution_options(yield_per=settings.EXPORT_BATCH_SIZE)
+    )
+
+    if export_format == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        yield buffer.getvalue()
+        async for rows in result.partitions():
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(
+                [_export_value(value) for value in row] for row in rows
+            )
+            yield buffer.getvalue()
+    else:
+        async for rows in result.partitions():
+            yield b"".join(
+                dumps(record) + b"\n" for record in rows_to_dicts(rows, columns)
+            )
+
+@router.get("/export")
+async def export_tasks(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    sort: TaskSort = "id",
+    conditions: list = Depends(task_filters),
+    fields: Optional[List[str]] = Depends(task_fields),
+    db: AsyncSession = Depends(get_read_session)
+):
+    """
+    Eksporter alle opgaver som NDJSON eller CSV.
+
+    Rækkerne hentes via en server-side cursor og streames batchvis, så
+    hukommelsesforbruget er konstant uanset tabellens størrelse.
+    Accepterer de samme filtre, sorteringer og `fields` som listen.
+    """
+    columns = EXPORT_COLUMNS if fields is None else fields
+    query = build_task_query([getattr(Task, name) for name in columns], conditions, sort)
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        _stream_export(db, query, format, columns),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="tasks.{format}"'
+        }
+    )
+
+def _fts5_query(q: str) -> Optional[str]:
+    """Citer hvert ord, så brugerinput ikke tolkes som FTS5-syntaks"""
+    terms = [term.replace('"', "") for term in q.split()]
+    terms = [f'"{term}"' for term in terms if term]
+    return " ".join(terms) or None
+
+def build_search_query(dialect: str, q: str, columns=(Task,)):
+    """Rangeret søgning: tsvector/GIN på Postgres, FTS5 på SQLite"""
+    if dialect == "postgresql":
+        document = literal_column(SEARCH_DOCUMENT)
+        ts_query = func.websearch_to_tsquery(literal_column("'simple'"), q)
+        return (
+            select(*columns)
+            .where(document.op("@@")(ts_query))
+            .order_by(func.ts_rank(document, ts_query).desc(), Task.id)
+        )
+
+    match = _fts5_query(q)
+    if match is None:
+        return None
+    fts_table = literal_column("tasks_fts")
+    return (
+        select(*columns)
+        .join(tasks_fts, tasks_fts.c.rowid == Task.id)
+        .where(fts_table.op("MATCH")(match))
+        .order_by(func.bm25(fts_table), Task.id)
+    )
+
+@router.get("/search", response_model=List[TaskSchema])
+async def search_tasks(
+    q: str = Query(..., min_length=1, max_length=200),
+    skip: int = 0,
+    limit: int = Query(20, ge=1, le=100),
+    fields: Optional[List[str]] = Depends(task_fields),
+    db: AsyncSession = Depends(get_read_session)
+):
+    """Fuldtekstsøgning i titel og beskrivelse, sorteret efter relevans"""
+    fields = fields or TASK_FIELDS
+    query = build_search_query(db.bind.dialect.name, q, _field_columns(fields))
+    if query is None:
+        return ORJSONResponse([])
+    result = await db.execute(query.offset(skip).limit(limit))
+    return ORJSONResponse(rows_to_dicts(result.all(), fields))
+
+@router.get("/stats", response_model=TaskStats)
+async def task_stats(db: AsyncSession = Depends(get_read_session)):
+    """
+    Antal opgaver i alt, per status, per prioritet og overdue.
+
+    Tællerne læses fra task_stats, som databasens triggers opdaterer ved
+    hver skrivning; shards for samme tæller lægges sammen. Overdue afhænger
+    af tidspunktet og kan ikke tælles op på forhånd, så det tælles via det
+    partielle index over åbne opgaver.
+    """
+    counters = await get_task_counters(db)
+    overdue = await db.execute(
+        select(func.count())
+        .select_from(Task)
+        .where(Task.deadline < datetime.now(timezone.utc), text(OPEN_TASK_CONDITION))
+    )
+    return TaskStats(**counters, overdue=overdue.scalar_one())
+
+def build_changes_query(
+    since: int,
+    limit: Optional[int],
+    fields: List[str] = TASK_FIELDS,
+    dialect: str = "sqlite",
+    until: Optional[int] = None
+):
+    """
+    Ændrede og slettede opgaver efter `since` (og højst `until`), sorteret
+    på change_seq.
+
+    Begge dele hentes i ét statement, så de ses fra samme snapshot og en
+    samtidig skrivning ikke kan springes over. Hver del begrænses først
+    via sit change_seq index, så prisen følger antallet af ændringer.
+    På Postgres udelades ændringer fra transaktioner der stadig kan
+    committe med et lavere nummer (se POSTGRES_CHANGE_HORIZON).
+    """
+    def window(column):
+        conditions = [column > since]
+        if until is not None:
+            conditions.append(column <= until)
+        if dialect == "postgresql":
+            conditions.append(column < literal_column(POSTGRES_CHANGE_HORIZON))
+        return conditions
+
+    changed = (
+        select(*_field_columns(fields), Task.change_seq, literal(False).label("deleted"))
+        .where(*window(Task.change_seq))
+        .order_by(Task.change_seq)
+        .limit(limit)
+        .subquery()
+    )
+    tombstone_columns = [
+        TaskTombstoneModel.task_id.label("id") if field == "id"
+        else cast(null(), getattr(Task, field).type).label(field)
+        for field in fields
+    ]
+    deleted = (
+        select(*tombstone_columns, TaskTombstoneModel.change_seq, literal(True).label("deleted"))
+        .where(*window(TaskTombstoneModel.change_seq))
+        .order_by(TaskTombstoneModel.change_seq)
+        .limit(limit)
+        .subquery()
+    )
+    changes = union_all(select(changed), select(deleted)).subquery()
+    return select(changes).order_by(changes.c.change_seq).limit(limit)
+
+@router.get("/changes", response_model=TaskChanges)
+async def task_changes(
+    since: int = Query(0, ge=0, description="`token` fra forrige svar; 0 henter alt"),
+    limit: int = Query(500, ge=1, le=5000),
+    db: AsyncSession = Depends(get_read_session)
+):
+    """
+    Opgaver oprettet, ændret eller slettet efter `since`.
+
+    Svarets `token` sendes med som `since` i næste kald. Er `has_more`
+    sand, er der flere ændringer klar med det samme.
+    """
+    dialect = db.bind.dialect.name
+    result = await db.execute(build_changes_query(since, limit + 1, dialect=dialect))
+    changes = result.all()
+    has_more = len(changes) > limit
+    if has_more:
+        # Ændringer med samme nummer (én Postgres-transaktion) deles ikke
+        # mellem to sider, da næste side starter efter tokenet. Er der flere
+        # end `limit` af dem, returneres de alle på én side
+        boundary = changes[limit].change_seq
+        changes = [row for row in changes[:limit] if row.change_seq != boundary]
+        if not changes:
+            result = await db.execute(build_changes_query(since, None, dialect=dialect, until=boundary))
+            changes = result.all()
+
+    return ORJSONResponse({
+        "token": changes[-1].change_seq if changes else since,
+        "has_more": has_more,
+        "tasks": rows_to_dicts([row for row in changes if not row.deleted], TASK_FIELDS),
+        "deleted": [row.id for row in changes if row.deleted]
+    })
 
 @router.get("/{task_id}", response_model=TaskSchema)
-async def read_task(task_id: int, db: AsyncSession = Depends(get_session)):
-    query = select(Task).where(Task.id == task_id)
-    result = await db.execute(query)
-    task = result.scalar_one_or_none()
+async def read_task(
+    task_id: int,
+    fields: Optional[List[str]] = Depends(task_fields),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_session)
+):
+    if fields is None:
+        task = await get_task_row(db, task_id)
+    else:
+        columns = _field_columns(fields, "version")
+        result = await db.execute(select(*columns).where(Task.id == task_id))
+        task = result.one_or_none()
     
     if task is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Task not found"
         )
-    return task
+
+    etag = task_etag(task.id, task.version, fields)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    return ORJSONResponse(
+        rows_to_dicts([task], fields or TASK_FIELDS)[0],
+        headers={"ETag": etag}
+    )
 
 @router.put("/{task_id}", response_model=TaskSchema)
 async def update_task(
     task_id: int,
     task_update: TaskUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     db: AsyncSession = Depends(get_session)
 ):
-    # Først tjek om tasken eksisterer
-    query = select(Task).where(Task.id == task_id)
+    """
+    Opdater en opgave. Med `If-Match` opdateres kun hvis opgavens ETag
+    stadig matcher, ellers svares der 412 (optimistic concurrency).
+    """
+    conditions = [Task.id == task_id]
+    version = expected_version(if_match, task_id) if if_match else None
+    if version is not None:
+        conditions.append(Task.version == version)
+
+    # Opdater kun de felter der er angivet i task_update
+    update_data = task_update.model_dump(exclude_unset=True)
+    if update_data:
+        # Ét UPDATE ... RETURNING i stedet for SELECT + UPDATE + refresh
+        query = (
+            update(Task)
+            .where(*conditions)
+            .values(**update_data)
+            .returning(Task)
+            .execution_options(populate_existing=True)
+        )
+    else:
+        query = select(Task).where(*conditions)
+
     result = await db.execute(query)
     task = result.scalar_one_or_none()
-    
+
     if task is None:
+        if version is not None:
+            # Skeln mellem en manglende opgave og en forældet ETag
+            exists = await db.execute(select(Task.id).where(Task.id == task_id))
+            if exists.scalar_one_or_none() is not None:
+                raise HTTPException(
+                    status_code=status.HTTP_412_PRECONDITION_FAILED,
+                    detail="Task has been modified"
+                )
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Task not found"
         )
-    
-    # Opdater kun de felter der er angivet i task_update
-    update_data = task_update.model_dump(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(task, field, value)
-    
+
     await db.commit()
-    await db.refresh(task)
+    await invalidate_tags(ALL_TASKS_TAG, task_tag(task_id))
+    response.headers["ETag"] = task_etag(task.id, task.version)
     return task
 
 @router.delete("/{task_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_task(task_id: int, db: AsyncSession = Depends(get_session)):
-    query = select(Task).where(Task.id == task_id)
+    # Ét DELETE ... RETURNING; tomt resultat betyder at tasken ikke fandtes
+    query = delete(Task).where(Task.id == task_id).returning(Task.id)
     result = await db.execute(query)
-    task = result.scalar_one_or_none()
-    
-    if task is None:
+    deleted_id = result.scalar_one_or_none()
+
+    if deleted_id is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Task not found"
         )
-    
-    await db.delete(task)
+
     await db.commit()
-    return None 
\ No newline at end of file
+    await invalidate_tags(ALL_TASKS_TAG, task_tag(task_id))
+    return None
@@ -1,8 +1,7 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 import logging
 from app.models.task import Task
-from app.ai.chains.status_report import StatusReportChain
-from app.ai.chains.task_prioritization import TaskPrioritizationChain
+from app.ai.chains.factory import get_prioritization_chain, get_status_report_chain
 from .manager import ConnectionManager
 from typing import Dict, List
 from pydantic import BaseModel
@@ -132,16 +131,17 @@ async def websocket_endpoint(websocket: WebSocket, client_id: int):
                 await manager.unsubscribe_from_task(client_id, task_id)
                 
             elif message_type == "status_request":
-                chain = StatusReportChain()
+                chain = get_status_report_chain()
                 tasks = [Task(**task) for task in data.get("tasks", [])]
-                report = await chain.generate_status_report(tasks)
+                # Opgaverne kommer fra klienten, så rapporten bygges uden om cachen
+                report = await chain.generate_status_report.uncached(chain, tasks)
                 await manager.send_personal_message(client_id, {
                     "type": "status_response",
                     "report": report
                 })
                 
             elif message_type == "priority_request":
-                chain = TaskPrioritizationChain()
+                chain = get_prioritization_chain()
                 task = Task(**data.get("task", {}))
                 suggestion = await chain.get_priority_suggestion(task)
                 
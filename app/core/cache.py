@@ -1,76 +1,640 @@
 from redis import asyncio as aioredis
-import json
-from typing import Optional, Any
+import hashlib
+import inspect
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Any, Sequence, Tuple, Union
 import os
+import sys
+import time
+import uuid
+import logging
 from functools import wraps
 import asyncio
+import orjson
+from pydantic import BaseModel
+from app.core.cache_codec import CacheCodec
+from app.core.config import settings
+from app.core.metrics import CACHE_METRICS, CacheMetrics
+from app.core.serialization import ORJSON_OPTIONS
 
-# Redis connection
+logger = logging.getLogger(__name__)
+
+# Redis connection. Værdierne er binære (se cache_codec), så svar afkodes ikke
 redis = aioredis.from_url(
     os.getenv("REDIS_URL", "redis://localhost"),
     encoding="utf-8",
-    decode_responses=True
+    decode_responses=False
+)
+
+# Identificerer denne proces i invalideringsbeskeder, så en worker ikke
+# smider sine egne netop skrevne værdier ud af L1
+WORKER_ID = uuid.uuid4().hex
+
+# Tag for cacheværdier der afhænger af alle opgaver (fx statusrapporten)
+ALL_TASKS_TAG = "all-tasks"
+
+def task_tag(task_id: int) -> str:
+    """Tag for cacheværdier der afhænger af én bestemt opgave"""
+    return f"task:{task_id}"
+
+def _tag_key(tag: str) -> str:
+    return f"tag:{tag}"
+
+def _text(value: Union[bytes, str]) -> str:
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+# Codec for nye værdier; alle kendte formater kan læses uanset valget
+default_codec = CacheCodec(
+    serializer=settings.CACHE_SERIALIZER,
+    compression=settings.CACHE_COMPRESSION or None,
+    threshold=settings.CACHE_COMPRESSION_THRESHOLD
+)
+
+class LocalCache:
+    """
+    In-process LRU-cache (L1) foran Redis.
+
+    Holder højst `max_entries` nøgler og cirka `max_bytes` data; de mindst
+    nyligt brugte nøgler smides ud først. Hver nøgle har sin egen udløbstid.
+    Bruges kun fra event loopet, så der er ingen låsning.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries: "OrderedDict[str, Tuple[float, bytes, int]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value, _ = entry
+        if expires_at <= time.monotonic():
+            self.delete(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: bytes, ttl: float):
+        self.delete(key)
+        size = sys.getsizeof(value)
+        if ttl <= 0 or size > self.max_bytes:
+            return
+        self._entries[key] = (time.monotonic() + ttl, value, size)
+        self.bytes += size
+        while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+            _, (_, _, evicted) = self._entries.popitem(last=False)
+            self.bytes -= evicted
+
+    def delete(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry[2]
+
+    def clear(self):
+        self._entries.clear()
+        self.bytes = 0
+
+# Delt af alle CacheManagers i processen; nøglerne er navngivet per funktion
+local_cache = LocalCache(
+    max_entries=settings.CACHE_LOCAL_MAX_ENTRIES,
+    max_bytes=settings.CACHE_LOCAL_MAX_BYTES
 )
 
 class CacheManager:
-    def __init__(self, expire_time: int = 3600):
-        self.redis = redis
+    """
+    To-lags cache: L1 i processen foran Redis (L2).
+
+    Læsninger prøver L1 først og går kun til Redis ved miss. Skrivninger
+    og sletninger går til begge lag og publiceres på invalideringskanalen,
+    så de andre workers fjerner nøglen fra deres L1 (se
+    `listen_for_invalidations`). L1-levetiden er kort (CACHE_LOCAL_TTL),
+    så en tabt besked højst giver en kort forældet læsning.
+
+    Værdier kodes med `codec` før de gemmes, og begge lag holder de
+    kodede bytes; `get` returnerer den afkodede værdi. Round trips til
+    Redis, fejl, skrivninger og L1-hits registreres i `metrics`.
+    """
+
+    def __init__(
+        self,
+        expire_time: int = 3600,
+        local: Optional[LocalCache] = local_cache,
+        codec: CacheCodec = default_codec,
+        metrics: Optional[CacheMetrics] = None
+    ):
         self.default_expire = expire_time
+        self.local = local if settings.CACHE_LOCAL_TTL > 0 else None
+        self.codec = codec
+        self.metrics = metrics if metrics is not None else CacheMetrics(type(self).__name__)
+
+    @property
+    def redis(self):
+        # Slås op ved hvert kald, da managers til dekoratorer oprettes ved import
+        return redis
+
+    def _local_ttl(self, expire: int) -> float:
+        return min(settings.CACHE_LOCAL_TTL, expire)
+
+    def _decode(self, key: str, value: Optional[bytes]) -> Optional[Any]:
+        # En værdi der ikke kan afkodes behandles som et miss
+        if value is None:
+            return None
+        try:
+            return self.codec.decode(value)
+        except Exception as e:
+            self.metrics.errors += 1
+            logger.warning(f"Kunne ikke afkode cacheværdien for {key}: {str(e)}")
+            return None
 
-    async def get(self, key: str) -> Optional[str]:
+    async def get(self, key: str) -> Optional[Any]:
+        if self.local is not None:
+            value = self.local.get(key)
+            if value is not None:
+                self.metrics.local_hits += 1
+                return self._decode(key, value)
         try:
-            return await self.redis.get(key)
+            with self.metrics.redis_call():
+                value = await self.redis.get(key)
         except Exception:
             return None
+        if value is not None and self.local is not None:
+            self.local.set(key, value, self._local_ttl(self.default_expire))
+        return self._decode(key, value)
+
+    async def get_many(self, keys: Sequence[str]) -> List[Optional[Any]]:
+        """Værdierne for `keys` i samme rækkefølge; L1-misses hentes med én MGET"""
+        values = [
+            self.local.get(key) if self.local is not None else None
+            for key in keys
+        ]
+        missing = [i for i, value in enumerate(values) if value is None]
+        self.metrics.local_hits += len(keys) - len(missing)
+        if missing:
+            try:
+                with self.metrics.redis_call():
+                    fetched = await self.redis.mget([keys[i] for i in missing])
+            except Exception:
+                fetched = [None] * len(missing)
+            for i, value in zip(missing, fetched):
+                values[i] = value
+                if value is not None and self.local is not None:
+                    self.local.set(keys[i], value, self._local_ttl(self.default_expire))
+        return [self._decode(key, value) for key, value in zip(keys, values)]
 
     async def set(
         self,
         key: str,
-        value: str,
-        expire: int = None
+        value: Any,
+        expire: int = None,
+        tags: Iterable[str] = ()
     ) -> bool:
+        """
+        Gem `value` under `key`. Nøglen registreres i et Redis-set per tag,
+        så den kan fjernes med `invalidate_tags`; tag-settet lever mindst
+        lige så længe som værdien.
+        """
+        tags = list(tags)
+        if tags:
+            return await self.set_many({key: value}, expire, {key: tags})
+        expire = expire or self.default_expire
+        value = self.codec.encode(value)
+        self.metrics.value_bytes.observe(len(value))
+        if self.local is not None:
+            self.local.set(key, value, self._local_ttl(expire))
         try:
-            await self.redis.set(
-                key,
-                value,
-                ex=expire or self.default_expire
-            )
+            with self.metrics.redis_call():
+                await self.redis.set(
+                    key,
+                    value,
+                    ex=expire
+                )
+        except Exception:
+            return False
+        self.metrics.sets += 1
+        await self._publish_invalidation(key)
+        return True
+
+    async def set_many(
+        self,
+        items: Dict[str, Any],
+        expire: int = None,
+        tags: Optional[Dict[str, Iterable[str]]] = None
+    ) -> bool:
+        """
+        Gem flere værdier i én pipeline (ét round trip) og publicér én
+        invalideringsbesked. `tags` angiver tags per nøgle.
+        """
+        if not items:
             return True
+        expire = expire or self.default_expire
+        tags = tags or {}
+        items = {key: self.codec.encode(value) for key, value in items.items()}
+        for key, value in items.items():
+            self.metrics.value_bytes.observe(len(value))
+            if self.local is not None:
+                self.local.set(key, value, self._local_ttl(expire))
+        try:
+            with self.metrics.redis_call():
+                async with self.redis.pipeline(transaction=False) as pipe:
+                    for key, value in items.items():
+                        pipe.set(key, value, ex=expire)
+                        for tag in tags.get(key, ()):
+                            pipe.sadd(_tag_key(tag), key)
+                            pipe.expire(_tag_key(tag), expire)
+                    await pipe.execute()
         except Exception:
             return False
+        self.metrics.sets += len(items)
+        await self._publish_invalidation(*items)
+        return True
+
+    async def invalidate_tags(self, *tags: str) -> bool:
+        """Slet alle nøgler registreret under et af `tags` i Redis og i alle L1'ere"""
+        tag_keys = [_tag_key(tag) for tag in tags]
+        try:
+            with self.metrics.redis_call():
+                keys = [_text(key) for key in await self.redis.sunion(*tag_keys)]
+                await self.redis.delete(*keys, *tag_keys)
+        except Exception as e:
+            logger.warning(f"Kunne ikke invalidere cache-tags {list(tags)}: {str(e)}")
+            return False
+        if self.local is not None:
+            for key in keys:
+                self.local.delete(key)
+        await self._publish_invalidation(*keys)
+        return True
 
     async def delete(self, key: str) -> bool:
+        if self.local is not None:
+            self.local.delete(key)
         try:
-            await self.redis.delete(key)
-            return True
+            with self.metrics.redis_call():
+                await self.redis.delete(key)
         except Exception:
             return False
+        await self._publish_invalidation(key)
+        return True
 
-def cache_response(expire_time: int = 3600):
+    async def acquire_lock(self, key: str, lease: float) -> Optional[str]:
+        """
+        Tag en lease på `key` på tværs af workers (SET NX med udløb).
+
+        Returnerer et token hvis leasen blev taget, None hvis en anden
+        holder den. Svarer Redis ikke, returneres et token alligevel, så
+        kalderen regner selv i stedet for at vente på noget der ikke kommer.
+        """
+        token = uuid.uuid4().hex
+        try:
+            with self.metrics.redis_call():
+                acquired = await self.redis.set(
+                    f"lock:{key}", token, nx=True, px=max(int(lease * 1000), 1)
+                )
+        except Exception:
+            return token
+        return token if acquired else None
+
+    async def release_lock(self, key: str, token: str):
+        # Slet kun leasen hvis den stadig er vores (den kan være udløbet)
+        try:
+            with self.metrics.redis_call():
+                await self.redis.eval(RELEASE_LOCK_SCRIPT, 1, f"lock:{key}", token)
+        except Exception:
+            pass
+
+    async def lock_held(self, key: str) -> bool:
+        """Om nogen holder leasen på `key`; svarer Redis ikke, regnes den som væk"""
+        try:
+            with self.metrics.redis_call():
+                return bool(await self.redis.exists(f"lock:{key}"))
+        except Exception:
+            return False
+
+    async def wait_for(self, key: str, timeout: float, interval: float = 0.05) -> Optional[Any]:
+        """
+        Vent op til `timeout` sekunder på at en anden worker skriver `key`.
+
+        Forsvinder leasen uden at værdien er skrevet (holderen fejlede),
+        gives der op med det samme i stedet for at vente hele `timeout`.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            value = await self.get(key)
+            if value is not None:
+                return value
+            if not await self.lock_held(key):
+                # Holderen kan have skrevet værdien lige før den slap leasen
+                return await self.get(key)
+            if time.monotonic() >= deadline:
+                return None
+            await asyncio.sleep(interval)
+
+    async def _publish_invalidation(self, *keys: str):
+        # Én besked per skrivning: "<worker id> <nøgle> [<nøgle> ...]"
+        if self.local is None or not keys:
+            return
+        try:
+            with self.metrics.redis_call():
+                await self.redis.publish(
+                    settings.CACHE_INVALIDATION_CHANNEL,
+                    " ".join((WORKER_ID, *keys))
+                )
+        except Exception as e:
+            logger.warning(f"Kunne ikke publicere cache-invalidering for {list(keys)}: {str(e)}")
+
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+async def listen_for_invalidations(channel: str = None):
+    """
+    Fjern nøgler fra L1 når andre workers skriver eller sletter dem.
+
+    Kører indtil den annulleres. Mistes forbindelsen, tømmes L1 (beskeder
+    kan være gået tabt imens) og der forbindes igen med stigende ventetid.
+    """
+    channel = channel or settings.CACHE_INVALIDATION_CHANNEL
+    delay = 1.0
+    while True:
+        pubsub = redis.pubsub()
+        try:
+            await pubsub.subscribe(channel)
+            local_cache.clear()
+            delay = 1.0
+            async for message in pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                origin, *keys = _text(message["data"]).split(" ")
+                if origin != WORKER_ID:
+                    for key in keys:
+                        local_cache.delete(key)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Cache-invalideringskanalen er afbrudt: {str(e)}")
+            local_cache.clear()
+        finally:
+            try:
+                await pubsub.reset()
+            except Exception:
+                pass
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 30.0)
+
+_invalidation_task: Optional[asyncio.Task] = None
+
+def start_cache_invalidation():
+    """Start lytteren på invalideringskanalen (kaldes ved opstart)"""
+    global _invalidation_task
+    if settings.CACHE_LOCAL_TTL > 0 and _invalidation_task is None:
+        _invalidation_task = asyncio.get_running_loop().create_task(listen_for_invalidations())
+
+# Delt manager til invalidering efter skrivninger, så dens fejl og
+# Redis-latency også ses under GET /metrics/cache
+_invalidation_cache = CacheManager(metrics=CacheMetrics(f"{__name__}.invalidate_tags"))
+CACHE_METRICS[_invalidation_cache.metrics.name] = _invalidation_cache.metrics
+
+async def invalidate_tags(*tags: str) -> bool:
+    """Invalider cachede værdier for `tags`, fx efter en skrivning til opgaver"""
+    return await _invalidation_cache.invalidate_tags(*tags)
+
+async def stop_cache_invalidation():
+    global _invalidation_task
+    task, _invalidation_task = _invalidation_task, None
+    if task is not None:
+        task.cancel()
+        try:
+            await task
+        except (asyncio.CancelledError, Exception):
+            pass
+
+KEY_OPTIONS = ORJSON_OPTIONS | orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+
+def _digest(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+def _key_default(fields: Optional[Sequence[str]]):
+    """Kanonisk form for objekter i argumenterne (pydantic-modeller, Rows, ORM-objekter)"""
+    def default(value):
+        if fields and all(hasattr(value, field) for field in fields):
+            return {field: getattr(value, field) for field in fields}
+        if isinstance(value, BaseModel):
+            return value.model_dump()
+        if hasattr(value, "_asdict"):
+            return value._asdict()
+        raise TypeError(f"{type(value).__name__} kan ikke indgå i en cache-nøgle")
+    return default
+
+def make_cache_key(
+    func,
+    args: tuple,
+    kwargs: dict,
+    version: str = "",
+    fields: Optional[Sequence[str]] = None,
+    exclude: Sequence[str] = ()
+) -> str:
+    """
+    Deterministisk cache-nøgle, ens på tværs af workers og genstarter.
+
+    Argumenterne bindes til funktionens signatur (så positionelle og
+    navngivne kald giver samme nøgle), `self`/`cls` og argumenterne i
+    `exclude` udelades, og resten serialiseres kanonisk med sorterede
+    nøgler og hashes med blake2b.
+    Er `fields` angivet, indgår kun de felter af objekter i argumenterne,
+    fx de opgavefelter en prompt faktisk bruger. `version` (typisk
+    promptskabelonen) hashes ind, så en ny skabelon giver nye nøgler.
+    """
+    bound = inspect.signature(func).bind(*args, **kwargs)
+    bound.apply_defaults()
+    arguments = {
+        name: value for name, value in bound.arguments.items()
+        if name not in ("self", "cls") and name not in exclude
+    }
+    payload = orjson.dumps(arguments, default=_key_default(fields), option=KEY_OPTIONS)
+    return f"{func.__module__}.{func.__qualname__}:{_digest(version.encode())[:8]}:{_digest(payload)}"
+
+def _log_refresh_error(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Baggrundsopdatering af cache fejlede: {str(task.exception())}")
+
+def cache_response(
+    expire_time: int = 3600,
+    version: str = "",
+    fields: Optional[Sequence[str]] = None,
+    exclude: Sequence[str] = (),
+    tags: Union[Sequence[str], Callable[..., Iterable[str]]] = (),
+    lock_timeout: Optional[float] = None,
+    stale_ttl: Optional[int] = None
+):
+    """
+    Cache resultatet af en async funktion under en deterministisk nøgle.
+
+    `version`, `fields` og `exclude` gives videre til `make_cache_key`.
+    `tags` er en liste af tags eller en funktion der kaldes med samme
+    argumenter som den dekorerede funktion og returnerer tags; værdien
+    kan så fjernes med `invalidate_tags`.
+
+    Den dekorerede funktion får `get_many(calls)` og `set_many(results)`,
+    hvor `calls` er (args, kwargs)-par og `results` (args, kwargs,
+    resultat)-tripler, så mange kald kan slås op og gemmes med ét round trip.
+    `compute(*args, **kwargs)` beregner et kald der allerede er et miss
+    uden at slå det op igen, men stadig med single-flight og lease.
+    `uncached` er den udekorerede funktion (med `self` for metoder) til
+    kald hvis resultat hverken må læses fra eller gemmes i cachen.
+
+    Samtidige misses på samme nøgle deles (single-flight): kun ét kald
+    beregner værdien, og de andre venter på dets resultat. Beregningen
+    kører som sin egen task, så den ikke afbrydes hvis den første kalder
+    annulleres. Med `lock_timeout` tages desuden en Redis-lease, så kun
+    én worker beregner; de andre venter op til `lock_timeout` sekunder på
+    værdien og beregner selv hvis den ikke kommer.
+
+    Med `stale_ttl` bruges stale-while-revalidate: værdien er frisk i
+    `expire_time` sekunder (blødt udløb), og en kopi under `<nøgle>:stale`
+    lever i yderligere `stale_ttl` sekunder (hårdt udløb). Er den friske
+    værdi udløbet eller invalideret, returneres kopien med det samme, og
+    en ny værdi beregnes i baggrunden med kaldets argumenter.
+
+    Hits, misses, fejl, skrivninger, Redis-latency og værdistørrelser
+    registreres i `wrapper.metrics`, som også findes i `CACHE_METRICS`
+    under "<modul>.<qualname>" (se GET /metrics/cache).
+    """
     def decorator(func):
+        metrics = CacheMetrics(f"{func.__module__}.{func.__qualname__}")
+        CACHE_METRICS[metrics.name] = metrics
         # Opret en delt cache manager instance for hver dekoreret funktion
-        cache = CacheManager(expire_time=expire_time)
-        
+        cache = CacheManager(expire_time=expire_time, metrics=metrics)
+        in_flight: Dict[str, asyncio.Task] = {}
+        # Baggrundsopdateringer holdes for sig: de kan give None (når en
+        # anden worker har leasen), så et almindeligt miss må ikke vente på dem
+        refreshing: Dict[str, asyncio.Task] = {}
+
+        def tags_for(args: tuple, kwargs: dict) -> list:
+            return list(tags(*args, **kwargs) if callable(tags) else tags)
+
+        async def store(cache_key: str, result, args: tuple, kwargs: dict):
+            await cache.set(cache_key, result, expire_time, tags=tags_for(args, kwargs))
+            if stale_ttl:
+                # Kopien er ikke tagget: invalidering gør kun værdien forældet
+                await cache.set(f"{cache_key}:stale", result, expire_time + stale_ttl)
+
+        async def load(cache_key: str, args: tuple, kwargs: dict, refresh: bool):
+            token = None
+            if lock_timeout:
+                token = await cache.acquire_lock(cache_key, lock_timeout)
+                if token is None:
+                    if refresh:
+                        # En anden worker opdaterer allerede værdien
+                        return None
+                    cached_result = await cache.wait_for(cache_key, lock_timeout)
+                    if cached_result is not None:
+                        return cached_result
+                    # Ingen værdi: beregn selv, under leasen hvis den er ledig
+                    token = await cache.acquire_lock(cache_key, lock_timeout)
+            try:
+                result = await func(*args, **kwargs)
+
+                # Gem resultatet i cache
+                await store(cache_key, result, args, kwargs)
+                return result
+            finally:
+                if token is not None:
+                    await cache.release_lock(cache_key, token)
+
+        def start(cache_key: str, args: tuple, kwargs: dict, refresh: bool = False) -> asyncio.Task:
+            tasks = refreshing if refresh else in_flight
+            task = tasks.get(cache_key)
+            if task is None:
+                task = asyncio.ensure_future(load(cache_key, args, kwargs, refresh))
+                tasks[cache_key] = task
+                task.add_done_callback(lambda _: tasks.pop(cache_key, None))
+                if refresh:
+                    task.add_done_callback(_log_refresh_error)
+            return task
+
         @wraps(func)
         async def wrapper(*args, **kwargs):
-            # Generer cache key baseret på funktion og argumenter
-            cache_key = f"{func.__name__}:{hash(str(args) + str(kwargs))}"
-            
+            try:
+                cache_key = make_cache_key(func, args, kwargs, version, fields, exclude)
+            except TypeError as e:
+                logger.warning(f"Springer cache over for {func.__qualname__}: {str(e)}")
+                return await func(*args, **kwargs)
+
             # Prøv at hente fra cache først
             cached_result = await cache.get(cache_key)
-            if cached_result:
-                return json.loads(cached_result)
-            
-            # Hvis ikke i cache, kald original funktion
-            result = await func(*args, **kwargs)
-            
-            # Gem resultatet i cache
-            await cache.set(
-                cache_key,
-                json.dumps(result),
-                expire_time
-            )
-            
-            return result
+            if cached_result is not None:
+                metrics.hits += 1
+                return cached_result
+
+            if stale_ttl:
+                stale_result = await cache.get(f"{cache_key}:stale")
+                if stale_result is not None:
+                    metrics.stale_hits += 1
+                    start(cache_key, args, kwargs, refresh=True)
+                    return stale_result
+
+            # Hvis ikke i cache, del beregningen med samtidige kald
+            metrics.misses += 1
+            return await asyncio.shield(start(cache_key, args, kwargs))
+
+        async def compute(*args, **kwargs):
+            """
+            Beregn og gem et kald der allerede er slået op som miss (fx med
+            `get_many`), gennem single-flight og lease som i wrapper
+            """
+            cache_key = key_for(args, kwargs)
+            if cache_key is None:
+                return await func(*args, **kwargs)
+            return await asyncio.shield(start(cache_key, args, kwargs))
+
+        def key_for(args: tuple, kwargs: dict) -> Optional[str]:
+            """Nøglen for et kald, eller None hvis argumenterne ikke kan caches"""
+            try:
+                return make_cache_key(func, args, kwargs, version, fields, exclude)
+            except TypeError as e:
+                logger.warning(f"Springer cache over for {func.__qualname__}: {str(e)}")
+                return None
+
+        async def get_many(calls: Sequence[Tuple[tuple, dict]]) -> List[Optional[Any]]:
+            """Cachede resultater for mange kald med ét round trip; None ved miss"""
+            keys = [key_for(args, kwargs) for args, kwargs in calls]
+            cacheable = [key for key in keys if key is not None]
+            found = dict(zip(cacheable, await cache.get_many(cacheable)))
+            values = [found.get(key) if key is not None else None for key in keys]
+            # Kald der ikke kan caches tælles ikke, ligesom i wrapper
+            misses = sum(1 for key in cacheable if found[key] is None)
+            metrics.hits += len(cacheable) - misses
+            metrics.misses += misses
+            return values
+
+        async def set_many(results: Sequence[Tuple[tuple, dict, Any]]):
+            """Gem resultaterne af mange kald i én pipeline"""
+            items, item_tags = {}, {}
+            for args, kwargs, result in results:
+                cache_key = key_for(args, kwargs)
+                if cache_key is None:
+                    continue
+                items[cache_key] = result
+                item_tags[cache_key] = tags_for(args, kwargs)
+            await cache.set_many(items, expire_time, item_tags)
+            if stale_ttl:
+                await cache.set_many(
+                    {f"{key}:stale": value for key, value in items.items()},
+                    expire_time + stale_ttl
+                )
+
+        # Batch-adgang, fx til batch_prioritize
+        wrapper.get_many = get_many
+        wrapper.set_many = set_many
+        wrapper.compute = compute
+        wrapper.uncached = func
+        wrapper.metrics = metrics
         return wrapper
-    return decorator 
\ No newline at end of file
+    return decorator
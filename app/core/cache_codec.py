@@ -0,0 +1,116 @@
+"""
+Kodning af cacheværdier til bytes.
+
+Hver værdi får en header på tre bytes: MAGIC, serializer og komprimering.
+Værdier over `threshold` bytes komprimeres, hvis det gør dem mindre.
+Alle kendte serializers og komprimeringer kan altid afkodes, uanset
+hvilke der er valgt til nye værdier, så et skift af codec ikke gør
+eksisterende entries ulæselige. Værdier uden header er det gamle format
+(JSON-tekst) og afkodes som sådan.
+"""
+import json
+import logging
+import zlib
+from typing import Any, Callable, Dict, NamedTuple, Optional, Union
+
+import orjson
+
+from app.core.serialization import ORJSON_OPTIONS
+
+try:
+    import ormsgpack
+except ImportError:  # valgfri afhængighed
+    ormsgpack = None
+
+try:
+    import zstandard
+except ImportError:  # valgfri afhængighed
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Kan hverken være første byte i UTF-8 (og dermed JSON) eller i msgpack
+MAGIC = b"\xc1"
+UNCOMPRESSED = b"-"
+
+class Serializer(NamedTuple):
+    id: bytes
+    dumps: Callable[[Any], bytes]
+    loads: Callable[[bytes], Any]
+
+class Compressor(NamedTuple):
+    id: bytes
+    compress: Callable[[bytes], bytes]
+    decompress: Callable[[bytes], bytes]
+
+SERIALIZERS: Dict[str, Serializer] = {
+    # Kompakt JSON uden mellemrum; orjson er i forvejen en afhængighed
+    "json": Serializer(
+        b"j",
+        lambda value: orjson.dumps(value, option=ORJSON_OPTIONS | orjson.OPT_NON_STR_KEYS),
+        orjson.loads
+    ),
+}
+if ormsgpack is not None:
+    SERIALIZERS["msgpack"] = Serializer(b"m", ormsgpack.packb, ormsgpack.unpackb)
+
+COMPRESSORS: Dict[str, Compressor] = {
+    "zlib": Compressor(b"z", lambda data: zlib.compress(data, 6), zlib.decompress),
+}
+if zstandard is not None:
+    COMPRESSORS["zstd"] = Compressor(
+        b"s",
+        zstandard.ZstdCompressor(level=3).compress,
+        zstandard.ZstdDecompressor().decompress
+    )
+
+_SERIALIZERS_BY_ID = {serializer.id: serializer for serializer in SERIALIZERS.values()}
+_COMPRESSORS_BY_ID = {compressor.id: compressor for compressor in COMPRESSORS.values()}
+
+class CacheCodec:
+    """Koder værdier med den valgte serializer og komprimering"""
+
+    def __init__(self, serializer: str = "json", compression: Optional[str] = "zlib", threshold: int = 1024):
+        if serializer not in SERIALIZERS:
+            logger.warning(f"Cache-serializer {serializer!r} er ikke tilgængelig, bruger json")
+            serializer = "json"
+        if compression and compression not in COMPRESSORS:
+            logger.warning(f"Cache-komprimering {compression!r} er ikke tilgængelig, bruger zlib")
+            compression = "zlib"
+        self.serializer = SERIALIZERS[serializer]
+        self.compressor = COMPRESSORS[compression] if compression else None
+        self.threshold = threshold
+
+    def encode(self, value: Any) -> bytes:
+        body = self.serializer.dumps(value)
+        compression = UNCOMPRESSED
+        if self.compressor is not None and len(body) >= self.threshold:
+            packed = self.compressor.compress(body)
+            if len(packed) < len(body):
+                body, compression = packed, self.compressor.id
+        return MAGIC + self.serializer.id + compression + body
+
+    def decode(self, data: Union[bytes, str]) -> Any:
+        """Afkod en værdi; rejser ValueError for ukendte formater"""
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        if not data.startswith(MAGIC):
+            return _decode_legacy(data)
+        serializer = _SERIALIZERS_BY_ID.get(data[1:2])
+        body = data[3:]
+        if data[2:3] != UNCOMPRESSED:
+            compressor = _COMPRESSORS_BY_ID.get(data[2:3])
+            if compressor is None:
+                raise ValueError(f"Ukendt komprimering {data[2:3]!r} i cacheværdi")
+            body = compressor.decompress(body)
+        if serializer is None:
+            raise ValueError(f"Ukendt serializer {data[1:2]!r} i cacheværdi")
+        return serializer.loads(body)
+
+def _decode_legacy(data: bytes) -> Any:
+    # Før codecs gemte cache_response JSON-tekst; andre værdier var rå tekst
+    text = data.decode("utf-8")
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import List, Optional
 
 class Settings(BaseSettings):
     PROJECT_NAME: str = "Task Prioritization App"
@@ -7,12 +7,43 @@ class Settings(BaseSettings):
     
     # Database settings
     DATABASE_URL: str
+    DB_ECHO: bool = False  # Log alle SQL statements
+    DB_POOL_SIZE: int = 10  # Forbindelser der holdes åbne i poolen
+    DB_MAX_OVERFLOW: int = 20  # Ekstra forbindelser ud over pool size ved spidsbelastning
+    DB_POOL_TIMEOUT: float = 30.0  # Sekunder en request venter på en ledig forbindelse
+    DB_POOL_RECYCLE: int = 1800  # Genåbn forbindelser ældre end dette (sekunder)
+    DB_POOL_PRE_PING: bool = True  # Tjek forbindelsen ved checkout
+
+    # Read replicas (JSON-liste i miljøet, fx '["postgresql+asyncpg://..."]')
+    DATABASE_REPLICA_URLS: List[str] = []
+    DB_REPLICA_MAX_LAG: float = 5.0  # Sekunder; replikaer med mere lag springes over
+    DB_REPLICA_LAG_CHECK_INTERVAL: float = 2.0  # Hvor ofte lag måles per replika
+    DB_READ_YOUR_WRITES_WINDOW: float = 10.0  # Sekunder en klient læser fra primary efter en skrivning
+
+    # Stop opstarten hvis databasen ikke er migreret til Alembic head; False giver kun en advarsel
+    DB_REQUIRE_SCHEMA_REVISION: bool = True
     
     # OpenAI settings
     OPENAI_API_KEY: str
     
+    # Byg AI-kæderne i en baggrundstråd efter opstart i stedet for ved første request
+    AI_WARM_CHAINS: bool = True
+
     # Cache settings
     CACHE_EXPIRE_TIME: int = 1800  # 30 minutter i sekunder
+    CACHE_LOCAL_TTL: float = 30.0  # Sekunder en værdi højst lever i in-process L1; 0 slår L1 fra
+    CACHE_LOCAL_MAX_ENTRIES: int = 1024  # Nøgler i L1 før de mindst brugte smides ud
+    CACHE_LOCAL_MAX_BYTES: int = 32 * 1024 * 1024  # Samlet størrelse af L1-værdier
+    CACHE_INVALIDATION_CHANNEL: str = "cache:invalidate"  # Redis pub/sub-kanal for L1-invalidering
+    CACHE_SERIALIZER: str = "json"  # "json" (kompakt, orjson) eller "msgpack" (kræver ormsgpack)
+    CACHE_COMPRESSION: str = "zlib"  # "zlib", "zstd" (kræver zstandard) eller "" for ingen
+    CACHE_COMPRESSION_THRESHOLD: int = 1024  # Bytes før en cacheværdi komprimeres
+
+    # Export settings
+    EXPORT_BATCH_SIZE: int = 1000  # Rækker per fetch fra server-side cursor
+
+    # Import settings
+    IMPORT_BATCH_SIZE: int = 1000  # Rækker per INSERT batch
     
     class Config:
         env_file = ".env"
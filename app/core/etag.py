@@ -0,0 +1,59 @@
+import hashlib
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+def fieldset_digest(fields: Sequence[str]) -> str:
+    """Kort digest af de felter en repræsentation indeholder (`?fields=`)"""
+    return hashlib.blake2b(",".join(fields).encode("ascii"), digest_size=4).hexdigest()
+
+def task_etag(task_id: int, version: int, fields: Optional[Sequence[str]] = None) -> str:
+    """
+    Stærk ETag for en enkelt opgave, afledt af dens version.
+
+    Et udsnit af felterne er en anden repræsentation og får feltsættets
+    digest med, så det aldrig matcher den fulde opgaves ETag i If-Match.
+    """
+    if fields is None:
+        return f'"{task_id}-{version}"'
+    return f'"{task_id}-{version}-{fieldset_digest(fields)}"'
+
+def list_etag(rows: Iterable[Tuple[int, int]], fields: Optional[Sequence[str]] = None) -> str:
+    """Svag ETag for en liste af opgaver ud fra (id, version) par og feltsættet"""
+    digest = hashlib.blake2b(digest_size=16)
+    if fields is not None:
+        digest.update(f"{fieldset_digest(fields)};".encode("ascii"))
+    for task_id, version in rows:
+        digest.update(f"{task_id}:{version},".encode("ascii"))
+    return f'W/"{digest.hexdigest()}"'
+
+def parse_etags(header: Optional[str]) -> List[str]:
+    """Split en If-Match/If-None-Match header op i de enkelte ETags"""
+    if not header:
+        return []
+    return [tag.strip() for tag in header.split(",") if tag.strip()]
+
+def _opaque(etag: str) -> str:
+    return etag[2:] if etag.startswith("W/") else etag
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """Svag sammenligning som bruges til If-None-Match"""
+    tags = parse_etags(header)
+    return "*" in tags or _opaque(etag) in {_opaque(tag) for tag in tags}
+
+def expected_version(header: str, task_id: int) -> Optional[int]:
+    """
+    Find den version en If-Match header forventer for en opgave.
+
+    Returnerer None for `*`, og -1 hvis ingen af headerens ETags hører
+    til opgaven, så betingelsen aldrig kan opfyldes.
+    """
+    tags = parse_etags(header)
+    if "*" in tags:
+        return None
+    prefix = f'"{task_id}-'
+    for tag in tags:
+        if tag.startswith(prefix) and tag.endswith('"'):
+            try:
+                return int(tag[len(prefix):-1])
+            except ValueError:
+                continue
+    return -1
@@ -0,0 +1,217 @@
+import bisect
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional, Sequence
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+# Bucket-grænser i sekunder
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+HOLD_BUCKETS = (0.001, 0.01, 0.1, 1.0, 10.0, 60.0)
+LIFETIME_BUCKETS = (1.0, 60.0, 600.0, 1800.0, 3600.0, 86400.0)
+REDIS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5)
+# Bucket-grænser i bytes
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+class Histogram:
+    """Simpelt kumulativt histogram med faste bucket-grænser"""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def snapshot(self) -> dict:
+        cumulative, total = {}, 0
+        for bound, count in zip([*map(str, self.buckets), "+Inf"], self.counts):
+            total += count
+            cumulative[bound] = total
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "max": round(self.max, 6),
+            "avg": round(self.sum / self.count, 6) if self.count else 0.0,
+            "buckets": cumulative
+        }
+
+class PoolMetrics:
+    """
+    Metrikker for en engines connection pool, opsamlet via pool events.
+
+    Ventetid på checkout kan ikke ses fra events alene, så den måles af
+    poolklassen fra `pool_class()`, som tager tid på `_do_get`.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.engine: Optional[AsyncEngine] = None
+        self.checkout_wait = Histogram(WAIT_BUCKETS)
+        self.checkout_hold = Histogram(HOLD_BUCKETS)
+        self.connection_lifetime = Histogram(LIFETIME_BUCKETS)
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.closes = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.peak_checked_out = 0
+        self.peak_overflow = 0
+
+    def pool_class(self, base=AsyncAdaptedQueuePool):
+        """Poolklasse der måler hvor længe en checkout venter på en forbindelse"""
+        metrics = self
+
+        class InstrumentedPool(base):
+            def _do_get(self):
+                started = time.perf_counter()
+                try:
+                    return super()._do_get()
+                except PoolTimeoutError:
+                    metrics.timeouts += 1
+                    raise
+                finally:
+                    metrics.checkout_wait.observe(time.perf_counter() - started)
+
+        return InstrumentedPool
+
+    def attach(self, engine: AsyncEngine):
+        self.engine = engine
+        target = engine.sync_engine
+        event.listen(target, "connect", self._on_connect)
+        event.listen(target, "checkout", self._on_checkout)
+        event.listen(target, "checkin", self._on_checkin)
+        event.listen(target, "close", self._on_close)
+        event.listen(target, "close_detached", self._on_close_detached)
+        event.listen(target, "invalidate", self._on_invalidate)
+        event.listen(target, "soft_invalidate", self._on_invalidate)
+        POOL_METRICS[self.name] = self
+
+    def _pool(self):
+        return self.engine.sync_engine.pool if self.engine else None
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        self.connects += 1
+        connection_record.info["connected_at"] = time.monotonic()
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        self.checkouts += 1
+        connection_record.info["checked_out_at"] = time.monotonic()
+        pool = self._pool()
+        if hasattr(pool, "checkedout"):
+            self.peak_checked_out = max(self.peak_checked_out, pool.checkedout())
+            self.peak_overflow = max(self.peak_overflow, pool.overflow())
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        self.checkins += 1
+        checked_out_at = connection_record.info.pop("checked_out_at", None)
+        if checked_out_at is not None:
+            self.checkout_hold.observe(time.monotonic() - checked_out_at)
+
+    def _on_close(self, dbapi_connection, connection_record):
+        self.closes += 1
+        connected_at = connection_record.info.pop("connected_at", None)
+        if connected_at is not None:
+            self.connection_lifetime.observe(time.monotonic() - connected_at)
+
+    def _on_close_detached(self, dbapi_connection):
+        self.closes += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        self.invalidations += 1
+
+    def snapshot(self) -> dict:
+        pool = self._pool()
+        state = {}
+        if hasattr(pool, "checkedout"):
+            state = {
+                "size": pool.size(),
+                "checked_in": pool.checkedin(),
+                "checked_out": pool.checkedout(),
+                "overflow": max(pool.overflow(), 0),
+                "max_overflow": pool._max_overflow,
+                "timeout": pool.timeout(),
+            }
+        return {
+            "pool": state,
+            "checkouts": self.checkouts,
+            "checkins": self.checkins,
+            "connects": self.connects,
+            "closes": self.closes,
+            "invalidations": self.invalidations,
+            "timeouts": self.timeouts,
+            "peak_checked_out": self.peak_checked_out,
+            "peak_overflow": max(self.peak_overflow, 0),
+            "checkout_wait_seconds": self.checkout_wait.snapshot(),
+            "checkout_hold_seconds": self.checkout_hold.snapshot(),
+            "connection_lifetime_seconds": self.connection_lifetime.snapshot(),
+        }
+
+# Alle instrumenterede pools, navngivet efter engine (fx "primary")
+POOL_METRICS: Dict[str, PoolMetrics] = {}
+
+def pool_snapshots() -> Dict[str, dict]:
+    return {name: metrics.snapshot() for name, metrics in POOL_METRICS.items()}
+
+class CacheMetrics:
+    """
+    Metrikker for én cachet funktion (se `cache_response`).
+
+    Hits, stale hits og misses tælles per kald af den dekorerede funktion;
+    `local_hits` er de opslag (friske eller stale) der blev besvaret fra L1
+    uden om Redis.
+    Round trips til Redis tidsmåles med `redis_call()`, som også tæller
+    fejl, og `value_bytes` er størrelsen af de kodede værdier der skrives.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.redis_latency = Histogram(REDIS_BUCKETS)
+        self.value_bytes = Histogram(SIZE_BUCKETS)
+        self.hits = 0
+        self.local_hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.sets = 0
+
+    @contextmanager
+    def redis_call(self):
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self.redis_latency.observe(time.perf_counter() - started)
+
+    def snapshot(self) -> dict:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "hits": self.hits,
+            "local_hits": self.local_hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "sets": self.sets,
+            "hit_ratio": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+            "redis_latency_seconds": self.redis_latency.snapshot(),
+            "value_bytes": self.value_bytes.snapshot(),
+        }
+
+# Metrikker per dekoreret funktion, navngivet "<modul>.<qualname>"
+CACHE_METRICS: Dict[str, CacheMetrics] = {}
+
+def cache_snapshots() -> Dict[str, dict]:
+    return {name: metrics.snapshot() for name, metrics in CACHE_METRICS.items()}
@@ -0,0 +1,47 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+# Sorteringsnøgler der understøttes af keyset pagination.
+# Hver nøgle afsluttes altid med id, så rækkefølgen er entydig.
+SORT_KEYS = {
+    "id": ("id",),
+    "deadline": ("deadline", "id"),
+    "priority": ("priority", "id"),
+    "updated_at": ("updated_at", "id"),
+}
+
+DATETIME_KEYS = {"deadline", "updated_at"}
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if hasattr(value, "value"):
+        return value.value
+    return value
+
+def encode_cursor(sort: str, values: Tuple[Any, ...]) -> str:
+    """Byg en opak cursor ud fra sorteringsnøglen og sidste rækkes værdier"""
+    payload = json.dumps(
+        [sort, [_encode_value(v) for v in values]],
+        separators=(",", ":")
+    )
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, sort: str) -> List[Optional[Any]]:
+    """Afkod en cursor og valider at den hører til den valgte sortering.
+
+    Rejser ValueError hvis cursoren er ugyldig.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, values = json.loads(base64.urlsafe_b64decode(padded))
+        if cursor_sort != sort or len(values) != len(SORT_KEYS[sort]):
+            raise ValueError("Cursor matcher ikke sorteringen")
+        return [
+            datetime.fromisoformat(v) if field in DATETIME_KEYS and v is not None else v
+            for field, v in zip(SORT_KEYS[sort], values)
+        ]
+    except Exception as e:
+        raise ValueError(f"Ugyldig cursor: {cursor}") from e
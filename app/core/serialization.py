@@ -0,0 +1,25 @@
+from typing import Any, Iterable, List
+
+import orjson
+from fastapi.responses import JSONResponse
+
+# OPT_UTC_Z giver samme "Z"-suffiks for UTC som pydantic
+ORJSON_OPTIONS = orjson.OPT_UTC_Z
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, option=ORJSON_OPTIONS)
+
+class ORJSONResponse(JSONResponse):
+    """JSON response der serialiserer med orjson i stedet for json.dumps"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+def rows_to_dicts(rows: Iterable, fields: List[str]) -> List[dict]:
+    """
+    Byg dicts direkte fra Core Row tuples, hvis første kolonner er `fields`.
+
+    Værdierne (datetime, enums) serialiseres af orjson, så der hverken
+    oprettes ORM-objekter eller køres pydantic-validering per række.
+    """
+    return [dict(zip(fields, row)) for row in rows]
@@ -0,0 +1,194 @@
+import csv
+import json
+import logging
+import time
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Union
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.task import TaskModel
+from app.schemas.task import TaskCreate, TaskImportBatch, TaskImportError, TaskImportReport
+
+logger = logging.getLogger(__name__)
+
+# Begræns antallet af fejl der rapporteres per batch, så en helt
+# ugyldig fil ikke giver et svar på størrelse med selve filen
+MAX_ERRORS_PER_BATCH = 20
+
+# Postgres tillader højst 32767 bind-parametre i én statement
+MAX_BIND_PARAMS = 32767
+
+def _decode(line: bytes) -> Union[str, UnicodeDecodeError]:
+    try:
+        return line.decode("utf-8").rstrip("\r")
+    except UnicodeDecodeError as e:
+        return e
+
+async def iter_lines(
+    chunks: AsyncIterator[bytes]
+) -> AsyncIterator[Tuple[int, Union[str, UnicodeDecodeError]]]:
+    """
+    Del en strøm af bytes op i linjer uden at læse det hele i hukommelsen.
+    Linjer der ikke er gyldig UTF-8 gives videre som exception.
+    """
+    buffer = b""
+    line_no = 0
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_no += 1
+            yield line_no, _decode(line)
+    if buffer:
+        yield line_no + 1, _decode(buffer)
+
+async def parse_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, object]]:
+    """Parse NDJSON til (linjenummer, dict) par. Ugyldige linjer gives videre som exception"""
+    async for line_no, line in iter_lines(chunks):
+        if isinstance(line, UnicodeDecodeError):
+            yield line_no, line
+            continue
+        if not line.strip():
+            continue
+        try:
+            yield line_no, json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_no, e
+
+async def parse_csv(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, object]]:
+    """Parse CSV med header-række til (linjenummer, dict) par"""
+    header: Optional[List[str]] = None
+    record = ""
+    record_line = 0
+    broken: Optional[UnicodeDecodeError] = None
+    async for line_no, line in iter_lines(chunks):
+        if isinstance(line, UnicodeDecodeError):
+            # Posten afvises, men linjen læses med erstatningstegn, så
+            # anførselstegnene stadig afgør hvor posten slutter
+            broken = broken or line
+            line = line.object.decode("utf-8", "replace").rstrip("\r")
+        if not record:
+            record_line = line_no
+            record = line
+        else:
+            record += "\n" + line
+        # Et ulige antal anførselstegn betyder at et felt fortsætter på næste linje
+        if record.count('"') % 2:
+            continue
+
+        values, record = next(csv.reader([record])), ""
+        if broken is not None:
+            yield record_line, broken
+            broken = None
+            if header is not None:
+                continue
+        if header is None:
+            header = values
+            continue
+        if not any(values):
+            continue
+        # Tomme felter betyder "ikke angivet", så skemaets defaults gælder
+        yield record_line, {
+            key: value for key, value in zip(header, values) if value != ""
+        }
+
+def build_insert_statements(dialect: str, rows: List[Dict]) -> List[Tuple[object, Optional[List[Dict]]]]:
+    """
+    Byg INSERT-statements til en batch som (statement, parametre) par.
+
+    asyncpg kører executemany som én prepared statement pr. række, så på
+    Postgres bygges i stedet INSERT ... VALUES (...), (...) i bidder under
+    grænsen for bind-parametre. SQLite bruger Core executemany.
+    """
+    table = TaskModel.__table__
+    if dialect != "postgresql":
+        return [(insert(table), rows)]
+    # Kolonner med Python-defaults får også en parameter, så tæl alle kolonner
+    size = MAX_BIND_PARAMS // len(table.columns)
+    return [
+        (insert(table).values(rows[start:start + size]), None)
+        for start in range(0, len(rows), size)
+    ]
+
+async def _insert_batch(
+    db: AsyncSession,
+    batch_no: int,
+    rows: List[Dict],
+    errors: List[TaskImportError],
+    invalid: int,
+    started: float
+) -> TaskImportBatch:
+    total = len(rows) + invalid
+    failed = invalid
+    if rows:
+        try:
+            for statement, params in build_insert_statements(db.bind.dialect.name, rows):
+                await db.execute(statement, params)
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Fejl ved import af batch {batch_no}: {str(e)}")
+            failed = total
+            # Batchfejlen står først, så loftet over antal fejl ikke skjuler den
+            errors.insert(0, TaskImportError(line=None, message=str(e)))
+
+    return TaskImportBatch(
+        batch=batch_no,
+        rows=total,
+        inserted=total - failed,
+        failed=failed,
+        errors=errors[:MAX_ERRORS_PER_BATCH],
+        seconds=round(time.perf_counter() - started, 6)
+    )
+
+async def import_tasks(
+    db: AsyncSession,
+    records: AsyncIterator[Tuple[int, object]],
+    batch_size: int = 1000
+) -> TaskImportReport:
+    """
+    Valider og indsæt opgaver batchvis.
+
+    Hver batch committes for sig, så en fejlende batch ikke ruller
+    allerede importerede rækker tilbage.
+    """
+    started = time.perf_counter()
+    batches: List[TaskImportBatch] = []
+    rows: List[Dict] = []
+    errors: List[TaskImportError] = []
+    invalid = 0
+    batch_started = time.perf_counter()
+
+    async for line_no, record in records:
+        try:
+            if isinstance(record, Exception):
+                raise record
+            rows.append(TaskCreate.model_validate(record).model_dump())
+        except (ValidationError, ValueError, TypeError) as e:
+            invalid += 1
+            errors.append(TaskImportError(line=line_no, message=str(e)))
+
+        if len(rows) + invalid >= batch_size:
+            batches.append(await _insert_batch(
+                db, len(batches) + 1, rows, errors, invalid, batch_started
+            ))
+            rows, errors, invalid = [], [], 0
+            batch_started = time.perf_counter()
+
+    if rows or invalid:
+        batches.append(await _insert_batch(
+            db, len(batches) + 1, rows, errors, invalid, batch_started
+        ))
+
+    seconds = time.perf_counter() - started
+    inserted = sum(batch.inserted for batch in batches)
+    return TaskImportReport(
+        total_rows=sum(batch.rows for batch in batches),
+        inserted=inserted,
+        failed=sum(batch.failed for batch in batches),
+        seconds=round(seconds, 6),
+        rows_per_second=round(inserted / seconds, 1) if seconds > 0 else 0.0,
+        batches=batches
+    )
@@ -0,0 +1,73 @@
+"""
+Læsesti for opgaver uden om ORM'en.
+
+Forespørgslerne vælger tasks-tabellens kolonner med Core og returnerer
+SQLAlchemy Rows (named tuples) i stedet for ORM-objekter, så der ikke
+bygges identity map, instrumenterede attributter eller change tracking
+for data der kun læses. Rows har samme attributnavne som TaskModel, så
+de kan gives direkte til AI-kæderne.
+
+Statements med fast form bygges som lambda statements, så både
+konstruktionen og den kompilerede SQL caches efter første kald; kun
+parametrene (fx task_id) trækkes ud af lambdaen ved hvert kald.
+"""
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, lambda_stmt, select, text
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.task import TaskModel, TaskStatModel, OPEN_TASK_CONDITION
+from app.schemas.task import Task as TaskSchema
+
+# Kolonnerne i response-skemaets rækkefølge, så rækkerne kan gives direkte
+# til rows_to_dicts
+TASK_FIELDS = list(TaskSchema.model_fields)
+TASK_COLUMNS = tuple(getattr(TaskModel, field) for field in TASK_FIELDS)
+OPEN_TASKS = text(OPEN_TASK_CONDITION)
+
+async def get_task_row(db: AsyncSession, task_id: int) -> Optional[Row]:
+    result = await db.execute(
+        lambda_stmt(lambda: select(*TASK_COLUMNS).where(TaskModel.id == task_id))
+    )
+    return result.one_or_none()
+
+async def get_open_task_rows(db: AsyncSession) -> List[Row]:
+    """
+    Alle opgaver der ikke er afsluttet, tidligste deadline først.
+
+    Sorteringen følger det partielle index ix_tasks_open_deadline, så det
+    kan bruges uden ekstra sortering; sorteret på id valgte SQLite i
+    stedet en fuld scan af tabellen.
+    """
+    result = await db.execute(lambda_stmt(
+        lambda: select(*TASK_COLUMNS)
+        .where(OPEN_TASKS)
+        .order_by(TaskModel.deadline, TaskModel.id)
+    ))
+    return result.all()
+
+async def get_all_task_rows(db: AsyncSession) -> List[Row]:
+    result = await db.execute(
+        lambda_stmt(lambda: select(*TASK_COLUMNS).order_by(TaskModel.id))
+    )
+    return result.all()
+
+async def get_task_counters(db: AsyncSession) -> Dict[str, dict]:
+    """
+    Tællerne fra task_stats som {"total": n, "by_status": {...}, "by_priority": {...}}.
+
+    Shards for samme tæller lægges sammen; der læses højst et par hundrede
+    små rækker uanset antallet af opgaver.
+    """
+    result = await db.execute(lambda_stmt(
+        lambda: select(TaskStatModel.dimension, TaskStatModel.value, func.sum(TaskStatModel.task_count))
+        .group_by(TaskStatModel.dimension, TaskStatModel.value)
+    ))
+    counters = {"total": 0, "by_status": {}, "by_priority": {}}
+    for dimension, value, count in result:
+        if dimension == "total":
+            counters["total"] = count
+        else:
+            counters[f"by_{dimension}"][value] = count
+    return counters
@@ -4,6 +4,9 @@ from app.models.base import init_db, close_db
 from app.api.v1.api import api_router
 from app.api.v1.ws.dialog import router as ws_router
 from app.core.config import settings
+from app.core.cache import start_cache_invalidation, stop_cache_invalidation
+from app.ai.chains.factory import warm_chains
+import asyncio
 import logging
 
 app = FastAPI(title=settings.PROJECT_NAME)
@@ -15,6 +18,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 # Include routers
@@ -24,9 +28,15 @@ app.include_router(ws_router)
 @app.on_event("startup")
 async def startup_event():
     await init_db()
+    start_cache_invalidation()
+    if settings.AI_WARM_CHAINS:
+        # Langchain-import og klientoprettelse sker i en tråd, så appen
+        # kan svare på requests imens
+        asyncio.get_running_loop().run_in_executor(None, warm_chains)
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    await stop_cache_invalidation()
     await close_db()
 
 @app.get("/")
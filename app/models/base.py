@@ -1,54 +1,229 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import declarative_base, sessionmaker
 from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy import event, text
+from fastapi import Request, Response
+from pathlib import Path
+from typing import List, Optional, Tuple
+import logging
+import math
 import os
+import time
 from dotenv import load_dotenv
+from app.core.config import settings
+from app.core.metrics import PoolMetrics
 
 load_dotenv()
+logger = logging.getLogger(__name__)
+
+def _normalize_url(url: Optional[str]) -> Optional[str]:
+    # Konverter postgres:// til postgresql:// (Heroku specifik fix)
+    if url and url.startswith("postgres://"):
+        return url.replace("postgres://", "postgresql+asyncpg://", 1)
+    return url
 
 # Hent database URL fra miljøvariabel
-DATABASE_URL = os.getenv("DATABASE_URL")
+DATABASE_URL = _normalize_url(os.getenv("DATABASE_URL"))
+
+def create_instrumented_engine(url: str, name: str) -> AsyncEngine:
+    """Opret en async engine med pool-indstillinger fra settings og pool-metrikker"""
+    metrics = PoolMetrics(name)
+    engine = create_async_engine(
+        url,
+        echo=settings.DB_ECHO,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        poolclass=metrics.pool_class()
+    )
+    metrics.attach(engine)
+    return engine
 
-# Konverter postgres:// til postgresql:// (Heroku specifik fix)
-if DATABASE_URL and DATABASE_URL.startswith("postgres://"):
-    DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql+asyncpg://", 1)
+def _session_factory(bind: AsyncEngine) -> sessionmaker:
+    return sessionmaker(
+        bind,
+        class_=AsyncSession,
+        expire_on_commit=False,
+        autocommit=False,
+        autoflush=False
+    )
 
 # Opret async engine
-engine: AsyncEngine = create_async_engine(
-    DATABASE_URL,
-    echo=True,  # SQL logging
-    pool_pre_ping=True,  # Connection health checks
-    pool_size=10,  # Maximum number of connections in the pool
-    max_overflow=20  # Maximum number of connections that can be created beyond pool_size
-)
+engine: AsyncEngine = create_instrumented_engine(DATABASE_URL, "primary")
 
 # Opret async session factory
-async_session = sessionmaker(
-    engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-    autocommit=False,
-    autoflush=False
-)
+async_session = _session_factory(engine)
 
 # Base class for SQLAlchemy models
 Base = declarative_base()
 
+# Replikaens forsinkelse i sekunder. 0 når den har afspillet alt den har
+# modtaget (ellers ville en primary uden skrivninger ligne stort lag)
+REPLICA_LAG_QUERY = text(
+    "SELECT CASE "
+    "WHEN NOT pg_is_in_recovery() THEN 0 "
+    "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE extract(epoch FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+class ReplicaRouter:
+    """
+    Fordel læsninger round-robin over read replicas.
+
+    Hver replikas lag måles højst én gang per `check_interval` og caches.
+    Replikaer der halter mere end `max_lag` bagefter (eller ikke svarer)
+    springes over; er ingen brugbare, returneres None og der læses fra primary.
+    """
+
+    def __init__(self, replicas: List[AsyncEngine], max_lag: float, check_interval: float):
+        self.replicas = replicas
+        self.factories = [_session_factory(replica) for replica in replicas]
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._lag: List[Tuple[float, float]] = [(-math.inf, 0.0)] * len(replicas)
+        self._next = 0
+
+    async def _measure_lag(self, replica: AsyncEngine) -> float:
+        if replica.dialect.name != "postgresql":
+            return 0.0
+        async with replica.connect() as conn:
+            lag = (await conn.execute(REPLICA_LAG_QUERY)).scalar()
+        return math.inf if lag is None else float(lag)
+
+    async def replica_lag(self, index: int) -> float:
+        checked_at, lag = self._lag[index]
+        now = time.monotonic()
+        if now - checked_at < self.check_interval:
+            return lag
+        try:
+            lag = await self._measure_lag(self.replicas[index])
+        except Exception as e:
+            logger.warning(f"Replika {index} svarer ikke: {str(e)}")
+            lag = math.inf
+        self._lag[index] = (now, lag)
+        return lag
+
+    async def pick(self) -> Optional[sessionmaker]:
+        """Session factory for den næste replika inden for max lag, ellers None"""
+        count = len(self.replicas)
+        for offset in range(count):
+            index = (self._next + offset) % count
+            if await self.replica_lag(index) <= self.max_lag:
+                self._next = index + 1
+                return self.factories[index]
+        return None
+
+replica_router = ReplicaRouter(
+    [
+        create_instrumented_engine(_normalize_url(url), f"replica-{i}")
+        for i, url in enumerate(settings.DATABASE_REPLICA_URLS)
+    ],
+    max_lag=settings.DB_REPLICA_MAX_LAG,
+    check_interval=settings.DB_REPLICA_LAG_CHECK_INTERVAL
+)
+
+# Read-your-writes: efter en skrivning får klienten en cookie, og indtil
+# den udløber læser klienten fra primary, så den altid ser sine egne ændringer
+STICKY_COOKIE = "db_read_primary_until"
+
+def track_writes(session: AsyncSession, response: Response):
+    """Sæt sticky-cookien på `response` når sessionen committer skrivninger"""
+    sync_session = session.sync_session
+
+    def on_execute(state):
+        if state.is_insert or state.is_update or state.is_delete:
+            sync_session.info["wrote"] = True
+
+    def on_flush(session, flush_context):
+        session.info["wrote"] = True
+
+    def on_rollback(session):
+        session.info.pop("wrote", None)
+
+    def on_commit(session):
+        if session.info.pop("wrote", False):
+            window = settings.DB_READ_YOUR_WRITES_WINDOW
+            response.set_cookie(
+                STICKY_COOKIE,
+                f"{time.time() + window:.3f}",
+                max_age=math.ceil(window),
+                httponly=True,
+                samesite="lax"
+            )
+
+    event.listen(sync_session, "do_orm_execute", on_execute)
+    event.listen(sync_session, "after_flush", on_flush)
+    event.listen(sync_session, "after_rollback", on_rollback)
+    event.listen(sync_session, "after_commit", on_commit)
+
+def reads_pinned_to_primary(request: Request) -> bool:
+    try:
+        return float(request.cookies.get(STICKY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
 # Dependency for FastAPI
-async def get_session() -> AsyncSession:
+async def get_session(response: Response) -> AsyncSession:
     async with async_session() as session:
+        if replica_router.replicas:
+            track_writes(session, response)
+        try:
+            yield session
+        finally:
+            await session.close()
+
+async def get_read_session(request: Request) -> AsyncSession:
+    """
+    Session til rene læsninger. Går til en read replica når der er en med
+    acceptabelt lag og klienten ikke lige har skrevet, ellers til primary.
+    """
+    factory = None
+    if replica_router.replicas and not reads_pinned_to_primary(request):
+        factory = await replica_router.pick()
+    async with (factory or async_session)() as session:
         try:
             yield session
         finally:
             await session.close()
 
+ALEMBIC_DIR = Path(__file__).resolve().parents[2] / "alembic"
+
+def alembic_heads() -> set:
+    # Alembic importeres først her, da det kun bruges ved opstart
+    from alembic.script import ScriptDirectory
+    return set(ScriptDirectory(str(ALEMBIC_DIR)).get_heads())
+
+async def current_revisions() -> set:
+    try:
+        async with engine.connect() as conn:
+            result = await conn.execute(text("SELECT version_num FROM alembic_version"))
+            return set(result.scalars().all())
+    except Exception:
+        return set()
+
 # Database initialization function
 async def init_db():
-    async with engine.begin() as conn:
-        # Uncomment next line to drop all tables (CAREFUL!)
-        # await conn.run_sync(Base.metadata.drop_all)
-        await conn.run_sync(Base.metadata.create_all)
+    """
+    Tjek at databasen er migreret til Alembic head.
+
+    Skemaet oprettes og ændres kun af `alembic upgrade head`, så opstarten
+    nøjes med én forespørgsel i stedet for at inspicere alle tabeller.
+    """
+    current, heads = await current_revisions(), alembic_heads()
+    if current == heads:
+        return
+    message = (
+        f"Databasens skema er på revision {sorted(current) or 'ingen'}, "
+        f"forventet {sorted(heads)}. Kør `alembic upgrade head`."
+    )
+    if settings.DB_REQUIRE_SCHEMA_REVISION:
+        raise RuntimeError(message)
+    logger.warning(message)
 
 # Database cleanup function
 async def close_db():
-    await engine.dispose() 
\ No newline at end of file
+    await engine.dispose()
+    for replica in replica_router.replicas:
+        await replica.dispose()
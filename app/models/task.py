@@ -2,6 +2,11 @@ from pydantic import BaseModel
 from datetime import datetime
 from enum import Enum
 from typing import Any
+from sqlalchemy import (
+    BigInteger, Column, Computed, Integer, String, Text, DateTime, Enum as SAEnum, Index, DDL, event, insert
+)
+from sqlalchemy.sql import func, text
+from app.models.base import Base
 
 class TaskStatus(str, Enum):
     TODO = "TODO"
@@ -14,6 +19,304 @@ class TaskPriority(str, Enum):
     HIGH = "HIGH"
     URGENT = "URGENT"
 
+# Betingelsen for åbne opgaver skrives som ren SQL med en literal, så
+# SQLite's query planner kan matche den mod partial index'et nedenfor
+OPEN_TASK_CONDITION = "status != 'DONE'"
+
+# Mest presserende først; opgaver uden prioritet sorteres sidst
+PRIORITY_RANK = {
+    TaskPriority.URGENT: 0,
+    TaskPriority.HIGH: 1,
+    TaskPriority.MEDIUM: 2,
+    TaskPriority.LOW: 3,
+}
+
+# Udtrykket bag den genererede kolonne priority_rank
+PRIORITY_RANK_EXPRESSION = (
+    "CASE priority "
+    + " ".join(f"WHEN '{priority.value}' THEN {rank}" for priority, rank in PRIORITY_RANK.items())
+    + f" ELSE {len(PRIORITY_RANK)} END"
+)
+
+class TaskModel(Base):
+    """SQLAlchemy model for tasks-tabellen"""
+    __tablename__ = "tasks"
+
+    id = Column(Integer, primary_key=True, index=True)
+    title = Column(String(100), nullable=False)
+    description = Column(Text, nullable=True)
+    priority = Column(SAEnum(TaskPriority), default=TaskPriority.MEDIUM)
+    # Beregnes af databasen ud fra priority og bruges til sort=priority
+    priority_rank = Column(Integer, Computed(PRIORITY_RANK_EXPRESSION, persisted=True))
+    status = Column(SAEnum(TaskStatus), default=TaskStatus.TODO)
+    deadline = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    # Tælles op ved hver UPDATE og bruges som ETag/optimistic concurrency token
+    version = Column(Integer, nullable=False, default=1, server_default="1", onupdate=text("version + 1"))
+    # Monoton ændringsnummer sat af triggers ved hver INSERT/UPDATE (se change feed nedenfor)
+    change_seq = Column(BigInteger, nullable=True)
+
+    __table_args__ = (
+        # Understøtter keyset pagination sorteret på (deadline, id)
+        Index("ix_tasks_deadline_id", "deadline", "id"),
+        Index("ix_tasks_updated_at_id", "updated_at", "id"),
+        Index("ix_tasks_change_seq", "change_seq"),
+        # Filtrering på status/prioritet/deadline fra listevisningen
+        Index("ix_tasks_status_priority_deadline", "status", "priority", "deadline"),
+        # Åbne opgaver (fx overdue) uden at indeksere de afsluttede
+        Index(
+            "ix_tasks_open_deadline",
+            "deadline",
+            postgresql_where=text(OPEN_TASK_CONDITION),
+            sqlite_where=text(OPEN_TASK_CONDITION)
+        ),
+        # Keyset pagination sorteret på (priority_rank, id), også for kun åbne opgaver
+        Index("ix_tasks_priority_rank_id", "priority_rank", "id"),
+        Index(
+            "ix_tasks_open_priority_rank_id",
+            "priority_rank",
+            "id",
+            postgresql_where=text(OPEN_TASK_CONDITION),
+            sqlite_where=text(OPEN_TASK_CONDITION)
+        ),
+    )
+
+    def __repr__(self):
+        return f"<TaskModel(id={self.id}, title='{self.title}', status='{self.status}')>"
+
+# Fuldtekstsøgning over titel og beskrivelse.
+# Postgres: GIN index på et tsvector-udtryk, som holdes opdateret af databasen selv.
+# SQLite: FTS5 tabel med external content, som holdes i sync af triggers.
+SEARCH_DOCUMENT = "to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(description, ''))"
+
+POSTGRES_SEARCH_DDL = [
+    f"CREATE INDEX IF NOT EXISTS ix_tasks_search ON tasks USING gin ({SEARCH_DOCUMENT})",
+]
+
+SQLITE_SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts "
+    "USING fts5(title, description, content='tasks', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_ai AFTER INSERT ON tasks BEGIN "
+    "INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_ad AFTER DELETE ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_au AFTER UPDATE OF title, description ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); "
+    "END",
+]
+
+for statement in POSTGRES_SEARCH_DDL:
+    event.listen(TaskModel.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+for statement in SQLITE_SEARCH_DDL:
+    event.listen(TaskModel.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+event.listen(
+    TaskModel.__table__,
+    "before_drop",
+    DDL("DROP TABLE IF EXISTS tasks_fts").execute_if(dialect="sqlite")
+)
+
+class TaskStatModel(Base):
+    """
+    Tællere for opgaver per status og prioritet.
+
+    Rækkerne holdes ajour af triggers på tasks-tabellen, så statistikken
+    kan læses uden at scanne alle opgaver. Hver tæller er delt i shards,
+    som summeres ved læsning (se TASK_STAT_SHARDS).
+    """
+    __tablename__ = "task_stats"
+
+    dimension = Column(String(20), primary_key=True)
+    value = Column(String(20), primary_key=True)
+    shard = Column(Integer, primary_key=True, default=0, server_default="0")
+    task_count = Column(Integer, nullable=False, default=0, server_default="0")
+
+# Én række per tæller og shard, så triggers kun behøver UPDATE (aldrig upsert)
+TASK_STAT_ROWS = (
+    [("total", "all")]
+    + [("status", status.value) for status in TaskStatus]
+    + [("priority", priority.value) for priority in TaskPriority]
+)
+
+# Postgres: hver forbindelse skriver i sin egen shard (backend-pid modulo
+# antallet), så samtidige skrivere ikke venter på de samme tællerrækker.
+# SQLite har kun én skriver ad gangen og bruger derfor kun shard 0.
+TASK_STAT_SHARDS = 16
+POSTGRES_STAT_SHARD = f"pg_backend_pid() % {TASK_STAT_SHARDS}"
+
+@event.listens_for(TaskStatModel.__table__, "after_create")
+def _seed_task_stats(target, connection, **kw):
+    shards = TASK_STAT_SHARDS if connection.dialect.name == "postgresql" else 1
+    connection.execute(insert(target), [
+        {"dimension": dimension, "value": value, "shard": shard, "task_count": 0}
+        for dimension, value in TASK_STAT_ROWS
+        for shard in range(shards)
+    ])
+
+# Postgres: statement-level triggers med transition tables, så en bulk
+# INSERT/UPDATE/DELETE giver én aggregeret opdatering af tællerne.
+def _postgres_stats_delta(*sources) -> str:
+    deltas = []
+    for rows, sign, with_total in sources:
+        deltas += [
+            f"SELECT 'status' AS dimension, status::text AS value, {sign}1 AS n FROM {rows}",
+            f"SELECT 'priority', priority::text, {sign}1 FROM {rows} WHERE priority IS NOT NULL",
+        ]
+        if with_total:
+            deltas.append(f"SELECT 'total', 'all', {sign}1 FROM {rows}")
+    return (
+        "UPDATE task_stats s SET task_count = s.task_count + d.n FROM ("
+        "SELECT dimension, value, sum(n) AS n FROM ("
+        + " UNION ALL ".join(deltas)
+        + ") deltas GROUP BY dimension, value HAVING sum(n) <> 0"
+        ") d WHERE s.dimension = d.dimension AND s.value = d.value "
+        f"AND s.shard = {POSTGRES_STAT_SHARD};"
+    )
+
+POSTGRES_STATS_DDL = [
+    "CREATE OR REPLACE FUNCTION task_stats_apply() RETURNS trigger AS $$ BEGIN "
+    "IF TG_OP = 'INSERT' THEN "
+    + _postgres_stats_delta(("new_rows", "+", True))
+    + " ELSIF TG_OP = 'UPDATE' THEN "
+    + _postgres_stats_delta(("new_rows", "+", False), ("old_rows", "-", False))
+    + " ELSE "
+    + _postgres_stats_delta(("old_rows", "-", True))
+    + " END IF; RETURN NULL; END $$ LANGUAGE plpgsql",
+    "CREATE TRIGGER task_stats_ai AFTER INSERT ON tasks "
+    "REFERENCING NEW TABLE AS new_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION task_stats_apply()",
+    "CREATE TRIGGER task_stats_au AFTER UPDATE ON tasks "
+    "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION task_stats_apply()",
+    "CREATE TRIGGER task_stats_ad AFTER DELETE ON tasks "
+    "REFERENCING OLD TABLE AS old_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION task_stats_apply()",
+]
+
+# SQLite har kun row-level triggers
+SQLITE_STATS_DDL = [
+    "CREATE TRIGGER IF NOT EXISTS task_stats_ai AFTER INSERT ON tasks BEGIN "
+    "UPDATE task_stats SET task_count = task_count + 1 "
+    "WHERE shard = 0 AND ((dimension = 'status' AND value = new.status) "
+    "OR (dimension = 'priority' AND value = new.priority) "
+    "OR dimension = 'total'); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS task_stats_ad AFTER DELETE ON tasks BEGIN "
+    "UPDATE task_stats SET task_count = task_count - 1 "
+    "WHERE shard = 0 AND ((dimension = 'status' AND value = old.status) "
+    "OR (dimension = 'priority' AND value = old.priority) "
+    "OR dimension = 'total'); "
+    "END",
+    # IS i stedet for =: prioriteten kan være NULL, og NULL i summen gør task_count NULL
+    "CREATE TRIGGER IF NOT EXISTS task_stats_au AFTER UPDATE OF status, priority ON tasks "
+    "WHEN old.status IS NOT new.status OR old.priority IS NOT new.priority BEGIN "
+    "UPDATE task_stats SET task_count = task_count "
+    "+ ((dimension = 'status' AND value IS new.status) OR (dimension = 'priority' AND value IS new.priority)) "
+    "- ((dimension = 'status' AND value IS old.status) OR (dimension = 'priority' AND value IS old.priority)) "
+    "WHERE shard = 0 AND dimension IN ('status', 'priority') "
+    "AND value IN (old.status, new.status, old.priority, new.priority); "
+    "END",
+]
+
+for statement in POSTGRES_STATS_DDL:
+    event.listen(TaskModel.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+for statement in SQLITE_STATS_DDL:
+    event.listen(TaskModel.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+
+class TaskChangeSeqModel(Base):
+    """
+    Én række med det senest uddelte ændringsnummer (SQLite). På Postgres
+    ændres den ikke længere, men lægges til transaktions-id'et (se nedenfor).
+    """
+    __tablename__ = "task_change_seq"
+
+    id = Column(Integer, primary_key=True)
+    last_seq = Column(BigInteger, nullable=False, default=0, server_default="0")
+
+@event.listens_for(TaskChangeSeqModel.__table__, "after_create")
+def _seed_task_change_seq(target, connection, **kw):
+    connection.execute(insert(target), [{"id": 1, "last_seq": 0}])
+
+class TaskTombstoneModel(Base):
+    """Slettede opgaver, så change feed'et også kan melde sletninger"""
+    __tablename__ = "task_tombstones"
+
+    task_id = Column(Integer, primary_key=True)
+    change_seq = Column(BigInteger, nullable=False, index=True)
+    deleted_at = Column(DateTime(timezone=True), server_default=func.now())
+
+# Change feed: hver skrivning stempler rækken (eller dens tombstone) med et
+# ændringsnummer, og en klient der har set nummer N må aldrig senere få en
+# ændring med et lavere nummer.
+#
+# Postgres: nummeret er skrivetransaktionens id (plus task_change_seq.last_seq,
+# så det ligger over numrene fra før). Der er ingen fælles række at låse, så
+# skrivere venter ikke på hinanden. Hverken en SEQUENCE eller transaktions-
+# id'er følger commit-rækkefølgen, men alle transaktioner med id under
+# snapshottets xmin er afsluttede. Feed'et returnerer derfor kun ændringer
+# under den grænse (POSTGRES_CHANGE_HORIZON), og ingen senere commit kan få
+# et lavere nummer. Alle rækker fra én transaktion får samme nummer.
+POSTGRES_CHANGE_DDL = [
+    "CREATE OR REPLACE FUNCTION task_current_change_seq() RETURNS bigint AS $$ "
+    "SELECT last_seq + pg_current_xact_id()::text::bigint FROM task_change_seq "
+    "$$ LANGUAGE sql",
+    "CREATE OR REPLACE FUNCTION task_change_apply() RETURNS trigger AS $$ BEGIN "
+    "IF TG_OP = 'DELETE' THEN "
+    "INSERT INTO task_tombstones (task_id, change_seq, deleted_at) "
+    "VALUES (OLD.id, task_current_change_seq(), now()) "
+    "ON CONFLICT (task_id) DO UPDATE "
+    "SET change_seq = EXCLUDED.change_seq, deleted_at = EXCLUDED.deleted_at; "
+    "RETURN OLD; "
+    "END IF; "
+    "NEW.change_seq := task_current_change_seq(); "
+    "IF TG_OP = 'INSERT' THEN DELETE FROM task_tombstones WHERE task_id = NEW.id; END IF; "
+    "RETURN NEW; END $$ LANGUAGE plpgsql",
+    "CREATE TRIGGER task_change_biu BEFORE INSERT OR UPDATE ON tasks "
+    "FOR EACH ROW EXECUTE FUNCTION task_change_apply()",
+    "CREATE TRIGGER task_change_ad AFTER DELETE ON tasks "
+    "FOR EACH ROW EXECUTE FUNCTION task_change_apply()",
+]
+
+# Laveste ændringsnummer en igangværende eller fremtidig transaktion kan få
+POSTGRES_CHANGE_HORIZON = (
+    "(SELECT last_seq + pg_snapshot_xmin(pg_current_snapshot())::text::bigint "
+    "FROM task_change_seq)"
+)
+
+# SQLite har kun én skriver ad gangen, så her tælles task_change_seq op per
+# skrivning. SQLite kan ikke ændre NEW i en trigger, så rækken stemples med en UPDATE.
+# WHEN-betingelsen forhindrer at stemplingen selv udløser en ny ændring.
+_SQLITE_STAMP_CHANGE = (
+    "UPDATE task_change_seq SET last_seq = last_seq + 1; "
+    "UPDATE tasks SET change_seq = (SELECT last_seq FROM task_change_seq) WHERE id = new.id; "
+)
+
+SQLITE_CHANGE_DDL = [
+    "CREATE TRIGGER IF NOT EXISTS task_change_ai AFTER INSERT ON tasks BEGIN "
+    + _SQLITE_STAMP_CHANGE
+    + "DELETE FROM task_tombstones WHERE task_id = new.id; "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS task_change_au AFTER UPDATE ON tasks "
+    "WHEN new.change_seq IS old.change_seq BEGIN "
+    + _SQLITE_STAMP_CHANGE
+    + "END",
+    "CREATE TRIGGER IF NOT EXISTS task_change_ad AFTER DELETE ON tasks BEGIN "
+    "UPDATE task_change_seq SET last_seq = last_seq + 1; "
+    "INSERT OR REPLACE INTO task_tombstones (task_id, change_seq, deleted_at) "
+    "VALUES (old.id, (SELECT last_seq FROM task_change_seq), CURRENT_TIMESTAMP); "
+    "END",
+]
+
+for statement in POSTGRES_CHANGE_DDL:
+    event.listen(TaskModel.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+for statement in SQLITE_CHANGE_DDL:
+    event.listen(TaskModel.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+
 class Task(BaseModel):
     id: int
     title: str
@@ -1,6 +1,6 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 from datetime import datetime
-from typing import Optional
+from typing import Annotated, Dict, List, Literal, Optional, Union
 from app.models.task import TaskPriority, TaskStatus
 
 class TaskBase(BaseModel):
@@ -24,9 +24,79 @@ class TaskInDB(TaskBase):
     id: int
     created_at: datetime
     updated_at: datetime
+    version: int
 
     class Config:
         from_attributes = True
 
 class Task(TaskInDB):
-    pass 
\ No newline at end of file
+    pass 
+
+class TaskBulkCreate(BaseModel):
+    op: Literal["create"] = "create"
+    task: TaskCreate
+
+class TaskBulkUpdate(BaseModel):
+    op: Literal["update"] = "update"
+    id: int
+    task: TaskUpdate
+
+class TaskBulkDelete(BaseModel):
+    op: Literal["delete"] = "delete"
+    id: int
+
+TaskBulkOperation = Annotated[
+    Union[TaskBulkCreate, TaskBulkUpdate, TaskBulkDelete],
+    Field(discriminator="op")
+]
+
+class TaskBulkRequest(BaseModel):
+    operations: List[TaskBulkOperation] = Field(..., min_length=1, max_length=1000)
+
+    @model_validator(mode="after")
+    def check_unique_ids(self):
+        # Samme opgave må kun optræde én gang, ellers er rækkefølgen tvetydig
+        ids = [op.id for op in self.operations if op.op != "create"]
+        if len(ids) != len(set(ids)):
+            raise ValueError("Hver task id må kun optræde én gang per bulk request")
+        return self
+
+class TaskBulkResult(BaseModel):
+    index: int
+    op: Literal["create", "update", "delete"]
+    status_code: int
+    id: Optional[int] = None
+    task: Optional[Task] = None
+    detail: Optional[str] = None
+
+class TaskImportError(BaseModel):
+    line: Optional[int] = None
+    message: str
+
+class TaskImportBatch(BaseModel):
+    batch: int
+    rows: int
+    inserted: int
+    failed: int
+    errors: List[TaskImportError] = []
+    seconds: float
+
+class TaskImportReport(BaseModel):
+    total_rows: int
+    inserted: int
+    failed: int
+    seconds: float
+    rows_per_second: float
+    batches: List[TaskImportBatch]
+
+class TaskStats(BaseModel):
+    total: int
+    by_status: Dict[TaskStatus, int]
+    by_priority: Dict[TaskPriority, int]
+    overdue: int
+
+class TaskChanges(BaseModel):
+    token: int
+    has_more: bool
+    tasks: List[Task]
+    deleted: List[int]
@@ -0,0 +1,89 @@
+"""
+Benchmark af kodning af cacheværdier.
+
+Sammenligner det gamle format (json.dumps-tekst) med de tilgængelige
+kombinationer af serializer og komprimering i app.core.cache_codec for
+typiske værdier: ét prioriteringsforslag, en batch af forslag og en
+statusrapport. Viser størrelse i bytes og median for encode/decode.
+
+Brug:
+    python -m benchmarks.bench_cache_codec
+    python -m benchmarks.bench_cache_codec --batch 200 --threshold 512 --repeat 5000
+"""
+import argparse
+import json
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.ai.chains.status_report import FALLBACK_TEMPLATE
+from app.core.cache_codec import COMPRESSORS, SERIALIZERS, CacheCodec
+
+def suggestion(i: int) -> Dict[str, str]:
+    return {
+        "suggested_priority": ("HIGH", "MEDIUM", "LOW")[i % 3],
+        "reasoning": f"Opgave {i} har deadline om {i % 7 + 1} dage og blokerer andre opgaver i sprintet, "
+                     "så den bør løses før de øvrige opgaver på listen."
+    }
+
+def status_report(tasks: int) -> str:
+    lines = [
+        f"- Opgave {i}: {('I gang', 'Afventer review', 'Blokeret af leverandør')[i % 3]}, "
+        f"deadline om {i % 14 + 1} dage"
+        for i in range(tasks)
+    ]
+    return (
+        "1. Overordnet status\nProjektet skrider frem som planlagt, med enkelte forsinkelser.\n\n"
+        "2. Fremskridt i dag\n" + "\n".join(lines) + "\n\n"
+        "3. Blokeringer/Udfordringer\nTo opgaver afventer svar fra leverandøren.\n\n"
+        "4. Næste skridt\n" + FALLBACK_TEMPLATE.format(active_count=tasks, done_count=tasks // 3)
+    )
+
+def payloads(batch: int) -> Dict[str, Any]:
+    return {
+        "forslag": suggestion(0),
+        f"batch ({batch})": [suggestion(i) for i in range(batch)],
+        "statusrapport": status_report(40),
+    }
+
+def codecs(threshold: int) -> List[Tuple[str, Callable[[Any], bytes], Callable[[bytes], Any]]]:
+    result = [(
+        "gammel json",
+        lambda value: json.dumps(value).encode("utf-8"),
+        lambda data: json.loads(data)
+    )]
+    compressions: List[Optional[str]] = [None, *COMPRESSORS]
+    for serializer in SERIALIZERS:
+        for compression in compressions:
+            codec = CacheCodec(serializer, compression, threshold)
+            result.append((f"{serializer}+{compression or 'ingen'}", codec.encode, codec.decode))
+    return result
+
+def median_us(operation: Callable[[], Any], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        operation()
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return timings[len(timings) // 2] * 1_000_000
+
+def main(batch: int, threshold: int, repeat: int):
+    for name, value in payloads(batch).items():
+        print(f"\n{name}")
+        print(f"{'codec':<16} {'bytes':>8} {'encode µs':>10} {'decode µs':>10}")
+        for label, encode, decode in codecs(threshold):
+            data = encode(value)
+            assert decode(data) == value
+            print(
+                f"{label:<16} {len(data):>8} "
+                f"{median_us(lambda: encode(value), repeat):>10.1f} "
+                f"{median_us(lambda: decode(data), repeat):>10.1f}"
+            )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--batch", type=int, default=50)
+    parser.add_argument("--threshold", type=int, default=1024)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+    main(args.batch, args.threshold, args.repeat)
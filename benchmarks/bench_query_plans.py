@@ -0,0 +1,350 @@
+"""
+Forespørgselsplaner for alle forespørgsler fra tasks- og AI-endpoints.
+
+Kører et fast sæt requests mod en seedet database og opsamler hvert
+SQL-statement endpoints sender (via `before_cursor_execute`). For hvert
+statement hentes planen og en estimeret pris:
+
+  - SQLite: `EXPLAIN QUERY PLAN`. SQLite har ingen prisestimater, så
+    prisen er antal afviklede VM-instruktioner (via progress handleren)
+    når statementet køres i en transaktion der rulles tilbage. Med samme
+    seed er tallet deterministisk.
+  - Postgres: `EXPLAIN (FORMAT JSON)` og planens "Total Cost".
+
+Resultatet sammenlignes med `query_plan_baseline.json`; testen i
+tests/test_api/test_query_plans.py fejler ved fuld tabelscan uden for
+FULL_SCANS eller når prisen vokser mere end COST_TOLERANCE over baseline.
+
+Brug:
+    python -m benchmarks.bench_query_plans
+    python -m benchmarks.bench_query_plans --update-baseline
+    python -m benchmarks.bench_query_plans --url postgresql+asyncpg://localhost/plans
+
+Bemærk: `--url` mod Postgres dropper og genopretter tabellerne.
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import sqlite3
+import tempfile
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event, insert
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.core.pagination import encode_cursor
+from app.main import app
+from app.models.base import Base, _session_factory, get_read_session, get_session
+from app.models.task import TaskModel, TaskPriority, TaskStatus
+
+BASELINE_PATH = Path(__file__).with_name("query_plan_baseline.json")
+SEED_ROWS = 5000
+# Tilladt vækst i pris før det regnes som en regression; COST_SLACK
+# dækker små statements hvor få instruktioner er en stor relativ ændring
+COST_TOLERANCE = 1.25
+COST_SLACK = 200
+# Progress handleren kaldes for hver N'te VM-instruktion
+SQLITE_STEP = 10
+
+# Scenarier hvor en fuld scan af tasks er tilsigtet
+FULL_SCANS = {
+    "list_default": "sorteret på primærnøglen; stopper efter LIMIT",
+    "list_sparse": "sorteret på primærnøglen; stopper efter LIMIT",
+    "list_skip": "offset-paginering over primærnøglen; stopper efter OFFSET + LIMIT",
+    "export_ndjson": "eksport af hele tabellen",
+    # Uden STAT4 antager SQLite at hver status dækker en tredjedel af
+    # tabellen, og så er en scan i id-rækkefølge billigere end index + sortering
+    "export_csv_open": "eksport af alle matchende rækker i id-rækkefølge",
+    "status_report": "rapporten bygges over alle opgaver",
+}
+
+# Tabeller med et fast, lille antal rækker, hvor en scan er billigst
+SMALL_TABLES = {"task_stats", "task_change_seq"}
+
+API = "/api/v1"
+# Seed og filtre er relative til nu, så data og planer er stabile over tid
+NOW = datetime.utcnow().replace(microsecond=0)
+
+# (navn, metode, sti, kwargs til TestClient.request)
+SCENARIOS = [
+    ("list_default", "GET", "/tasks/", {}),
+    ("list_sparse", "GET", "/tasks/", {"params": {"fields": "title,status"}}),
+    ("list_skip", "GET", "/tasks/", {"params": {"skip": 200, "limit": 50}}),
+    ("list_after_id", "GET", "/tasks/", {
+        "params": {"after": encode_cursor("id", (2500,)), "limit": 50}
+    }),
+    ("list_status_priority", "GET", "/tasks/", {
+        "params": {"status": TaskStatus.TODO.value, "priority": TaskPriority.HIGH.value,
+                   "sort": "deadline"}
+    }),
+    ("list_open_by_priority", "GET", "/tasks/", {
+        "params": {"status": [TaskStatus.TODO.value, TaskStatus.IN_PROGRESS.value],
+                   "sort": "priority"}
+    }),
+    ("list_urgent", "GET", "/tasks/", {
+        "params": {"priority": TaskPriority.URGENT.value, "sort": "priority"}
+    }),
+    ("list_overdue", "GET", "/tasks/", {"params": {"overdue": "true"}}),
+    ("list_overdue_by_deadline", "GET", "/tasks/", {
+        "params": {"overdue": "true", "sort": "deadline"}
+    }),
+    ("list_deadline_window", "GET", "/tasks/", {
+        "params": {"deadline_from": NOW.isoformat(),
+                   "deadline_to": (NOW + timedelta(days=31)).isoformat(), "sort": "deadline"}
+    }),
+    ("export_ndjson", "GET", "/tasks/export", {}),
+    ("export_csv_open", "GET", "/tasks/export", {
+        "params": {"format": "csv", "status": TaskStatus.TODO.value}
+    }),
+    ("search", "GET", "/tasks/search", {"params": {"q": "Seed 42"}}),
+    ("stats", "GET", "/tasks/stats", {}),
+    ("changes", "GET", "/tasks/changes", {"params": {"since": SEED_ROWS - 50}}),
+    ("read_task", "GET", "/tasks/42", {}),
+    ("read_task_sparse", "GET", "/tasks/42", {"params": {"fields": "title"}}),
+    ("create_task", "POST", "/tasks/", {"json": {"title": "Plan opgave"}}),
+    ("update_task", "PUT", "/tasks/43", {
+        "json": {"status": TaskStatus.DONE.value}, "headers": {"If-Match": '"43-1"'}
+    }),
+    ("update_task_stale", "PUT", "/tasks/43", {
+        "json": {"title": "Forældet"}, "headers": {"If-Match": '"43-1"'}
+    }),
+    ("delete_task", "DELETE", "/tasks/44", {}),
+    ("bulk", "POST", "/tasks/bulk", {"json": {"operations": [
+        {"op": "create", "task": {"title": "Bulk opgave"}},
+        {"op": "update", "id": 45, "task": {"priority": TaskPriority.LOW.value}},
+        {"op": "delete", "id": 46},
+    ]}}),
+    ("import", "POST", "/tasks/import", {
+        "content": b'{"title": "Importeret 1"}\n{"title": "Importeret 2"}\n'
+    }),
+    ("prioritize", "POST", "/ai/prioritize/42", {}),
+    ("prioritize_batch", "POST", "/ai/prioritize-batch", {}),
+    ("status_report", "GET", "/ai/status-report", {}),
+]
+
+@dataclass
+class CapturedQuery:
+    key: str
+    sql: str
+    params: tuple
+    plan: List[str] = field(default_factory=list)
+    cost: float = 0.0
+
+    @property
+    def full_scans(self) -> List[str]:
+        return [line for line in self.plan if _is_full_scan(line)]
+
+def _is_full_scan(line: str) -> bool:
+    # SQLite: "SCAN tasks" (men ikke "SCAN tasks USING INDEX ..." eller
+    # virtuelle FTS-tabeller); Postgres: "Seq Scan on tasks"
+    match = re.match(r"(?:SCAN|Seq Scan on) (\w+)(.*)", line)
+    if not match or match.group(1) not in Base.metadata.tables:
+        return False
+    return match.group(1) not in SMALL_TABLES and "USING" not in match.group(2)
+
+def seed_rows(count: int = SEED_ROWS) -> List[dict]:
+    """Realistisk fordeling: de fleste opgaver afsluttede, deadlines omkring nu"""
+    rnd = random.Random(1)
+    start = NOW - timedelta(days=365 + 182)
+    return [
+        {
+            "title": f"Seed {i}",
+            "status": TaskStatus.DONE if rnd.random() < 0.9
+            else rnd.choice([TaskStatus.TODO, TaskStatus.IN_PROGRESS]),
+            "priority": rnd.choices(list(TaskPriority), [40, 40, 15, 5])[0],
+            "deadline": start + timedelta(hours=rnd.randint(0, 24 * 365 * 3)),
+        }
+        for i in range(count)
+    ]
+
+async def seed(engine: AsyncEngine, count: int = SEED_ROWS):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(TaskModel.__table__), seed_rows(count))
+    async with engine.connect() as conn:
+        await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.exec_driver_sql("ANALYZE")
+
+def _stub_chains():
+    prioritization = MagicMock()
+    prioritization.get_priority_suggestion = AsyncMock(return_value={"priority": "HIGH"})
+    prioritization.batch_prioritize = AsyncMock(return_value=[])
+    status_report = MagicMock()
+    status_report.generate_status_report = AsyncMock(return_value="Rapport")
+    module = "app.api.v1.endpoints.ai_assistance"
+    return (
+        patch(f"{module}.get_prioritization_chain", return_value=prioritization),
+        patch(f"{module}.get_status_report_chain", return_value=status_report),
+    )
+
+def capture(engine: AsyncEngine, scenarios=SCENARIOS) -> List[CapturedQuery]:
+    """Kør scenarierne gennem appen og opsaml de statements de udløser"""
+    captured: List[CapturedQuery] = []
+    current = {"name": None, "count": 0}
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        if current["name"] is None:
+            return
+        if executemany:
+            # Planen er den samme for alle parametersæt
+            parameters = parameters[0]
+        current["count"] += 1
+        captured.append(CapturedQuery(
+            key=f"{current['name']}#{current['count']}",
+            sql=statement,
+            params=tuple(parameters or ())
+        ))
+
+    factory = _session_factory(engine)
+
+    async def session_override():
+        async with factory() as session:
+            yield session
+
+    overrides = dict(app.dependency_overrides)
+    app.dependency_overrides[get_session] = session_override
+    app.dependency_overrides[get_read_session] = session_override
+    event.listen(engine.sync_engine, "before_cursor_execute", on_execute)
+    prioritization, status_report = _stub_chains()
+    try:
+        with prioritization, status_report:
+            client = TestClient(app)
+            for name, method, path, kwargs in scenarios:
+                current.update(name=name, count=0)
+                response = client.request(method, API + path, **kwargs)
+                if response.status_code >= 500:
+                    raise RuntimeError(f"{name}: {response.status_code} {response.text}")
+                current["name"] = None
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", on_execute)
+        app.dependency_overrides.clear()
+        app.dependency_overrides.update(overrides)
+    return captured
+
+def explain_sqlite(path: str, queries: List[CapturedQuery]):
+    conn = sqlite3.connect(path, isolation_level=None)
+    steps = {"count": 0}
+
+    def on_progress():
+        steps["count"] += 1
+        return 0
+
+    try:
+        for query in queries:
+            rows = conn.execute(f"EXPLAIN QUERY PLAN {query.sql}", query.params).fetchall()
+            query.plan = [row[-1] for row in rows]
+            steps["count"] = 0
+            conn.set_progress_handler(on_progress, SQLITE_STEP)
+            conn.execute("BEGIN")
+            try:
+                conn.execute(query.sql, query.params).fetchall()
+            finally:
+                conn.execute("ROLLBACK")
+                conn.set_progress_handler(None, 0)
+            query.cost = steps["count"] * SQLITE_STEP
+    finally:
+        conn.close()
+
+def _postgres_nodes(node: dict) -> List[str]:
+    line = node["Node Type"]
+    if "Relation Name" in node:
+        line += f" on {node['Relation Name']}"
+    if "Index Name" in node:
+        line += f" using {node['Index Name']}"
+    return [line] + [
+        child_line
+        for child in node.get("Plans", [])
+        for child_line in _postgres_nodes(child)
+    ]
+
+async def explain_postgres(engine: AsyncEngine, queries: List[CapturedQuery]):
+    # EXPLAIN uden ANALYZE udfører ikke statementet, så DML er harmløst
+    async with engine.connect() as conn:
+        for query in queries:
+            result = await conn.exec_driver_sql(
+                f"EXPLAIN (FORMAT JSON) {query.sql}", query.params
+            )
+            document = result.scalar()
+            if isinstance(document, str):
+                document = json.loads(document)
+            root = document[0]["Plan"]
+            query.plan = _postgres_nodes(root)
+            query.cost = root["Total Cost"]
+
+def collect(url: Optional[str] = None) -> Dict[str, CapturedQuery]:
+    """Seed, kør scenarierne og returner planer og priser per statement-nøgle"""
+    with tempfile.TemporaryDirectory() as tmp:
+        url = url or f"sqlite+aiosqlite:///{tmp}/plans.db"
+        # NullPool: TestClient kører hver request i sin egen event loop
+        engine = create_async_engine(url, poolclass=NullPool)
+        asyncio.run(seed(engine))
+        queries = capture(engine)
+        if engine.dialect.name == "sqlite":
+            explain_sqlite(engine.url.database, queries)
+        else:
+            asyncio.run(explain_postgres(engine, queries))
+        asyncio.run(engine.dispose())
+    return {query.key: query for query in queries}
+
+def load_baseline(dialect: str) -> Dict[str, dict]:
+    if not BASELINE_PATH.exists():
+        return {}
+    return json.loads(BASELINE_PATH.read_text()).get(dialect, {})
+
+def save_baseline(dialect: str, queries: Dict[str, CapturedQuery]):
+    baseline = json.loads(BASELINE_PATH.read_text()) if BASELINE_PATH.exists() else {}
+    baseline[dialect] = {
+        key: {"sql": query.sql, "plan": query.plan, "cost": query.cost}
+        for key, query in queries.items()
+    }
+    BASELINE_PATH.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+
+def regressions(queries: Dict[str, CapturedQuery], baseline: Dict[str, dict]) -> List[str]:
+    """Fulde scans uden for FULL_SCANS og priser der er vokset over baseline"""
+    problems = []
+    for key, query in queries.items():
+        scenario = key.split("#")[0]
+        if query.full_scans and scenario not in FULL_SCANS:
+            problems.append(f"{key}: fuld scan ({'; '.join(query.full_scans)})\n  {query.sql}")
+        expected = baseline.get(key)
+        if expected is None:
+            problems.append(f"{key}: ingen baseline\n  {query.sql}")
+        elif query.cost > max(expected["cost"] * COST_TOLERANCE, expected["cost"] + COST_SLACK):
+            problems.append(
+                f"{key}: pris {query.cost:g} > baseline {expected['cost']:g}\n  {query.sql}"
+            )
+    return problems
+
+def main(url: Optional[str], update_baseline: bool):
+    queries = collect(url)
+    dialect = create_async_engine(url).dialect.name if url else "sqlite"
+    baseline = load_baseline(dialect)
+
+    print(f"{'statement':<28} {'pris':>10} {'baseline':>10}  plan")
+    for key, query in queries.items():
+        expected = baseline.get(key, {}).get("cost")
+        expected = f"{expected:g}" if expected is not None else "-"
+        print(f"{key:<28} {query.cost:>10g} {expected:>10}  {' | '.join(query.plan)}")
+
+    problems = regressions(queries, baseline)
+    if update_baseline:
+        save_baseline(dialect, queries)
+        print(f"\nBaseline for {dialect} skrevet til {BASELINE_PATH}")
+    elif problems:
+        print("\nRegressioner:\n" + "\n".join(problems))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", help="Async database-URL; standard er en midlertidig SQLite-fil")
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+    main(args.url, args.update_baseline)
@@ -0,0 +1,90 @@
+"""
+Benchmark af ORM- og Core-læsestien for opgaver.
+
+Sammenligner `select(TaskModel)` (ORM-objekter i identity map) med
+samme forespørgsel som Core lambda statement over TASK_COLUMNS (Rows),
+som i `app.core.task_reads`.
+Måler median-tid og allokeret hukommelse per række via tracemalloc.
+
+Brug:
+    python -m benchmarks.bench_read_path
+    python -m benchmarks.bench_read_path --sizes 1000 10000 50000 --repeat 10
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+from typing import List
+
+from sqlalchemy import insert, lambda_stmt, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.task_reads import TASK_COLUMNS
+from app.models.base import Base
+from app.models.task import TaskModel
+
+async def seed(session_factory, count: int):
+    async with session_factory() as db:
+        await db.execute(insert(TaskModel.__table__), [
+            {"title": f"Bench opgave {i}", "description": "Beskrivelse"}
+            for i in range(count)
+        ])
+        await db.commit()
+
+async def orm_read(db: AsyncSession, limit: int):
+    result = await db.execute(select(TaskModel).order_by(TaskModel.id).limit(limit))
+    return result.scalars().all()
+
+async def core_read(db: AsyncSession, limit: int):
+    result = await db.execute(lambda_stmt(
+        lambda: select(*TASK_COLUMNS).order_by(TaskModel.id).limit(limit)
+    ))
+    return result.all()
+
+async def measure(session_factory, operation, limit: int, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        async with session_factory() as db:
+            started = time.perf_counter()
+            await operation(db, limit)
+            timings.append(time.perf_counter() - started)
+    timings.sort()
+
+    # Hold resultatet og sessionen i live mens hukommelsen måles
+    async with session_factory() as db:
+        tracemalloc.start()
+        rows = await operation(db, limit)
+        allocated, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del rows
+    return timings[len(timings) // 2], allocated / limit
+
+async def main(sizes: List[int], repeat: int):
+    engine = create_async_engine(
+        "sqlite+aiosqlite://", poolclass=StaticPool,
+        connect_args={"check_same_thread": False}
+    )
+    session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    await seed(session_factory, max(sizes))
+
+    print(f"{'rækker':>8} {'ORM ms':>9} {'Core ms':>9} {'speedup':>8} {'ORM B/række':>12} {'Core B/række':>13}")
+    for size in sizes:
+        orm_time, orm_bytes = await measure(session_factory, orm_read, size, repeat)
+        core_time, core_bytes = await measure(session_factory, core_read, size, repeat)
+        print(
+            f"{size:>8} {orm_time * 1000:>9.2f} {core_time * 1000:>9.2f} "
+            f"{orm_time / core_time:>7.1f}x {orm_bytes:>12.0f} {core_bytes:>13.0f}"
+        )
+
+    await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.sizes, args.repeat))
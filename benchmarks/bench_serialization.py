@@ -0,0 +1,98 @@
+"""
+Benchmark af serialisering for liste- og eksport-endpoints.
+
+Sammenligner den gamle sti (ORM-objekter -> pydantic response_model ->
+json.dumps) med den nuværende (Core tuples -> dicts -> orjson) ved
+100, 1.000 og 10.000 rækker. Tiden inkluderer både query og serialisering.
+
+Brug:
+    python -m benchmarks.bench_serialization
+    python -m benchmarks.bench_serialization --sizes 100 1000 10000 --repeat 20
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.api.v1.endpoints.tasks import TASK_FIELDS
+from app.core.serialization import dumps, rows_to_dicts
+from app.models.base import Base
+from app.models.task import TaskModel, TaskPriority, TaskStatus
+from app.schemas.task import Task as TaskSchema
+
+TASK_LIST = TypeAdapter(List[TaskSchema])
+
+async def seed(session_factory, count: int):
+    now = datetime.now()
+    priorities = list(TaskPriority)
+    statuses = list(TaskStatus)
+    async with session_factory() as db:
+        await db.execute(insert(TaskModel.__table__), [
+            {
+                "title": f"Bench opgave {i}",
+                "description": "Beskrivelse med æøå " * 4,
+                "priority": priorities[i % len(priorities)],
+                "status": statuses[i % len(statuses)],
+                "deadline": now + timedelta(hours=i),
+            }
+            for i in range(count)
+        ])
+        await db.commit()
+
+async def legacy(db: AsyncSession, limit: int) -> bytes:
+    # Svarer til FastAPI's response_model sti: validering, jsonable_encoder, json.dumps
+    result = await db.execute(select(TaskModel).order_by(TaskModel.id).limit(limit))
+    tasks = TASK_LIST.validate_python(result.scalars().all(), from_attributes=True)
+    return json.dumps(jsonable_encoder(tasks)).encode("utf-8")
+
+async def fast(db: AsyncSession, limit: int) -> bytes:
+    columns = [getattr(TaskModel, name) for name in TASK_FIELDS]
+    result = await db.execute(select(*columns).order_by(TaskModel.id).limit(limit))
+    return dumps(rows_to_dicts(result.all(), TASK_FIELDS))
+
+async def measure(session_factory, operation, limit: int, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        async with session_factory() as db:
+            started = time.perf_counter()
+            body = await operation(db, limit)
+            timings.append(time.perf_counter() - started)
+    timings.sort()
+    return timings[len(timings) // 2], len(body)
+
+async def main(sizes: List[int], repeat: int):
+    engine = create_async_engine(
+        "sqlite+aiosqlite://", poolclass=StaticPool,
+        connect_args={"check_same_thread": False}
+    )
+    session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    await seed(session_factory, max(sizes))
+
+    print(f"{'rækker':>8} {'gammel ms':>10} {'orjson ms':>10} {'speedup':>8} {'bytes':>10}")
+    for size in sizes:
+        legacy_time, _ = await measure(session_factory, legacy, size, repeat)
+        fast_time, size_bytes = await measure(session_factory, fast, size, repeat)
+        print(
+            f"{size:>8} {legacy_time * 1000:>10.2f} {fast_time * 1000:>10.2f} "
+            f"{legacy_time / fast_time:>7.1f}x {size_bytes:>10}"
+        )
+
+    await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.sizes, args.repeat))
@@ -0,0 +1,100 @@
+"""
+Benchmark af kold opstart.
+
+Hver kørsel starter en ny Python-proces og måler:
+  - import af app.main (og om langchain er blevet importeret)
+  - opstart (startup events, inkl. Alembic-revisionstjek)
+  - første request mod GET /api/v1/tasks/
+  - første opbygning af en AI-kæde, som nu sker ved første brug
+
+Brug:
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --runs 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+langchain_at_boot = "langchain" in sys.modules
+
+from fastapi.testclient import TestClient
+client = TestClient(app.main.app)
+client.__enter__()
+booted = time.perf_counter()
+client.get("/api/v1/tasks/")
+first_request = time.perf_counter()
+
+from app.ai.chains.factory import get_prioritization_chain
+get_prioritization_chain().chain
+chain_built = time.perf_counter()
+client.__exit__(None, None, None)
+
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "startup_ms": (booted - imported) * 1000,
+    "first_request_ms": (first_request - booted) * 1000,
+    "first_chain_ms": (chain_built - first_request) * 1000,
+    "langchain_at_boot": langchain_at_boot,
+}))
+"""
+
+SETUP = """
+from sqlalchemy import create_engine, text
+from app.models.base import Base, alembic_heads
+import app.models.task
+url = sys.argv[1].replace("+aiosqlite", "")
+engine = create_engine(url)
+Base.metadata.create_all(engine)
+with engine.begin() as conn:
+    conn.execute(text("CREATE TABLE IF NOT EXISTS alembic_version (version_num VARCHAR(32) NOT NULL)"))
+    for head in alembic_heads():
+        conn.execute(text("INSERT INTO alembic_version VALUES (:v)"), {"v": head})
+"""
+
+def run(code: str, env: dict, *args: str) -> str:
+    result = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", code, *args],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    if result.returncode:
+        raise RuntimeError(result.stderr)
+    return result.stdout.strip().splitlines()[-1] if result.stdout.strip() else ""
+
+def main(runs: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite+aiosqlite:///{tmp}/startup.db"
+        env = {
+            **os.environ,
+            "DATABASE_URL": url,
+            "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "bench"),
+            # Mål kædeopbygningen separat i stedet for i baggrunden
+            "AI_WARM_CHAINS": "false",
+            "DB_ECHO": "false",
+        }
+        run("import sys\n" + SETUP, env, url)
+
+        samples = [json.loads(run(PROBE, env)) for _ in range(runs)]
+
+    print(f"{runs} kolde starter (median)")
+    for key in ("import_ms", "startup_ms", "first_request_ms", "first_chain_ms"):
+        values = [sample[key] for sample in samples]
+        print(f"{key:<18} {statistics.median(values):>9.1f} ms  (min {min(values):.1f}, max {max(values):.1f})")
+    print(f"langchain importeret ved opstart: {any(s['langchain_at_boot'] for s in samples)}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    main(args.runs)
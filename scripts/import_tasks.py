@@ -0,0 +1,53 @@
+"""
+Importer opgaver fra en NDJSON- eller CSV-fil direkte i databasen.
+
+Brug:
+    python -m scripts.import_tasks tasks.ndjson
+    python -m scripts.import_tasks tasks.csv --batch-size 5000
+"""
+import argparse
+import asyncio
+from pathlib import Path
+from typing import AsyncIterator
+
+from app.core.config import settings
+from app.core.task_import import import_tasks, parse_csv, parse_ndjson
+from app.models.base import async_session, close_db
+
+CHUNK_SIZE = 64 * 1024
+
+async def read_chunks(path: Path) -> AsyncIterator[bytes]:
+    with path.open("rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            yield chunk
+
+async def main(path: Path, file_format: str, batch_size: int):
+    parser = parse_csv if file_format == "csv" else parse_ndjson
+    try:
+        async with async_session() as session:
+            report = await import_tasks(session, parser(read_chunks(path)), batch_size)
+    finally:
+        await close_db()
+
+    for batch in report.batches:
+        if batch.failed:
+            print(f"Batch {batch.batch}: {batch.failed}/{batch.rows} fejlede")
+            for error in batch.errors:
+                location = f"linje {error.line}" if error.line else "batch"
+                print(f"  {location}: {error.message}")
+
+    print(
+        f"Importerede {report.inserted}/{report.total_rows} opgaver "
+        f"på {report.seconds:.2f}s ({report.rows_per_second:.0f} rækker/s)"
+    )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Importer opgaver fra NDJSON eller CSV")
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--format", choices=["ndjson", "csv"], default=None,
+                        help="Filformat (udledes af filendelsen hvis udeladt)")
+    parser.add_argument("--batch-size", type=int, default=settings.IMPORT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    file_format = args.format or ("csv" if args.path.suffix.lower() == ".csv" else "ndjson")
+    asyncio.run(main(args.path, file_format, args.batch_size))
@@ -4,7 +4,8 @@ from sqlalchemy.orm import sessionmaker
 from app.models.base import Base
 from app.main import app
 from fastapi.testclient import TestClient
-from app.models.base import get_session
+from app.models.base import get_session, get_read_session, alembic_heads
+from app.core.cache import local_cache
 import asyncio
 import os
 from typing import Generator
@@ -66,7 +67,10 @@ def client(session: AsyncSession) -> Generator:
         yield session
 
     app.dependency_overrides[get_session] = override_get_session
-    with TestClient(app) as test_client:
+    app.dependency_overrides[get_read_session] = override_get_session
+    # Testskemaet oprettes fra modellerne, som svarer til Alembic head
+    with patch("app.models.base.current_revisions", AsyncMock(return_value=alembic_heads())), \
+         TestClient(app) as test_client:
         yield test_client
     app.dependency_overrides.clear()
 
@@ -76,6 +80,29 @@ def mock_openai_key():
     with patch.dict(os.environ, {"OPENAI_API_KEY": "test_key"}):
         yield 
 
+class MockPipeline:
+    """Pipeline der samler kommandoer og kører dem mod mock-Redis ved execute"""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+            return self
+        return queue
+
+    async def execute(self):
+        commands, self.commands = self.commands, []
+        return [await getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in commands]
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.commands = []
+
 @pytest.fixture(autouse=True)
 def mock_redis():
     """Mock Redis for all tests"""
@@ -86,16 +113,50 @@ def mock_redis():
         async def mock_get(key):
             return cache_data.get(key)
             
-        async def mock_set(key, value, ex=None):
+        async def mock_set(key, value, ex=None, px=None, nx=False):
+            if nx and key in cache_data:
+                return None
             cache_data[key] = value
             return True
             
-        async def mock_delete(key):
-            if key in cache_data:
-                del cache_data[key]
+        async def mock_mget(keys):
+            return [cache_data.get(key) for key in keys]
+
+        async def mock_delete(*keys):
+            for key in keys:
+                cache_data.pop(key, None)
             return True
-            
+
+        async def mock_sadd(key, *members):
+            cache_data.setdefault(key, set()).update(members)
+            return len(members)
+
+        async def mock_sunion(*keys):
+            return set().union(*(cache_data.get(key, set()) for key in keys))
+
         mock.get = AsyncMock(side_effect=mock_get)
         mock.set = AsyncMock(side_effect=mock_set)
+        mock.mget = AsyncMock(side_effect=mock_mget)
         mock.delete = AsyncMock(side_effect=mock_delete)
+        mock.sadd = AsyncMock(side_effect=mock_sadd)
+        mock.sunion = AsyncMock(side_effect=mock_sunion)
+        mock.expire = AsyncMock(return_value=True)
+
+        async def mock_exists(*keys):
+            return sum(1 for key in keys if key in cache_data)
+
+        mock.exists = AsyncMock(side_effect=mock_exists)
+        mock.pipeline = lambda transaction=True: MockPipeline(mock)
+
+        async def mock_eval(script, numkeys, key, token):
+            # Lease-frigivelse: slet kun hvis tokenet matcher
+            if cache_data.get(key) == token:
+                del cache_data[key]
+                return 1
+            return 0
+
+        mock.eval = AsyncMock(side_effect=mock_eval)
+        mock.publish = AsyncMock(return_value=0)
+        # L1 deles af hele processen og må ikke tage værdier med mellem tests
+        local_cache.clear()
         yield mock 
\ No newline at end of file
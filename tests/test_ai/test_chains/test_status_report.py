@@ -1,6 +1,8 @@
+import asyncio
 import pytest
 from unittest.mock import patch, AsyncMock
 from app.ai.chains.status_report import StatusReportChain
+from app.core.cache import ALL_TASKS_TAG, invalidate_tags
 from app.models.task import Task, TaskStatus, TaskPriority
 from datetime import datetime, timezone
 
@@ -43,4 +45,52 @@ async def test_status_report_fallback(mock_tasks):
         
         assert "Fallback Version" in report
         assert "Aktive opgaver: 1" in report  # 1 task in progress
-        assert "Afsluttede opgaver: 1" in report  # 1 task done 
\ No newline at end of file
+        assert "Afsluttede opgaver: 1" in report  # 1 task done 
+
+@pytest.mark.asyncio
+async def test_status_report_fallback_uses_status_counts(mock_tasks):
+    with patch('app.ai.chains.status_report.LLMChain') as mock_chain:
+        chain_instance = mock_chain.return_value
+        chain_instance.arun = AsyncMock(side_effect=Exception("API Error"))
+
+        reporter = StatusReportChain()
+        report = await reporter.generate_status_report.uncached(
+            reporter, mock_tasks, {"TODO": 4, "IN_PROGRESS": 2, "DONE": 7}
+        )
+
+        assert "Aktive opgaver: 6" in report
+        assert "Afsluttede opgaver: 7" in report
+
+@pytest.mark.asyncio
+async def test_status_report_serves_stale_report_after_task_writes(mock_tasks):
+    with patch('app.ai.chains.status_report.LLMChain') as mock_chain:
+        chain_instance = mock_chain.return_value
+        refreshed = asyncio.Event()
+
+        async def arun(tasks):
+            if chain_instance.arun.await_count == 2:
+                refreshed.set()
+            return f"Rapport {chain_instance.arun.await_count}"
+
+        chain_instance.arun = AsyncMock(side_effect=arun)
+
+        reporter = StatusReportChain()
+        assert await reporter.generate_status_report(mock_tasks) == "Rapport 1"
+        # En skrivning invaliderer rapporten; den gamle serveres uden at vente på LLM'en
+        await invalidate_tags(ALL_TASKS_TAG)
+        assert await reporter.generate_status_report(mock_tasks[:1]) == "Rapport 1"
+        await asyncio.wait_for(refreshed.wait(), 1)
+        await asyncio.sleep(0)
+        assert await reporter.generate_status_report(mock_tasks[:1]) == "Rapport 2"
+        assert chain_instance.arun.await_count == 2
+
+@pytest.mark.asyncio
+async def test_uncached_status_report_bypasses_cache(mock_tasks, mock_redis):
+    with patch('app.ai.chains.status_report.LLMChain') as mock_chain:
+        chain_instance = mock_chain.return_value
+        chain_instance.arun = AsyncMock(side_effect=["Rapport A", "Rapport B"])
+
+        reporter = StatusReportChain()
+        assert await reporter.generate_status_report.uncached(reporter, mock_tasks) == "Rapport A"
+        assert await reporter.generate_status_report.uncached(reporter, mock_tasks) == "Rapport B"
+        mock_redis.set.assert_not_called()
@@ -1,7 +1,9 @@
+import asyncio
 import pytest
 from unittest.mock import patch, AsyncMock
 from app.ai.chains.task_prioritization import TaskPrioritizationChain
 from app.models.task import Task, TaskStatus, TaskPriority
+from app.core.cache import local_cache
 from datetime import datetime, timezone
 
 @pytest.fixture
@@ -53,8 +55,10 @@ async def test_batch_prioritize_partial_failure(mock_task):
             Exception("API Error")
         ])
         
+        # To forskellige opgaver, ellers kommer den anden fra cachen
+        other_task = mock_task.model_copy(update={"id": 2, "title": "Anden opgave"})
         prioritizer = TaskPrioritizationChain()
-        results = await prioritizer.batch_prioritize([mock_task, mock_task])
+        results = await prioritizer.batch_prioritize([mock_task, other_task])
         
         assert len(results) == 2
         # Tjek første resultat (success)
@@ -63,6 +67,97 @@ async def test_batch_prioritize_partial_failure(mock_task):
         assert results[0]["reasoning"] == "Success"
         
         # Tjek andet resultat (fallback)
-        assert results[1]["task_id"] == mock_task.id
+        assert results[1]["task_id"] == other_task.id
         assert results[1]["suggested_priority"] == "MEDIUM"
-        assert "Fejl" in results[1]["reasoning"] 
\ No newline at end of file
+        assert "Fejl" in results[1]["reasoning"] 
+
+@pytest.mark.asyncio
+async def test_batch_prioritize_only_dispatches_cache_misses(mock_task, mock_redis):
+    tasks = [mock_task.model_copy(update={"id": i, "title": f"Opgave {i}"}) for i in range(1, 4)]
+    with patch('app.ai.chains.task_prioritization.LLMChain') as mock_chain:
+        chain_instance = mock_chain.return_value
+        chain_instance.arun = AsyncMock(return_value="Anbefalet prioritet: HIGH\nBegrundelse: Ny")
+        prioritizer = TaskPrioritizationChain()
+        # Opgave 2 er allerede cachet
+        suggest = TaskPrioritizationChain._suggest_priority
+        await suggest.set_many([((prioritizer, tasks[1]), {}, {
+            "suggested_priority": "LOW", "reasoning": "Cachet"
+        })])
+        local_cache.clear()
+        mock_redis.get.reset_mock()
+
+        results = await prioritizer.batch_prioritize(tasks)
+
+        assert [r["reasoning"] for r in results] == ["Ny", "Cachet", "Ny"]
+        assert [r["task_id"] for r in results] == [1, 2, 3]
+        assert chain_instance.arun.await_count == 2
+        mock_redis.mget.assert_awaited_once()
+        mock_redis.get.assert_not_awaited()
+        # Nu er alle tre cachet
+        assert None not in await suggest.get_many([((prioritizer, task), {}) for task in tasks])
+
+@pytest.mark.asyncio
+async def test_fallback_suggestion_is_not_cached(mock_task):
+    with patch('app.ai.chains.task_prioritization.LLMChain') as mock_chain:
+        chain_instance = mock_chain.return_value
+        chain_instance.arun = AsyncMock(side_effect=[
+            Exception("API Error"),
+            "Anbefalet prioritet: HIGH\nBegrundelse: Virker igen"
+        ])
+        prioritizer = TaskPrioritizationChain()
+
+        assert "Fejl" in (await prioritizer.batch_prioritize([mock_task]))[0]["reasoning"]
+        assert (await prioritizer.get_priority_suggestion(mock_task))["reasoning"] == "Virker igen"
+        assert chain_instance.arun.await_count == 2
+
+@pytest.mark.asyncio
+async def test_batch_prioritize_computes_misses_concurrently(mock_task):
+    tasks = [mock_task.model_copy(update={"id": i, "title": f"Opgave {i}"}) for i in range(1, 4)]
+    running, peak = 0, 0
+
+    async def arun(**kwargs):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return "Anbefalet prioritet: HIGH\nBegrundelse: Ny"
+
+    with patch('app.ai.chains.task_prioritization.LLMChain') as mock_chain:
+        mock_chain.return_value.arun = AsyncMock(side_effect=arun)
+        prioritizer = TaskPrioritizationChain()
+        # Samme opgave to gange i batchen og et samtidigt enkeltkald deler beregningen
+        results, single = await asyncio.gather(
+            prioritizer.batch_prioritize(tasks + tasks[:1]),
+            prioritizer.get_priority_suggestion(tasks[0])
+        )
+
+        assert [r["task_id"] for r in results] == [1, 2, 3, 1]
+        assert single["reasoning"] == "Ny"
+        assert mock_chain.return_value.arun.await_count == 3
+        assert peak == 3
+
+@pytest.mark.asyncio
+async def test_cancelled_batch_keeps_finished_suggestions(mock_task):
+    tasks = [mock_task.model_copy(update={"id": i, "title": f"Opgave {i}"}) for i in range(1, 3)]
+    slow = asyncio.Event()
+
+    async def arun(title, **kwargs):
+        if title == "Opgave 2":
+            await slow.wait()
+        return f"Anbefalet prioritet: HIGH\nBegrundelse: {title}"
+
+    with patch('app.ai.chains.task_prioritization.LLMChain') as mock_chain:
+        mock_chain.return_value.arun = AsyncMock(side_effect=arun)
+        prioritizer = TaskPrioritizationChain()
+        batch = asyncio.ensure_future(prioritizer.batch_prioritize(tasks))
+        await asyncio.sleep(0.01)
+        batch.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await batch
+
+        suggest = TaskPrioritizationChain._suggest_priority
+        cached = await suggest.get_many([((prioritizer, task), {}) for task in tasks])
+        assert cached[0]["reasoning"] == "Opgave 1"
+        slow.set()
+        await asyncio.sleep(0.01)
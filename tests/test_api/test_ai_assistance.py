@@ -2,6 +2,7 @@ import pytest
 from unittest.mock import AsyncMock, patch
 from fastapi.testclient import TestClient
 from datetime import datetime, timezone
+from app.ai.chains.factory import get_prioritization_chain, get_status_report_chain
 from app.models.task import TaskPriority, TaskStatus
 
 # Mock responses
@@ -27,13 +28,18 @@ MOCK_STATUS_REPORT = """
 
 @pytest.fixture
 def mock_llm_chain():
+    # Factory'erne cacher kæderne, så de skal bygges på ny med de mockede klienter
+    get_prioritization_chain.cache_clear()
+    get_status_report_chain.cache_clear()
     with patch('app.ai.chains.task_prioritization.ChatOpenAI'), \
          patch('app.ai.chains.status_report.ChatOpenAI'):
         yield
+    get_prioritization_chain.cache_clear()
+    get_status_report_chain.cache_clear()
 
 @pytest.fixture
 def mock_prioritization_chain():
-    with patch('app.ai.chains.task_prioritization.TaskPrioritizationChain') as mock:
+    with patch('app.api.v1.endpoints.ai_assistance.get_prioritization_chain') as mock:
         chain_instance = mock.return_value
         chain_instance.get_priority_suggestion = AsyncMock(return_value={
             "suggested_priority": "HIGH",
@@ -55,7 +61,7 @@ def mock_prioritization_chain():
 
 @pytest.fixture
 def mock_status_report_chain():
-    with patch('app.ai.chains.status_report.StatusReportChain') as mock:
+    with patch('app.api.v1.endpoints.ai_assistance.get_status_report_chain') as mock:
         chain_instance = mock.return_value
         chain_instance.generate_status_report = AsyncMock(return_value=MOCK_STATUS_REPORT)
         yield mock
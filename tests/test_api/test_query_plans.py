@@ -0,0 +1,38 @@
+import os
+
+import pytest
+
+from benchmarks.bench_query_plans import (
+    FULL_SCANS, SCENARIOS, collect, load_baseline, regressions
+)
+
+def _assert_no_regressions(dialect: str, queries):
+    problems = regressions(queries, load_baseline(dialect))
+    assert not problems, (
+        "Forespørgselsplaner er blevet dårligere. Er ændringen tilsigtet, så kør "
+        "`python -m benchmarks.bench_query_plans --update-baseline`:\n"
+        + "\n".join(problems)
+    )
+
+@pytest.fixture(scope="module")
+def sqlite_plans():
+    return collect()
+
+def test_every_scenario_issues_queries(sqlite_plans):
+    scenarios = {key.split("#")[0] for key in sqlite_plans}
+    assert scenarios == {name for name, *_ in SCENARIOS}
+
+def test_full_scans_are_intended(sqlite_plans):
+    scanned = {key.split("#")[0] for key, query in sqlite_plans.items() if query.full_scans}
+    assert scanned <= set(FULL_SCANS)
+    assert not sqlite_plans["prioritize_batch#1"].full_scans
+
+def test_sqlite_query_plans_match_baseline(sqlite_plans):
+    _assert_no_regressions("sqlite", sqlite_plans)
+
+@pytest.mark.skipif(
+    not os.getenv("TEST_POSTGRES_URL"),
+    reason="TEST_POSTGRES_URL er ikke sat (fx postgresql+asyncpg://localhost/plans)"
+)
+def test_postgres_query_plans_match_baseline():
+    _assert_no_regressions("postgresql", collect(os.environ["TEST_POSTGRES_URL"]))
@@ -1,7 +1,19 @@
 import pytest
+import asyncio
+import csv
+import io
+import json
+import random
 from fastapi.testclient import TestClient
-from datetime import datetime, timezone
-from app.models.task import TaskPriority, TaskStatus
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import insert, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import StaticPool
+from app.models.base import Base
+from app.models.task import TaskModel, TaskPriority, TaskStatModel, TaskStatus
+from app.api.v1.endpoints.tasks import build_task_query, task_filters
+from app.core.cache import ALL_TASKS_TAG, CacheManager, task_tag
+from app.core.etag import task_etag
 
 def test_create_task(client: TestClient):
     task_data = {
@@ -71,6 +83,33 @@ def test_read_task_not_found(client: TestClient):
     response = client.get("/api/v1/tasks/999999")
     assert response.status_code == 404
 
+def test_task_writes_invalidate_cache_tags(client: TestClient, mock_redis):
+    task_id = client.post("/api/v1/tasks/", json={"title": "Cachet"}).json()["id"]
+    cache = CacheManager()
+
+    async def fill():
+        await cache.set("forslag", "gammelt", tags=[task_tag(task_id)])
+        await cache.set("andet forslag", "bevares", tags=[task_tag(task_id + 1)])
+        await cache.set("rapport", "gammel", tags=[ALL_TASKS_TAG])
+
+    async def cached(key):
+        return await cache.get(key)
+
+    asyncio.run(fill())
+    client.put(f"/api/v1/tasks/{task_id}", json={"title": "Ændret"})
+    assert asyncio.run(cached("forslag")) is None
+    assert asyncio.run(cached("rapport")) is None
+    assert asyncio.run(cached("andet forslag")) == "bevares"
+
+    asyncio.run(fill())
+    client.delete(f"/api/v1/tasks/{task_id}")
+    assert asyncio.run(cached("forslag")) is None
+
+    asyncio.run(fill())
+    client.post("/api/v1/tasks/", json={"title": "Ny"})
+    assert asyncio.run(cached("rapport")) is None
+    assert asyncio.run(cached("forslag")) == "gammelt"
+
 def test_update_task(client: TestClient):
     # Opret en test task
     task_data = {
@@ -140,4 +179,605 @@ def test_create_task_with_status(client: TestClient, status: TaskStatus):
     }
     response = client.post("/api/v1/tasks/", json=task_data)
     assert response.status_code == 201
-    assert response.json()["status"] == status.value 
\ No newline at end of file
+    assert response.json()["status"] == status.value 
+
+def _collect_pages(client: TestClient, params: dict) -> list:
+    pages = []
+    response = client.get("/api/v1/tasks/", params=params)
+    while True:
+        assert response.status_code == 200
+        pages.append(response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return pages
+        response = client.get("/api/v1/tasks/", params={**params, "after": cursor})
+
+def test_read_tasks_cursor_pagination(client: TestClient):
+    created_ids = [
+        client.post("/api/v1/tasks/", json={"title": f"Cursor Task {i}"}).json()["id"]
+        for i in range(5)
+    ]
+
+    pages = _collect_pages(client, {"limit": 2})
+    ids = [task["id"] for page in pages for task in page]
+
+    assert all(len(page) <= 2 for page in pages)
+    assert ids == sorted(ids)
+    assert len(ids) == len(set(ids))
+    assert set(created_ids) <= set(ids)
+
+def test_read_tasks_cursor_pagination_by_deadline(client: TestClient):
+    deadlines = [
+        "2030-01-03T12:00:00+00:00",
+        "2030-01-01T12:00:00+00:00",
+        None,
+        "2030-01-02T12:00:00+00:00",
+    ]
+    created_ids = [
+        client.post(
+            "/api/v1/tasks/",
+            json={"title": f"Deadline Task {i}", "deadline": deadline}
+        ).json()["id"]
+        for i, deadline in enumerate(deadlines)
+    ]
+
+    pages = _collect_pages(client, {"limit": 1, "sort": "deadline"})
+    ids = [task["id"] for page in pages for task in page]
+    ordered = [task_id for task_id in ids if task_id in created_ids]
+
+    assert len(ids) == len(set(ids))
+    assert ordered == [created_ids[1], created_ids[3], created_ids[0], created_ids[2]]
+
+def test_read_tasks_invalid_cursor(client: TestClient):
+    response = client.get("/api/v1/tasks/", params={"after": "not-a-cursor"})
+    assert response.status_code == 400
+
+def test_bulk_tasks(client: TestClient):
+    existing = [
+        client.post("/api/v1/tasks/", json={"title": f"Bulk Task {i}"}).json()
+        for i in range(2)
+    ]
+
+    response = client.post("/api/v1/tasks/bulk", json={"operations": [
+        {"op": "create", "task": {"title": "Bulk Created"}},
+        {"op": "update", "id": existing[0]["id"], "task": {"status": TaskStatus.DONE.value}},
+        {"op": "delete", "id": existing[1]["id"]},
+        {"op": "update", "id": 999999, "task": {"title": "Missing"}},
+        {"op": "create", "task": {"title": "Bulk Created 2", "priority": TaskPriority.HIGH.value}},
+    ]})
+    assert response.status_code == 200
+
+    results = response.json()
+    assert [r["index"] for r in results] == [0, 1, 2, 3, 4]
+    assert [r["status_code"] for r in results] == [201, 200, 204, 404, 201]
+    assert results[0]["task"]["title"] == "Bulk Created"
+    assert results[4]["task"]["priority"] == TaskPriority.HIGH.value
+    assert results[1]["task"]["status"] == TaskStatus.DONE.value
+    assert results[1]["task"]["title"] == "Bulk Task 0"
+    assert results[1]["task"]["version"] == 2
+
+    assert client.get(f"/api/v1/tasks/{results[0]['id']}").status_code == 200
+    assert client.get(f"/api/v1/tasks/{existing[1]['id']}").status_code == 404
+
+def test_bulk_tasks_duplicate_ids(client: TestClient):
+    response = client.post("/api/v1/tasks/bulk", json={"operations": [
+        {"op": "update", "id": 1, "task": {"title": "A"}},
+        {"op": "delete", "id": 1},
+    ]})
+    assert response.status_code == 422
+
+def test_export_tasks_ndjson(client: TestClient):
+    created = client.post(
+        "/api/v1/tasks/",
+        json={"title": "Export Task", "description": "Æøå", "priority": TaskPriority.HIGH.value}
+    ).json()
+
+    response = client.get("/api/v1/tasks/export")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    exported = next(row for row in rows if row["id"] == created["id"])
+    assert exported["title"] == "Export Task"
+    assert exported["description"] == "Æøå"
+    assert exported["priority"] == TaskPriority.HIGH.value
+    assert "change_seq" not in exported
+    assert [row["id"] for row in rows] == sorted(row["id"] for row in rows)
+
+def test_export_tasks_csv(client: TestClient):
+    created = client.post("/api/v1/tasks/", json={"title": "CSV, Task"}).json()
+
+    response = client.get("/api/v1/tasks/export", params={"format": "csv"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    exported = next(row for row in rows if int(row["id"]) == created["id"])
+    assert exported["title"] == "CSV, Task"
+    assert exported["status"] == TaskStatus.TODO.value
+
+def test_import_tasks_ndjson(client: TestClient):
+    lines = [
+        json.dumps({"title": "Imported 1", "priority": TaskPriority.HIGH.value}),
+        json.dumps({"title": ""}),  # Ugyldig: tom titel
+        "{not json",
+        json.dumps({"title": "Imported 2", "deadline": "2030-01-01T12:00:00+00:00"}),
+        "",
+        json.dumps({"title": "Imported 3"}),
+    ]
+
+    response = client.post(
+        "/api/v1/tasks/import",
+        params={"batch_size": 2},
+        content="\n".join(lines).encode("utf-8")
+    )
+    assert response.status_code == 200
+
+    report = response.json()
+    assert report["total_rows"] == 5
+    assert report["inserted"] == 3
+    assert report["failed"] == 2
+    assert [batch["rows"] for batch in report["batches"]] == [2, 2, 1]
+    assert [error["line"] for error in report["batches"][0]["errors"]] == [2]
+    assert [error["line"] for error in report["batches"][1]["errors"]] == [3]
+
+    titles = {task["title"] for task in client.get("/api/v1/tasks/", params={"limit": 1000}).json()}
+    assert {"Imported 1", "Imported 2", "Imported 3"} <= titles
+
+def test_import_tasks_reports_invalid_utf8_as_line_error(client: TestClient):
+    body = b'{"title": "UTF-8 1"}\n{"title": "Ugyldig \xff"}\n{"title": "UTF-8 2"}\n'
+
+    response = client.post("/api/v1/tasks/import", params={"batch_size": 1}, content=body)
+    assert response.status_code == 200
+    report = response.json()
+    assert (report["inserted"], report["failed"]) == (2, 1)
+    assert [error["line"] for error in report["batches"][1]["errors"]] == [2]
+
+def test_import_tasks_csv(client: TestClient):
+    body = (
+        "title,description,priority,status\n"
+        "CSV Import 1,\"Flere\nlinjer\",URGENT,\n"
+        "CSV Import 2,,,DONE\n"
+    )
+
+    response = client.post(
+        "/api/v1/tasks/import",
+        params={"format": "csv"},
+        content=body.encode("utf-8")
+    )
+    assert response.status_code == 200
+    assert response.json()["inserted"] == 2
+
+    tasks = client.get("/api/v1/tasks/", params={"limit": 1000}).json()
+    first = next(task for task in tasks if task["title"] == "CSV Import 1")
+    second = next(task for task in tasks if task["title"] == "CSV Import 2")
+    assert first["description"] == "Flere\nlinjer"
+    assert first["priority"] == TaskPriority.URGENT.value
+    assert first["status"] == TaskStatus.TODO.value
+    assert second["status"] == TaskStatus.DONE.value
+
+def test_read_task_etag_not_modified(client: TestClient):
+    task_id = client.post("/api/v1/tasks/", json={"title": "ETag Task"}).json()["id"]
+
+    response = client.get(f"/api/v1/tasks/{task_id}")
+    etag = response.headers["ETag"]
+    assert response.json()["version"] == 1
+
+    cached = client.get(f"/api/v1/tasks/{task_id}", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["ETag"] == etag
+
+    client.put(f"/api/v1/tasks/{task_id}", json={"title": "ETag Task 2"})
+    changed = client.get(f"/api/v1/tasks/{task_id}", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.json()["version"] == 2
+    assert changed.headers["ETag"] != etag
+
+def test_read_tasks_etag_not_modified(client: TestClient):
+    client.post("/api/v1/tasks/", json={"title": "List ETag Task"})
+
+    etag = client.get("/api/v1/tasks/").headers["ETag"]
+    cached = client.get("/api/v1/tasks/", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+
+    client.post("/api/v1/tasks/", json={"title": "List ETag Task 2"})
+    assert client.get("/api/v1/tasks/", headers={"If-None-Match": etag}).status_code == 200
+
+def test_etag_varies_with_fields(client: TestClient):
+    task_id = client.post("/api/v1/tasks/", json={"title": "Fields ETag Task"}).json()["id"]
+
+    full = client.get(f"/api/v1/tasks/{task_id}").headers["ETag"]
+    partial = client.get(f"/api/v1/tasks/{task_id}?fields=title").headers["ETag"]
+    assert partial != full
+    # Et udsnit må ikke bekræfte en cachet fuld opgave eller omvendt
+    assert client.get(f"/api/v1/tasks/{task_id}", headers={"If-None-Match": partial}).status_code == 200
+    assert client.get(
+        f"/api/v1/tasks/{task_id}?fields=title", headers={"If-None-Match": full}
+    ).status_code == 200
+    assert client.get(
+        f"/api/v1/tasks/{task_id}?fields=title", headers={"If-None-Match": partial}
+    ).status_code == 304
+    # Udsnittets ETag kan ikke bruges som If-Match for hele opgaven
+    assert client.put(
+        f"/api/v1/tasks/{task_id}", json={"title": "Nyt"}, headers={"If-Match": partial}
+    ).status_code == 412
+
+    full_list = client.get("/api/v1/tasks/").headers["ETag"]
+    partial_list = client.get("/api/v1/tasks/?fields=title").headers["ETag"]
+    assert partial_list != full_list
+    assert client.get("/api/v1/tasks/?fields=title", headers={"If-None-Match": full_list}).status_code == 200
+    assert client.get("/api/v1/tasks/?fields=title", headers={"If-None-Match": partial_list}).status_code == 304
+
+def test_update_task_if_match(client: TestClient):
+    created = client.post("/api/v1/tasks/", json={"title": "If-Match Task"})
+    task_id = created.json()["id"]
+    etag = created.headers["ETag"]
+
+    response = client.put(
+        f"/api/v1/tasks/{task_id}",
+        json={"title": "First Writer"},
+        headers={"If-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+    # Den anden klient har stadig den gamle ETag og må ikke overskrive
+    stale = client.put(
+        f"/api/v1/tasks/{task_id}",
+        json={"title": "Second Writer"},
+        headers={"If-Match": etag}
+    )
+    assert stale.status_code == 412
+    assert client.get(f"/api/v1/tasks/{task_id}").json()["title"] == "First Writer"
+
+    missing = client.put(
+        "/api/v1/tasks/999999",
+        json={"title": "Missing"},
+        headers={"If-Match": '"999999-1"'}
+    )
+    assert missing.status_code == 404
+
+def test_read_tasks_filters(client: TestClient):
+    window = {"deadline_from": "2041-01-01T00:00:00", "deadline_to": "2042-01-01T00:00:00"}
+    tasks = [
+        {"title": "Filter 1", "status": TaskStatus.TODO.value, "priority": TaskPriority.HIGH.value,
+         "deadline": "2041-03-01T12:00:00"},
+        {"title": "Filter 2", "status": TaskStatus.DONE.value, "priority": TaskPriority.HIGH.value,
+         "deadline": "2041-04-01T12:00:00"},
+        {"title": "Filter 3", "status": TaskStatus.IN_PROGRESS.value, "priority": TaskPriority.LOW.value,
+         "deadline": "2041-05-01T12:00:00"},
+        {"title": "Filter 4", "status": TaskStatus.TODO.value, "priority": TaskPriority.HIGH.value,
+         "deadline": "2043-01-01T12:00:00"},
+    ]
+    for task in tasks:
+        client.post("/api/v1/tasks/", json=task)
+
+    def titles(**params):
+        response = client.get("/api/v1/tasks/", params={**window, **params})
+        assert response.status_code == 200
+        return [task["title"] for task in response.json()]
+
+    assert titles() == ["Filter 1", "Filter 2", "Filter 3"]
+    assert titles(status=TaskStatus.TODO.value) == ["Filter 1"]
+    assert titles(status=[TaskStatus.TODO.value, TaskStatus.DONE.value], priority=TaskPriority.HIGH.value) == [
+        "Filter 1", "Filter 2"
+    ]
+    assert titles(priority=TaskPriority.LOW.value) == ["Filter 3"]
+
+def test_read_tasks_overdue(client: TestClient):
+    window = {"deadline_from": "2001-01-01T00:00:00", "deadline_to": "2002-01-01T00:00:00"}
+    client.post("/api/v1/tasks/", json={"title": "Overdue Open", "deadline": "2001-06-01T12:00:00"})
+    client.post("/api/v1/tasks/", json={
+        "title": "Overdue Done", "deadline": "2001-06-01T12:00:00", "status": TaskStatus.DONE.value
+    })
+
+    overdue = client.get("/api/v1/tasks/", params={**window, "overdue": True}).json()
+    assert [task["title"] for task in overdue] == ["Overdue Open"]
+
+    not_overdue = client.get("/api/v1/tasks/", params={**window, "overdue": False}).json()
+    assert [task["title"] for task in not_overdue] == ["Overdue Done"]
+
+def test_read_tasks_sort_by_priority(client: TestClient):
+    window = {"deadline_from": "2051-01-01T00:00:00", "deadline_to": "2052-01-01T00:00:00"}
+    for priority in [TaskPriority.LOW, TaskPriority.URGENT, TaskPriority.MEDIUM, TaskPriority.HIGH]:
+        client.post("/api/v1/tasks/", json={
+            "title": f"Sort {priority.value}",
+            "priority": priority.value,
+            "deadline": "2051-06-01T12:00:00"
+        })
+
+    pages = _collect_pages(client, {**window, "sort": "priority", "limit": 1})
+    priorities = [task["priority"] for page in pages for task in page]
+    assert priorities == ["URGENT", "HIGH", "MEDIUM", "LOW"]
+
+@pytest.fixture
+async def seeded_session():
+    """In-memory database med realistisk fordeling og ANALYZE-statistik"""
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        rnd = random.Random(1)
+        start = datetime(2024, 1, 1)
+        await conn.execute(insert(TaskModel.__table__), [
+            {
+                "title": f"Seed {i}",
+                # De fleste opgaver er afsluttede, som i en rigtig database
+                "status": TaskStatus.DONE if rnd.random() < 0.9
+                else rnd.choice([TaskStatus.TODO, TaskStatus.IN_PROGRESS]),
+                "priority": rnd.choices(list(TaskPriority), [40, 40, 15, 5])[0],
+                "deadline": start + timedelta(hours=rnd.randint(0, 24 * 365 * 3)),
+            }
+            for i in range(5000)
+        ])
+        await conn.exec_driver_sql("ANALYZE")
+    async with AsyncSession(engine) as session:
+        yield session
+    await engine.dispose()
+
+async def _query_plan(session, query) -> str:
+    compiled = query.compile(
+        dialect=session.bind.dialect,
+        compile_kwargs={"render_postcompile": True}
+    )
+    conn = await session.connection()
+    # Planen afhænger ikke af de konkrete værdier, så parametrene kan være NULL
+    result = await conn.exec_driver_sql(
+        f"EXPLAIN QUERY PLAN {compiled}",
+        tuple(None for _ in compiled.positiontup)
+    )
+    return "\n".join(row[-1] for row in result.all())
+
+@pytest.mark.parametrize("params,sort,index", [
+    ({"status_filter": [TaskStatus.TODO], "priority": [TaskPriority.HIGH]}, "deadline",
+     "ix_tasks_status_priority_deadline"),
+    ({"status_filter": [TaskStatus.TODO, TaskStatus.IN_PROGRESS]}, "priority",
+     "ix_tasks_open_priority_rank_id"),
+    ({"priority": [TaskPriority.URGENT]}, "priority", "ix_tasks_priority_rank_id"),
+    ({"priority": [TaskPriority.HIGH, TaskPriority.LOW]}, "priority", "ix_tasks_priority_rank_id"),
+    ({"overdue": True}, "id", "ix_tasks_open_deadline"),
+    ({"overdue": True}, "deadline", "ix_tasks_open_deadline"),
+    ({"deadline_from": datetime(2025, 1, 1), "deadline_to": datetime(2025, 2, 1)}, "deadline",
+     "ix_tasks_deadline_id"),
+])
+async def test_read_tasks_filters_use_index(seeded_session, params, sort, index):
+    filters = {"status_filter": None, "priority": None, "deadline_from": None,
+               "deadline_to": None, "overdue": None, **params}
+    query = build_task_query([TaskModel], task_filters(**filters, sort=sort), sort).limit(100)
+
+    plan = await _query_plan(seeded_session, query)
+    assert f"USING INDEX {index}" in plan
+    if "SCAN tasks" in plan:
+        # Kun partial index'er over åbne opgaver må scannes; de er allerede filtreret
+        assert index.startswith("ix_tasks_open_")
+    if sort == "priority":
+        assert "USE TEMP B-TREE FOR ORDER BY" not in plan
+
+def test_search_tasks(client: TestClient):
+    client.post("/api/v1/tasks/", json={"title": "Opdater zebrafisk dokumentation"})
+    client.post("/api/v1/tasks/", json={
+        "title": "Ryd op",
+        "description": "Zebrafisk nævnes kun i beskrivelsen"
+    })
+    client.post("/api/v1/tasks/", json={"title": "Zebrafisk zebrafisk zebrafisk"})
+
+    response = client.get("/api/v1/tasks/search", params={"q": "zebrafisk"})
+    assert response.status_code == 200
+    titles = [task["title"] for task in response.json()]
+    assert len(titles) == 3
+    assert titles[0] == "Zebrafisk zebrafisk zebrafisk"
+
+    response = client.get("/api/v1/tasks/search", params={"q": "zebrafisk beskrivelsen"})
+    assert [task["title"] for task in response.json()] == ["Ryd op"]
+
+    page = client.get("/api/v1/tasks/search", params={"q": "zebrafisk", "limit": 1, "skip": 1})
+    assert [task["title"] for task in page.json()] == titles[1:2]
+
+def test_search_tasks_follows_writes(client: TestClient):
+    task_id = client.post("/api/v1/tasks/", json={"title": "Flamingo opgave"}).json()["id"]
+    client.put(f"/api/v1/tasks/{task_id}", json={"title": "Pelikan opgave"})
+
+    assert client.get("/api/v1/tasks/search", params={"q": "flamingo"}).json() == []
+    assert [t["id"] for t in client.get("/api/v1/tasks/search", params={"q": "pelikan"}).json()] == [task_id]
+
+    client.delete(f"/api/v1/tasks/{task_id}")
+    assert client.get("/api/v1/tasks/search", params={"q": "pelikan"}).json() == []
+
+def test_search_tasks_quotes_user_input(client: TestClient):
+    response = client.get("/api/v1/tasks/search", params={"q": 'AND "OR* ('})
+    assert response.status_code == 200
+
+def test_read_tasks_sparse_fields(client: TestClient):
+    client.post("/api/v1/tasks/", json={"title": "Sparse Task", "description": "Skjult"})
+
+    response = client.get("/api/v1/tasks/", params={"fields": "title,status", "limit": 1000})
+    assert response.status_code == 200
+    assert "ETag" in response.headers
+
+    tasks = response.json()
+    assert all(set(task) == {"id", "title", "status"} for task in tasks)
+    assert any(task["title"] == "Sparse Task" for task in tasks)
+
+    cached = client.get(
+        "/api/v1/tasks/",
+        params={"fields": "title,status", "limit": 1000},
+        headers={"If-None-Match": response.headers["ETag"]}
+    )
+    assert cached.status_code == 304
+
+def test_sparse_fields_cursor_pagination(client: TestClient):
+    for i in range(3):
+        client.post("/api/v1/tasks/", json={"title": f"Sparse Page {i}"})
+
+    pages = _collect_pages(client, {"fields": "title", "limit": 2, "sort": "updated_at"})
+    ids = [task["id"] for page in pages for task in page]
+    assert len(ids) == len(set(ids))
+    assert all(set(task) == {"id", "title"} for page in pages for task in page)
+
+def test_read_task_sparse_fields(client: TestClient):
+    task_id = client.post("/api/v1/tasks/", json={"title": "Single Sparse"}).json()["id"]
+
+    response = client.get(f"/api/v1/tasks/{task_id}", params={"fields": "priority"})
+    assert response.status_code == 200
+    assert response.json() == {"id": task_id, "priority": TaskPriority.MEDIUM.value}
+    assert response.headers["ETag"] == task_etag(task_id, 1, ["id", "priority"])
+
+def test_sparse_fields_unknown(client: TestClient):
+    response = client.get("/api/v1/tasks/", params={"fields": "title,secret"})
+    assert response.status_code == 400
+
+def test_export_and_search_sparse_fields(client: TestClient):
+    client.post("/api/v1/tasks/", json={"title": "Sparse export pingvin"})
+
+    export = client.get("/api/v1/tasks/export", params={"format": "csv", "fields": "title"})
+    assert export.text.splitlines()[0] == "id,title"
+
+    search = client.get("/api/v1/tasks/search", params={"q": "pingvin", "fields": "title"})
+    assert search.json()[0] == {"id": search.json()[0]["id"], "title": "Sparse export pingvin"}
+
+def test_fast_serialization_matches_schema(client: TestClient):
+    created = client.post("/api/v1/tasks/", json={
+        "title": "Orjson æøå",
+        "priority": TaskPriority.HIGH.value,
+        "deadline": "2030-01-02T03:04:05.123456"
+    }).json()
+
+    # Listen, søgningen og eksporten serialiseres med orjson, men skal give
+    # præcis samme JSON som response_model på enkelt-opgaven
+    listed = client.get("/api/v1/tasks/", params={"priority": TaskPriority.HIGH.value}).json()
+    assert next(task for task in listed if task["id"] == created["id"]) == created
+
+    exported = [
+        json.loads(line)
+        for line in client.get("/api/v1/tasks/export").text.splitlines()
+    ]
+    row = next(task for task in exported if task["id"] == created["id"])
+    assert {key: row[key] for key in created} == created
+
+def _expected_stats(client: TestClient) -> dict:
+    """Beregn statistikken fra bunden ud fra en fuld eksport"""
+    tasks = [json.loads(line) for line in client.get("/api/v1/tasks/export").text.splitlines()]
+    now = datetime.now(timezone.utc)
+    by_status = {status.value: 0 for status in TaskStatus}
+    by_priority = {priority.value: 0 for priority in TaskPriority}
+    overdue = 0
+    for task in tasks:
+        by_status[task["status"]] += 1
+        if task["priority"]:
+            by_priority[task["priority"]] += 1
+        deadline = task["deadline"] and datetime.fromisoformat(task["deadline"])
+        if deadline and deadline.tzinfo is None:
+            deadline = deadline.replace(tzinfo=timezone.utc)
+        if deadline and deadline < now and task["status"] != TaskStatus.DONE.value:
+            overdue += 1
+    return {
+        "total": len(tasks),
+        "by_status": by_status,
+        "by_priority": by_priority,
+        "overdue": overdue
+    }
+
+def test_task_stats_follow_writes(client: TestClient):
+    past = (datetime.now(timezone.utc) - timedelta(days=1)).isoformat()
+    assert client.get("/api/v1/tasks/stats").json() == _expected_stats(client)
+
+    first = client.post("/api/v1/tasks/", json={
+        "title": "Stats 1", "priority": TaskPriority.URGENT.value, "deadline": past
+    }).json()
+    second = client.post("/api/v1/tasks/", json={"title": "Stats 2"}).json()
+    client.put(f"/api/v1/tasks/{second['id']}", json={"status": TaskStatus.DONE.value})
+    client.put(f"/api/v1/tasks/{first['id']}", json={"title": "Kun titel"})
+    client.post("/api/v1/tasks/bulk", json={"operations": [
+        {"op": "create", "task": {"title": "Stats bulk", "status": TaskStatus.IN_PROGRESS.value}},
+        {"op": "update", "id": first["id"], "task": {"priority": TaskPriority.LOW.value}},
+        {"op": "delete", "id": second["id"]},
+    ]})
+    client.post("/api/v1/tasks/import", content=json.dumps({"title": "Stats import"}).encode())
+
+    stats = client.get("/api/v1/tasks/stats").json()
+    assert stats == _expected_stats(client)
+    assert stats["overdue"] >= 1
+
+def test_task_stats_follow_priority_to_and_from_null(client: TestClient):
+    task = client.post("/api/v1/tasks/", json={
+        "title": "Stats null", "priority": TaskPriority.HIGH.value
+    }).json()
+
+    response = client.put(f"/api/v1/tasks/{task['id']}", json={"priority": None})
+    assert response.status_code == 200
+    assert response.json()["priority"] is None
+    assert client.get("/api/v1/tasks/stats").json() == _expected_stats(client)
+
+    response = client.put(f"/api/v1/tasks/{task['id']}", json={"priority": TaskPriority.LOW.value})
+    assert response.status_code == 200
+    assert client.get("/api/v1/tasks/stats").json() == _expected_stats(client)
+
+@pytest.mark.asyncio
+async def test_task_stats_sum_counter_shards(client: TestClient, session: AsyncSession):
+    expected = _expected_stats(client)
+    # På Postgres kan en opgave tælles op i én shard og ned i en anden
+    await session.execute(insert(TaskStatModel.__table__), [
+        {"dimension": "total", "value": "all", "shard": 1, "task_count": 1},
+        {"dimension": "total", "value": "all", "shard": 2, "task_count": -1},
+        {"dimension": "status", "value": TaskStatus.TODO.value, "shard": 1, "task_count": -3},
+        {"dimension": "status", "value": TaskStatus.TODO.value, "shard": 2, "task_count": 3},
+    ])
+    assert client.get("/api/v1/tasks/stats").json() == expected
+
+def test_task_changes_feed(client: TestClient):
+    token = client.get("/api/v1/tasks/changes", params={"since": 0, "limit": 5000}).json()["token"]
+
+    first = client.post("/api/v1/tasks/", json={"title": "Feed 1"}).json()
+    second = client.post("/api/v1/tasks/", json={"title": "Feed 2"}).json()
+    client.put(f"/api/v1/tasks/{first['id']}", json={"status": TaskStatus.DONE.value})
+    client.delete(f"/api/v1/tasks/{second['id']}")
+
+    feed = client.get("/api/v1/tasks/changes", params={"since": token}).json()
+    assert feed["has_more"] is False
+    assert feed["token"] > token
+    assert [task["id"] for task in feed["tasks"]] == [first["id"]]
+    assert feed["tasks"][0]["status"] == TaskStatus.DONE.value
+    assert feed["tasks"][0]["version"] == 2
+    assert feed["deleted"] == [second["id"]]
+
+    # Intet nyt siden sidste token
+    empty = client.get("/api/v1/tasks/changes", params={"since": feed["token"]}).json()
+    assert empty == {"token": feed["token"], "has_more": False, "tasks": [], "deleted": []}
+
+@pytest.mark.asyncio
+async def test_task_changes_feed_keeps_transactions_on_one_page(client: TestClient, session: AsyncSession):
+    token = client.get("/api/v1/tasks/changes", params={"since": 0, "limit": 5000}).json()["token"]
+    ids = [client.post("/api/v1/tasks/", json={"title": f"Feed gruppe {i}"}).json()["id"] for i in range(4)]
+    # På Postgres får alle rækker fra én transaktion samme nummer
+    await session.execute(
+        text("UPDATE tasks SET change_seq = :seq WHERE id IN (:b, :c, :d)"),
+        {"seq": token + 100, "b": ids[1], "c": ids[2], "d": ids[3]}
+    )
+    await session.execute(text("UPDATE tasks SET change_seq = :seq WHERE id = :a"), {"seq": token + 1, "a": ids[0]})
+    await session.execute(text("UPDATE task_change_seq SET last_seq = :seq"), {"seq": token + 100})
+    await session.commit()
+
+    first = client.get("/api/v1/tasks/changes", params={"since": token, "limit": 2}).json()
+    assert [task["id"] for task in first["tasks"]] == [ids[0]]
+    assert first["has_more"] is True
+    # Gruppen er større end limit og kommer samlet
+    second = client.get("/api/v1/tasks/changes", params={"since": first["token"], "limit": 2}).json()
+    assert sorted(task["id"] for task in second["tasks"]) == ids[1:]
+    assert second["token"] == token + 100
+
+def test_task_changes_feed_pages(client: TestClient):
+    token = client.get("/api/v1/tasks/changes", params={"since": 0, "limit": 5000}).json()["token"]
+    ids = [client.post("/api/v1/tasks/", json={"title": f"Feed side {i}"}).json()["id"] for i in range(5)]
+    client.delete(f"/api/v1/tasks/{ids[1]}")
+
+    seen, deleted = [], []
+    while True:
+        feed = client.get("/api/v1/tasks/changes", params={"since": token, "limit": 2}).json()
+        seen += [task["id"] for task in feed["tasks"]]
+        deleted += feed["deleted"]
+        token = feed["token"]
+        if not feed["has_more"]:
+            break
+
+    assert seen == [ids[0]] + ids[2:]
+    assert deleted == [ids[1]]
@@ -107,7 +107,7 @@ async def test_unsubscribe_from_task():
         })
         
         # Send en task update og verificer at vi ikke modtager den
-        with patch('app.api.v1.ws.dialog.TaskPrioritizationChain') as mock_chain:
+        with patch('app.api.v1.ws.dialog.get_prioritization_chain') as mock_chain:
             mock_chain.return_value.get_priority_suggestion.return_value = {
                 "suggested_priority": "HIGH",
                 "reasoning": "Test"
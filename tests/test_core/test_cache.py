@@ -1,5 +1,20 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+import orjson
+from datetime import datetime
 import pytest
-from app.core.cache import CacheManager, cache_response
+from app.core.cache import (
+    ALL_TASKS_TAG, CacheManager, LocalCache, WORKER_ID, cache_response, invalidate_tags,
+    listen_for_invalidations, local_cache, make_cache_key, task_tag
+)
+from app.core.cache_codec import SERIALIZERS, CacheCodec
+from app.core.config import settings
+from app.core.metrics import CACHE_METRICS
+from app.models.task import Task, TaskStatus
 from unittest.mock import patch, AsyncMock
 
 @pytest.fixture
@@ -48,4 +63,383 @@ async def test_cache_error_handling(cache_manager):
 
     with patch('app.core.cache.redis.set', side_effect=Exception("Redis error")):
         success = await cache_manager.set("test_key", "test_value")
-        assert not success 
\ No newline at end of file
+        assert not success 
+def test_local_cache_lru_ttl_and_memory_cap():
+    local = LocalCache(max_entries=2, max_bytes=10_000)
+    local.set("a", "1", ttl=60)
+    local.set("b", "2", ttl=60)
+    local.get("a")
+    local.set("c", "3", ttl=60)
+    # "b" var mindst nyligt brugt
+    assert local.get("b") is None
+    assert local.get("a") == "1" and local.get("c") == "3"
+
+    local.set("kort", "x", ttl=0.01)
+    time.sleep(0.02)
+    assert local.get("kort") is None
+
+    local.set("stor", "x" * 20_000, ttl=60)
+    assert local.get("stor") is None
+    assert local.bytes <= local.max_bytes
+
+@pytest.mark.asyncio
+async def test_cache_serves_hot_keys_from_local(mock_redis):
+    cache = CacheManager(expire_time=60)
+    await cache.set("hot_key", "hot_value")
+    mock_redis.publish.assert_awaited_with(
+        settings.CACHE_INVALIDATION_CHANNEL, f"{WORKER_ID} hot_key"
+    )
+
+    mock_redis.get.reset_mock()
+    assert await cache.get("hot_key") == "hot_value"
+    mock_redis.get.assert_not_awaited()
+
+    # En anden workers værdi hentes fra Redis og lægges i L1
+    await mock_redis.set("remote_key", "remote_value")
+    assert await cache.get("remote_key") == "remote_value"
+    assert await cache.get("remote_key") == "remote_value"
+    assert mock_redis.get.await_count == 1
+
+@pytest.mark.asyncio
+async def test_invalidation_from_other_worker_clears_local(mock_redis):
+    cache = CacheManager(expire_time=60)
+    messages = asyncio.Queue()
+
+    class FakePubSub:
+        async def subscribe(self, channel):
+            pass
+
+        async def listen(self):
+            while True:
+                yield await messages.get()
+
+        async def reset(self):
+            pass
+
+    mock_redis.pubsub = lambda: FakePubSub()
+    listener = asyncio.create_task(listen_for_invalidations())
+    await asyncio.sleep(0)
+    await cache.set("delt", "gammel")
+
+    # Egne beskeder ignoreres, andres fjerner nøglen fra L1
+    await messages.put({"type": "message", "data": f"{WORKER_ID} delt"})
+    await asyncio.sleep(0.01)
+    assert cache.codec.decode(local_cache.get("delt")) == "gammel"
+
+    await mock_redis.set("delt", "ny")
+    await messages.put({"type": "message", "data": "anden-worker delt"})
+    await asyncio.sleep(0.01)
+    assert local_cache.get("delt") is None
+    assert await cache.get("delt") == "ny"
+
+    listener.cancel()
+
+class _Chain:
+    async def suggest(self, task, verbose=False):
+        return task.title
+
+def test_cache_key_is_deterministic_and_ignores_self():
+    fields = ("title", "status", "deadline")
+    task = Task(id=1, title="Rapport", status=TaskStatus.TODO, deadline=datetime(2030, 1, 1))
+    same_content = Task(id=2, title="Rapport", status=TaskStatus.TODO,
+                        deadline=datetime(2030, 1, 1), description="Ikke i prompten")
+    key = make_cache_key(_Chain.suggest, (_Chain(), task), {}, "v1", fields)
+
+    assert key.startswith(f"{__name__}._Chain.suggest:")
+    assert key == make_cache_key(_Chain.suggest, (_Chain(), same_content), {}, "v1", fields)
+    assert key == make_cache_key(
+        _Chain.suggest, (_Chain(),), {"task": task, "verbose": False}, "v1", fields
+    )
+    assert key != make_cache_key(_Chain.suggest, (_Chain(), task), {}, "v2", fields)
+    changed = task.model_copy(update={"title": "Andet"})
+    assert key != make_cache_key(_Chain.suggest, (_Chain(), changed), {}, "v1", fields)
+
+def test_cache_key_is_stable_across_processes():
+    code = (
+        "from app.core.cache import make_cache_key\n"
+        "async def f(self, x, y=None): pass\n"
+        "print(make_cache_key(f, (object(), {'b': [1, 'to'], 'a': None}), {}, 'v'))"
+    )
+    keys = {
+        subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True,
+            env={**os.environ, "PYTHONHASHSEED": seed}
+        ).stdout.strip()
+        for seed in ("1", "2")
+    }
+    assert len(keys) == 1
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_call():
+    calls = 0
+    release = asyncio.Event()
+
+    @cache_response(expire_time=60)
+    async def slow(param):
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return {"value": param}
+
+    waiting = [asyncio.ensure_future(slow("x")) for _ in range(10)]
+    await asyncio.sleep(0.01)
+    release.set()
+    assert await asyncio.gather(*waiting) == [{"value": "x"}] * 10
+    assert calls == 1
+
+@pytest.mark.asyncio
+async def test_single_flight_shares_errors_and_retries():
+    calls = 0
+
+    @cache_response(expire_time=60)
+    async def failing(param):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        raise ValueError("LLM nede")
+
+    results = await asyncio.gather(failing("x"), failing("x"), return_exceptions=True)
+    assert all(isinstance(result, ValueError) for result in results)
+    assert calls == 1
+    # Fejl caches ikke; næste kald prøver igen
+    with pytest.raises(ValueError):
+        await failing("x")
+    assert calls == 2
+
+@pytest.mark.asyncio
+async def test_redis_lease_coalesces_across_workers(mock_redis):
+    calls = 0
+
+    async def report(param):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return f"rapport {param}"
+
+    # To dekoreringer svarer til to workers: hver sit in-process single-flight
+    worker_a = cache_response(expire_time=60, lock_timeout=5)(report)
+    worker_b = cache_response(expire_time=60, lock_timeout=5)(report)
+
+    results = await asyncio.gather(worker_a("x"), worker_b("x"))
+    assert results == ["rapport x", "rapport x"]
+    assert calls == 1
+    # Leasen er frigivet igen
+    assert await mock_redis.get(f"lock:{make_cache_key(report, ('x',), {})}") is None
+    mock_redis.eval.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_waiter_stops_when_lease_holder_fails(mock_redis):
+    calls = 0
+
+    async def report(param):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        if calls == 1:
+            raise ValueError("AI fejlede")
+        return f"rapport {param}"
+
+    worker_a = cache_response(expire_time=60, lock_timeout=30)(report)
+    worker_b = cache_response(expire_time=60, lock_timeout=30)(report)
+
+    started = time.monotonic()
+    results = await asyncio.gather(worker_a("x"), worker_b("x"), return_exceptions=True)
+    assert isinstance(results[0], ValueError)
+    assert results[1] == "rapport x"
+    # B gav op da A's lease forsvandt, i stedet for at vente hele lock_timeout
+    assert time.monotonic() - started < 1
+    assert await mock_redis.get(f"lock:{make_cache_key(report, ('x',), {})}") is None
+
+@pytest.mark.asyncio
+async def test_stale_while_revalidate_serves_stale_and_refreshes(mock_redis):
+    calls = 0
+    refreshed = asyncio.Event()
+
+    async def report(tasks):
+        nonlocal calls
+        calls += 1
+        refreshed.set()
+        return f"rapport over {len(tasks)} opgaver"
+
+    cached = cache_response(expire_time=60, exclude=("tasks",), stale_ttl=600)(report)
+
+    assert await cached([1, 2]) == "rapport over 2 opgaver"
+    assert calls == 1
+    key = make_cache_key(report, ([1, 2],), {}, exclude=("tasks",))
+    expirations = {call.args[0]: call.kwargs["ex"] for call in mock_redis.set.call_args_list}
+    assert expirations == {key: 60, f"{key}:stale": 660}
+    # Nøglen afhænger ikke af opgaverne, så en frisk rapport genbruges
+    assert await cached([1, 2, 3]) == "rapport over 2 opgaver"
+    assert calls == 1
+
+    # Blødt udløb: den friske værdi er væk, kopien returneres straks
+    local_cache.clear()
+    await mock_redis.delete(key)
+    await mock_redis.set(f"{key}:stale", json.dumps("gammel rapport"))
+    refreshed.clear()
+    assert await cached([1, 2, 3]) == "gammel rapport"
+    await asyncio.wait_for(refreshed.wait(), 1)
+    await asyncio.sleep(0)
+    assert calls == 2
+    assert await cached([1, 2, 3]) == "rapport over 3 opgaver"
+
+@pytest.mark.asyncio
+async def test_invalidate_tags_removes_tagged_keys(mock_redis):
+    cache = CacheManager(expire_time=60)
+    await cache.set("forslag:1", "a", tags=[task_tag(1)])
+    await cache.set("forslag:2", "b", tags=[task_tag(2)])
+    await cache.set("rapport", "c", tags=[ALL_TASKS_TAG])
+
+    assert await invalidate_tags(task_tag(1), ALL_TASKS_TAG)
+    assert await cache.get("forslag:1") is None
+    assert await cache.get("rapport") is None
+    assert await cache.get("forslag:2") == "b"
+    # Andre workers får nøglerne i én besked
+    channel, message = mock_redis.publish.call_args.args
+    assert message.split(" ")[0] == WORKER_ID
+    assert set(message.split(" ")[1:]) == {"forslag:1", "rapport"}
+
+@pytest.mark.asyncio
+async def test_invalidate_tags_errors_are_recorded(mock_redis):
+    metrics = CACHE_METRICS["app.core.cache.invalidate_tags"]
+    errors = metrics.errors
+    mock_redis.sunion.side_effect = ConnectionError("Redis er nede")
+
+    assert not await invalidate_tags(task_tag(1))
+    # Registreres i den delte manager, som GET /metrics/cache viser
+    assert metrics.snapshot()["errors"] == errors + 1
+
+@pytest.mark.asyncio
+async def test_tag_invalidation_makes_stale_while_revalidate_values_stale():
+    calls = 0
+
+    @cache_response(expire_time=60, exclude=("tasks",), tags=(ALL_TASKS_TAG,), stale_ttl=600)
+    async def report(tasks):
+        nonlocal calls
+        calls += 1
+        return f"rapport {calls}"
+
+    assert await report([]) == "rapport 1"
+    await invalidate_tags(ALL_TASKS_TAG)
+    # Invalideringen gør rapporten forældet, men den serveres stadig
+    assert await report([]) == "rapport 1"
+    await asyncio.sleep(0.01)
+    assert await report([]) == "rapport 2"
+    assert calls == 2
+
+@pytest.mark.asyncio
+async def test_get_many_uses_local_then_one_mget(mock_redis):
+    cache = CacheManager(expire_time=60)
+    assert await cache.set_many({"a": "1", "b": "2"}, tags={"a": [task_tag(1)]})
+    await mock_redis.set("c", b"3")
+    local_cache.delete("b")
+
+    assert await cache.get_many(["a", "b", "c", "d"]) == ["1", "2", 3, None]
+    mock_redis.mget.assert_awaited_once_with(["b", "c", "d"])
+    # Alle nøgler i én invalideringsbesked
+    assert mock_redis.publish.call_args.args[1] == f"{WORKER_ID} a b"
+
+def test_codec_round_trips_and_compresses_large_values():
+    codec = CacheCodec(serializer="json", compression="zlib", threshold=64)
+    small = {"priority": "high", "score": 0.9}
+    large = {"report": "Opgave forsinket. " * 200, "tasks": list(range(50))}
+
+    assert codec.decode(codec.encode(small)) == small
+    assert codec.encode(small)[2:3] == b"-"
+    encoded = codec.encode(large)
+    assert encoded[2:3] == b"z"
+    assert len(encoded) < len(orjson.dumps(large)) / 4
+    assert codec.decode(encoded) == large
+
+def test_codec_decodes_values_written_by_other_codecs_and_legacy_json():
+    written = CacheCodec(serializer="json", compression="zlib", threshold=0).encode(["a"] * 100)
+    assert CacheCodec(serializer="json", compression=None).decode(written) == ["a"] * 100
+    if "msgpack" in SERIALIZERS:
+        written = CacheCodec(serializer="msgpack").encode(["a", 1])
+        assert written[1:2] == b"m"
+        assert CacheCodec(serializer="json").decode(written) == ["a", 1]
+    # Værdier fra før codecs: JSON-tekst uden header
+    assert CacheCodec().decode(json.dumps({"a": 1}).encode()) == {"a": 1}
+    with pytest.raises(ValueError):
+        CacheCodec().decode(b"\xc1?-data")
+
+@pytest.mark.asyncio
+async def test_undecodable_value_is_a_miss(mock_redis):
+    await mock_redis.set("ødelagt", b"\xc1?-data")
+    assert await CacheManager(expire_time=60).get("ødelagt") is None
+
+@pytest.mark.asyncio
+async def test_cache_response_records_metrics(mock_redis):
+    @cache_response(expire_time=60, stale_ttl=600)
+    async def compute(x):
+        return {"x": x}
+
+    assert CACHE_METRICS[compute.metrics.name] is compute.metrics
+    await compute(1)
+    await compute(1)
+    local_cache.clear()
+    await compute(1)
+    await compute.get_many([((1,), {}), ((2,), {})])
+
+    snapshot = compute.metrics.snapshot()
+    assert (snapshot["hits"], snapshot["misses"], snapshot["stale_hits"]) == (3, 2, 0)
+    # Andet kald og get_many (værdien er lagt i L1 igen efter Redis-hittet)
+    assert snapshot["local_hits"] == 2
+    assert snapshot["hit_ratio"] == 0.6
+    # Værdien og dens stale-kopi
+    assert snapshot["sets"] == 2
+    assert snapshot["value_bytes"]["count"] == 2
+    assert snapshot["redis_latency_seconds"]["count"] > 0
+    assert snapshot["errors"] == 0
+
+@pytest.mark.asyncio
+async def test_batch_access_skips_calls_that_cannot_be_cached(mock_redis):
+    @cache_response(expire_time=60)
+    async def compute(x):
+        return x
+
+    uncacheable = object()
+    calls = [((1,), {}), ((uncacheable,), {}), ((2,), {})]
+    await compute.set_many([(args, kwargs, "værdi") for args, kwargs in calls])
+
+    assert await compute.get_many(calls) == ["værdi", None, "værdi"]
+    snapshot = compute.metrics.snapshot()
+    assert (snapshot["hits"], snapshot["misses"]) == (2, 0)
+    assert snapshot["sets"] == 2
+
+@pytest.mark.asyncio
+async def test_cache_metrics_count_redis_errors(mock_redis):
+    @cache_response(expire_time=60)
+    async def compute(x):
+        return x
+
+    mock_redis.get.side_effect = ConnectionError("Redis er nede")
+    mock_redis.set.side_effect = ConnectionError("Redis er nede")
+    local_cache.clear()
+    assert await compute(1) == 1
+
+    snapshot = compute.metrics.snapshot()
+    assert snapshot["errors"] == 2
+    assert snapshot["misses"] == 1
+    assert snapshot["sets"] == 0
+
+@pytest.mark.asyncio
+async def test_miss_does_not_join_background_refresh(mock_redis):
+    calls = 0
+
+    async def report(x):
+        nonlocal calls
+        calls += 1
+        return f"rapport {calls}"
+
+    cached = cache_response(expire_time=60, lock_timeout=0.05, stale_ttl=600)(report)
+    key = make_cache_key(report, ("x",), {})
+    await mock_redis.set(f"{key}:stale", json.dumps("gammel rapport"))
+    # En anden worker har leasen, så baggrundsopdateringen giver None
+    await mock_redis.set(f"lock:{key}", "anden-worker")
+
+    assert await cached("x") == "gammel rapport"
+    # Kopien forsvinder mens opdateringen stadig kører
+    local_cache.clear()
+    await mock_redis.delete(f"{key}:stale")
+    assert await cached("x") == "rapport 1"
@@ -0,0 +1,21 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+from app.core.config import settings
+from app.models import base
+
+@pytest.mark.asyncio
+async def test_init_db_accepts_current_revision():
+    heads = base.alembic_heads()
+    assert heads
+    with patch.object(base, "current_revisions", AsyncMock(return_value=heads)), \
+         patch.object(settings, "DB_REQUIRE_SCHEMA_REVISION", True):
+        await base.init_db()
+
+@pytest.mark.asyncio
+async def test_init_db_outdated_schema():
+    with patch.object(base, "current_revisions", AsyncMock(return_value={"gammel"})):
+        # Som standard stopper opstarten
+        with pytest.raises(RuntimeError, match="alembic upgrade head"):
+            await base.init_db()
+        with patch.object(settings, "DB_REQUIRE_SCHEMA_REVISION", False):
+            await base.init_db()
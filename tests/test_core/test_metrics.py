@@ -0,0 +1,70 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine
+from app.core.metrics import CacheMetrics, Histogram, PoolMetrics, CACHE_METRICS, POOL_METRICS
+
+def test_histogram_buckets():
+    histogram = Histogram([0.01, 0.1, 1.0])
+    for value in [0.005, 0.01, 0.05, 2.0]:
+        histogram.observe(value)
+
+    snapshot = histogram.snapshot()
+    assert snapshot["count"] == 4
+    assert snapshot["max"] == 2.0
+    assert snapshot["buckets"] == {"0.01": 2, "0.1": 3, "1.0": 3, "+Inf": 4}
+
+@pytest.mark.asyncio
+async def test_pool_metrics_track_checkouts_and_timeouts(tmp_path):
+    metrics = PoolMetrics("test-pool")
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}",
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+        poolclass=metrics.pool_class()
+    )
+    metrics.attach(engine)
+    try:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            assert metrics.snapshot()["pool"]["checked_out"] == 1
+            # Poolen er udtømt, så endnu en checkout må vente og time ud
+            with pytest.raises(PoolTimeoutError):
+                async with engine.connect():
+                    pass
+
+        snapshot = metrics.snapshot()
+        assert snapshot["checkouts"] == 1
+        assert snapshot["checkins"] == 1
+        assert snapshot["timeouts"] == 1
+        assert snapshot["peak_checked_out"] == 1
+        assert snapshot["pool"]["checked_out"] == 0
+        assert snapshot["checkout_wait_seconds"]["count"] == 2
+        assert snapshot["checkout_wait_seconds"]["max"] >= 0.05
+        assert snapshot["checkout_hold_seconds"]["count"] == 1
+
+        await engine.dispose()
+        assert metrics.snapshot()["connection_lifetime_seconds"]["count"] == 1
+    finally:
+        POOL_METRICS.pop("test-pool", None)
+        await engine.dispose()
+
+def test_db_pool_metrics_endpoint(client: TestClient):
+    response = client.get("/api/v1/metrics/db-pool")
+    assert response.status_code == 200
+    assert "checkout_wait_seconds" in response.json()["primary"]
+
+def test_cache_metrics_endpoint(client: TestClient):
+    metrics = CacheMetrics("test.cached")
+    metrics.hits, metrics.misses = 3, 1
+    CACHE_METRICS[metrics.name] = metrics
+    try:
+        response = client.get("/api/v1/metrics/cache")
+        assert response.status_code == 200
+        snapshot = response.json()["test.cached"]
+        assert snapshot["hit_ratio"] == 0.75
+        assert "redis_latency_seconds" in snapshot
+    finally:
+        CACHE_METRICS.pop("test.cached", None)
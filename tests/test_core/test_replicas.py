@@ -0,0 +1,70 @@
+import math
+import time
+import pytest
+from fastapi import Response
+from starlette.requests import Request
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from app.models.base import (
+    ReplicaRouter, STICKY_COOKIE, reads_pinned_to_primary, track_writes
+)
+from app.models.task import TaskModel
+
+def _request(cookies: dict) -> Request:
+    cookie = "; ".join(f"{key}={value}" for key, value in cookies.items())
+    return Request({"type": "http", "headers": [(b"cookie", cookie.encode())]})
+
+@pytest.mark.asyncio
+async def test_replica_router_skips_lagging_replicas():
+    replicas = [create_async_engine("sqlite+aiosqlite://") for _ in range(3)]
+    router = ReplicaRouter(replicas, max_lag=1.0, check_interval=60)
+    lags = {id(replicas[0]): 0.2, id(replicas[1]): 30.0}
+
+    async def measure(replica):
+        if id(replica) not in lags:
+            raise ConnectionError("nede")
+        return lags[id(replica)]
+
+    router._measure_lag = measure
+    # Kun replika 0 er brugbar: 1 halter for meget og 2 svarer ikke
+    assert [await router.pick() for _ in range(3)] == [router.factories[0]] * 3
+    assert await router.replica_lag(2) == math.inf
+
+    # Ingen brugbare replikaer betyder fallback til primary
+    router._lag = [(-math.inf, 0.0)] * 3
+    lags[id(replicas[0])] = 5.0
+    assert await router.pick() is None
+
+    for replica in replicas:
+        await replica.dispose()
+
+@pytest.mark.asyncio
+async def test_replica_router_round_robin():
+    replicas = [create_async_engine("sqlite+aiosqlite://") for _ in range(2)]
+    router = ReplicaRouter(replicas, max_lag=1.0, check_interval=60)
+    assert [await router.pick() for _ in range(3)] == [
+        router.factories[0], router.factories[1], router.factories[0]
+    ]
+    for replica in replicas:
+        await replica.dispose()
+
+@pytest.mark.asyncio
+async def test_track_writes_sets_sticky_cookie(db_engine):
+    async with AsyncSession(db_engine) as session:
+        read_response = Response()
+        track_writes(session, read_response)
+        await session.get(TaskModel, 1)
+        await session.commit()
+        assert STICKY_COOKIE not in read_response.headers.get("set-cookie", "")
+
+    async with AsyncSession(db_engine) as session:
+        write_response = Response()
+        track_writes(session, write_response)
+        session.add(TaskModel(title="Sticky"))
+        await session.commit()
+        assert STICKY_COOKIE in write_response.headers["set-cookie"]
+
+def test_reads_pinned_to_primary():
+    assert reads_pinned_to_primary(_request({STICKY_COOKIE: time.time() + 10}))
+    assert not reads_pinned_to_primary(_request({STICKY_COOKIE: time.time() - 10}))
+    assert not reads_pinned_to_primary(_request({STICKY_COOKIE: "ugyldig"}))
+    assert not reads_pinned_to_primary(_request({}))
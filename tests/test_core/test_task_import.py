@@ -0,0 +1,82 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from sqlalchemy.dialects import postgresql
+from app.core.task_import import MAX_BIND_PARAMS, MAX_ERRORS_PER_BATCH, build_insert_statements, import_tasks, iter_lines, parse_csv, parse_ndjson
+
+async def _chunks(*parts: bytes):
+    for part in parts:
+        yield part
+
+async def _collect(iterator):
+    return [item async for item in iterator]
+
+@pytest.mark.asyncio
+async def test_iter_lines_across_chunks():
+    lines = await _collect(iter_lines(_chunks(b"fo", b"o\r\nb", "æ".encode("utf-8")[:1], "æ".encode("utf-8")[1:], b"r\nbaz")))
+    assert lines == [(1, "foo"), (2, "bær"), (3, "baz")]
+
+@pytest.mark.asyncio
+async def test_parse_ndjson_reports_invalid_lines():
+    records = await _collect(parse_ndjson(_chunks(b'{"title": "a"}\n\n{oops\n')))
+    assert records[0] == (1, {"title": "a"})
+    assert records[1][0] == 3
+    assert isinstance(records[1][1], ValueError)
+
+@pytest.mark.asyncio
+async def test_parse_csv_multiline_field():
+    records = await _collect(parse_csv(_chunks(
+        b'title,description\n',
+        b'a,"linje 1\nlinje ""2"""\n',
+        b'b,\n'
+    )))
+    assert records == [
+        (2, {"title": "a", "description": 'linje 1\nlinje "2"'}),
+        (4, {"title": "b"}),
+    ]
+
+@pytest.mark.asyncio
+async def test_invalid_utf8_is_reported_per_line():
+    records = await _collect(parse_ndjson(_chunks(b'{"title": "a"}\n{"title": "\xff"}\n{"title": "b"}\n')))
+    assert [line for line, _ in records] == [1, 2, 3]
+    assert isinstance(records[1][1], UnicodeDecodeError)
+    assert records[2] == (3, {"title": "b"})
+
+    records = await _collect(parse_csv(_chunks(b'title\n"\xff\nstadig felt"\nc\n')))
+    assert records[0][0] == 2
+    assert isinstance(records[0][1], UnicodeDecodeError)
+    assert records[-1] == (4, {"title": "c"})
+
+@pytest.mark.asyncio
+async def test_batch_error_survives_error_cap():
+    db = AsyncMock()
+    db.bind = MagicMock()
+    db.bind.dialect.name = "sqlite"
+    db.execute.side_effect = RuntimeError("forbindelsen røg")
+
+    async def records():
+        for line_no in range(1, MAX_ERRORS_PER_BATCH + 2):
+            yield line_no, {}
+        yield MAX_ERRORS_PER_BATCH + 2, {"title": "gyldig"}
+
+    report = await import_tasks(db, records(), batch_size=100)
+    batch = report.batches[0]
+    assert batch.failed == MAX_ERRORS_PER_BATCH + 2
+    assert len(batch.errors) == MAX_ERRORS_PER_BATCH
+    assert batch.errors[0].line is None
+    assert batch.errors[0].message == "forbindelsen røg"
+    db.rollback.assert_awaited_once()
+
+def test_postgres_import_uses_multi_row_insert():
+    row = {"title": "a", "description": None, "priority": "LOW", "status": "TODO", "deadline": None}
+    rows = [row] * 5000
+    statements = build_insert_statements("postgresql", rows)
+    assert len(statements) > 1
+    assert all(params is None for _, params in statements)
+
+    compiled = [stmt.compile(dialect=postgresql.dialect()) for stmt, _ in statements]
+    assert all(len(c.params) <= MAX_BIND_PARAMS for c in compiled)
+    # Én VALUES-liste med en tupel pr. række
+    assert sum(str(c).count("(%(title_m") for c in compiled) == len(rows)
+
+    [(_, params)] = build_insert_statements("sqlite", rows)
+    assert params == rows
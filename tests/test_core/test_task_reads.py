@@ -0,0 +1,25 @@
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.task_reads import get_task_row, get_open_task_rows, get_all_task_rows
+from app.models.task import TaskModel, TaskStatus
+
+@pytest.mark.asyncio
+async def test_task_reads_bypass_identity_map(session: AsyncSession):
+    session.add_all([
+        TaskModel(title="Core læs 1"),
+        TaskModel(title="Core læs 2", status=TaskStatus.DONE),
+    ])
+    await session.commit()
+    session.expunge_all()
+
+    rows = await get_all_task_rows(session)
+    open_rows = await get_open_task_rows(session)
+    first = next(row for row in rows if row.title == "Core læs 1")
+
+    assert (await get_task_row(session, first.id)) == first
+    assert await get_task_row(session, -1) is None
+    assert first.status is TaskStatus.TODO
+    assert all(row.status != TaskStatus.DONE for row in open_rows)
+    assert {row.title for row in open_rows} >= {"Core læs 1"}
+    # Rækkerne er Core tuples, ikke ORM-objekter i sessionen
+    assert len(session.identity_map) == 0